@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+OTHER_LABEL = "Other"
+MAX_BARS = 30  # bars sent to the browser before the tail is folded into "Other"
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_figure_cache() -> "FigureCache":
+    """Return the one FigureCache shared by every session in this process."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = FigureCache()
+    return _shared_cache
+
+
+class FigureCache:
+    """Bounded LRU of analytics frames and figures.
+
+    Keys include the version of the data they were built from (e.g.
+    ("stock_bar", db.version)), so a figure is rebuilt only after the
+    inventory changed and stale versions age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling build() on a miss.
+
+        The value is shared between sessions and must not be modified.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock; two sessions racing on a miss just both build
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def top_n_with_other(df: "pd.DataFrame", value_column: str, n: int = MAX_BARS,
+                     label_column: str = "Name") -> "pd.DataFrame":
+    """Keep the n largest rows by value_column and sum the rest into one "Other" row.
+
+    Other text columns (e.g. Category) are "Other" on that row, so a bar
+    chart coloured by category still renders it; other numbers are left empty.
+    """
+    if len(df) <= n:
+        return df
+    import pandas as pd  # df is a DataFrame, so this is already loaded
+    top = df.nlargest(n, value_column)
+    rest = df.drop(top.index)
+    other = {column: None if pd.api.types.is_numeric_dtype(df[column]) else OTHER_LABEL
+             for column in df.columns}
+    other[label_column] = f"{OTHER_LABEL} ({len(rest)} items)"
+    other[value_column] = rest[value_column].sum()
+    return pd.concat([top, pd.DataFrame([other])], ignore_index=True)
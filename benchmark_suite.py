@@ -0,0 +1,215 @@
+"""Micro-benchmarks for the core modules at realistic catalog sizes.
+
+    python benchmark_suite.py                          # 30, 1k and 100k SKUs
+    python benchmark_suite.py --sizes 30,1000,100000,1000000
+    python benchmark_suite.py --baseline benchmark_baseline.json --threshold 0.25
+
+Results are written as JSON (see --output). With --baseline, every median
+is compared with the baseline's and the run exits with status 1 if any is
+more than `threshold` slower, so it can gate a deploy.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from cart_manager import CartManager
+from journal import write_json_atomic
+from receipt_generator import ReceiptGenerator
+from storage_backends import JsonStorage
+from vegetable_database import VegetableDatabase
+
+DEFAULT_SIZES = (30, 1000, 100000)
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_THRESHOLD = 0.25  # 25% slower than the baseline counts as a regression
+NOISE_FLOOR_US = 2.0      # smaller absolute slowdowns are timer noise, not regressions
+
+CATEGORIES = ["Ground", "Leafy", "Fruity_Veges", "Legumes", "Gourds", "Herbs",
+              "Exotic", "Mushrooms", "Sprouts", "Organic", "Imported", "Wholesale"]
+WORDS = ["Potato", "Onion", "Carrot", "Radish", "Beetroot", "Turnip", "Spinach", "Lettuce",
+         "Cabbage", "Cauliflower", "Broccoli", "Mint", "Tomato", "Cucumber", "Pepper",
+         "Eggplant", "Okra", "Zucchini", "Pumpkin", "Beans", "Peas", "Chili", "Drumstick",
+         "Gourd", "Garlic", "Ginger", "Coriander", "Fenugreek", "Yam", "Corn"]
+VARIANTS = ["Red", "Green", "Baby", "Organic", "Hybrid", "Local", "Hill", "Sweet", "Wild", "Desi"]
+
+
+def make_catalog(n_skus: int, seed: int = 42) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Synthetic inventory in the VegetableDatabase format with unique names."""
+    rng = random.Random(seed)
+    catalog: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for n in range(n_skus):
+        name = f"{rng.choice(VARIANTS)}_{rng.choice(WORDS)}_{n}"
+        catalog.setdefault(CATEGORIES[n % len(CATEGORIES)], {})[name] = {
+            "price": rng.randint(10, 200),
+            "stock": float(rng.randint(20, 500))
+        }
+    return catalog
+
+
+def make_order(lines: int, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    return {
+        "order_id": "ORD_BENCH",
+        "items": {f"item_{n}": {"name": f"{rng.choice(VARIANTS)}_{rng.choice(WORDS)}",
+                                "quantity": rng.choice([0.5, 1.0, 2.5]),
+                                "price": rng.randint(10, 200),
+                                "category": rng.choice(CATEGORIES)} for n in range(lines)},
+        "total_amount": 0.0,
+        "timestamp": "2024-01-01T10:30:15"
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Run func `repeat` times and summarise the per-call times in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "median_us": statistics.median(samples),
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_us": samples[0],
+    }
+
+
+def bench_catalog(n_skus: int, repeat: int = 200, io_repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Every benchmark for one catalog size; file I/O runs fewer times at large sizes."""
+    results: Dict[str, Dict[str, float]] = {}
+    io_repeat = max(1, io_repeat if n_skus < 1000000 else 1)
+    catalog = make_catalog(n_skus)
+    names = [name for items in catalog.values() for name in items]
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "inventory.json")
+        journal_file = os.path.join(tmp, "inventory.journal")
+        write_json_atomic(db_file, catalog)
+
+        def open_db() -> VegetableDatabase:
+            return VegetableDatabase(storage=JsonStorage(db_file, journal_file, "never",
+                                                         compact_every=10 ** 9))
+
+        opened: List[VegetableDatabase] = []
+        results["load_data"] = measure(lambda: opened.append(open_db()), io_repeat)
+        for extra in opened[:-1]:
+            extra.storage.close()
+        db = opened[-1]
+
+        picks = [rng.choice(names) for _ in range(repeat)]
+        sales = iter(picks)
+        results["update_stock"] = measure(lambda: db.update_stock(next(sales), 0.001), repeat)
+        results["save_data"] = measure(db.save_data, io_repeat)
+
+        results["get_inventory_summary_cold"] = measure(
+            db.get_inventory_summary, io_repeat,
+            setup=lambda: db.update_stock(picks[0], 0.001))
+        results["get_inventory_summary_warm"] = measure(db.get_inventory_summary, repeat)
+        results["get_inventory_summary_records_cold"] = measure(
+            lambda: db.get_inventory_summary(as_records=True), io_repeat,
+            setup=lambda: db.update_stock(picks[0], 0.001))
+        db.storage.close()
+
+    cart = CartManager()
+    cart_names = names[:min(len(names), 1000)]
+    def fill_cart():
+        for name in cart_names:
+            cart.add_item(name, 1.0, 50, "Ground")
+    results["cart_add_item"] = measure(fill_cart, max(1, repeat // 20), setup=cart.clear_cart)
+    results["cart_add_item"]["lines"] = len(cart_names)
+    results["cart_get_summary"] = measure(cart.get_cart_summary, repeat)
+    results["cart_export_json"] = measure(cart.export_cart_json, max(1, repeat // 20))
+
+    generator = ReceiptGenerator()
+    order = make_order(10)
+    results["generate_receipt"] = measure(lambda: generator.generate_receipt(order), repeat)
+    return results
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat: int = 200, io_repeat: int = 5) -> Dict[str, Any]:
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+        },
+        "results": {}
+    }
+    for size in sizes:
+        print(f"Benchmarking {size} SKUs...", flush=True)
+        report["results"][str(size)] = bench_catalog(size, repeat, io_repeat)
+    return report
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One row per benchmark present in both reports; `regressed` marks slowdowns."""
+    rows = []
+    for size, benches in current["results"].items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None or not base.get("median_us"):
+                continue
+            ratio = stats["median_us"] / base["median_us"]
+            slower_by = stats["median_us"] - base["median_us"]
+            rows.append({"size": size, "benchmark": name, "baseline_us": base["median_us"],
+                         "current_us": stats["median_us"], "ratio": ratio,
+                         "regressed": ratio > 1 + threshold and slower_by > NOISE_FLOOR_US})
+    return rows
+
+
+def print_report(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]] = None):
+    ratios = {(row["size"], row["benchmark"]): row for row in comparison or []}
+    print(f"{'SKUs':>8}  {'Benchmark':<28} {'median':>12} {'p95':>12}  vs baseline")
+    for size, benches in report["results"].items():
+        for name, stats in benches.items():
+            row = ratios.get((size, name))
+            change = ""
+            if row is not None:
+                change = f"{row['ratio']:.2f}x" + ("  REGRESSION" if row["regressed"] else "")
+            print(f"{size:>8}  {name:<28} {stats['median_us']:>10.1f}us {stats['p95_us']:>10.1f}us  {change}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes (SKUs)")
+    parser.add_argument("--repeat", type=int, default=200, help="runs of each in-memory benchmark")
+    parser.add_argument("--io-repeat", type=int, default=5, help="runs of each file I/O benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before failing, e.g. 0.25 for 25%%")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = run_suite(sizes, args.repeat, args.io_repeat)
+    write_json_atomic(args.output, report, indent=2)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_results(report, json.load(f), args.threshold)
+    print_report(report, comparison)
+    print(f"Results written to {args.output}")
+
+    regressions = [row for row in comparison or [] if row["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,94 @@
 import json
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Iterator, Optional, TextIO
 from datetime import datetime
+from id_generator import new_id
+from jsonl_export import write_jsonl, read_jsonl
+
+
+@dataclass(slots=True)
+class CartLine:
+    """One cart line. Slotted, so a wholesale cart of thousands of lines stays small."""
+
+    name: str
+    quantity: float
+    price: float
+    category: str
+    added_at: str
+
+    @property
+    def subtotal(self) -> float:
+        return self.quantity * self.price
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "quantity": self.quantity,
+            "price": self.price,
+            "category": self.category,
+            "added_at": self.added_at,
+            "subtotal": self.subtotal
+        }
 
 
 class CartManager:
+    """Cart lines keyed by item ID, with a running total and name/category indexes.
+
+    Adding a SKU that is already in the cart at the same price tops up the
+    existing line instead of adding a new one.
+    """
+
     def __init__(self):
-        self.cart_items = {}
-        self.cart_id_counter = 1
+        self.lines: Dict[str, CartLine] = {}
+        self._total = 0.0
+        self._quantity = 0.0
+        # lowercase name/category -> item IDs, kept in insertion order
+        self._by_name: Dict[str, Dict[str, None]] = {}
+        self._by_category: Dict[str, Dict[str, None]] = {}
+        self._items_view: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _index_line(self, item_id: str, line: CartLine):
+        self.lines[item_id] = line
+        self._by_name.setdefault(line.name.lower(), {})[item_id] = None
+        self._by_category.setdefault(line.category.lower(), {})[item_id] = None
+        self._total += line.subtotal
+        self._quantity += line.quantity
+        self._items_view = None
+
+    def _unindex_line(self, item_id: str) -> CartLine:
+        line = self.lines.pop(item_id)
+        for index, key in ((self._by_name, line.name.lower()), (self._by_category, line.category.lower())):
+            ids = index[key]
+            del ids[item_id]
+            if not ids:
+                del index[key]
+        if self.lines:
+            self._total -= line.subtotal
+            self._quantity -= line.quantity
+        else:
+            # Reset instead of subtracting, so float drift can't accumulate
+            self._total = 0.0
+            self._quantity = 0.0
+        self._items_view = None
+        return line
+
+    def _set_quantity(self, line: CartLine, quantity: float):
+        self._total += (quantity - line.quantity) * line.price
+        self._quantity += quantity - line.quantity
+        line.quantity = quantity
+        self._items_view = None
 
     def add_item(self, name: str, quantity: float, price: float, category: str) -> bool:
         try:
-            item_id = f"item_{self.cart_id_counter}"
-            self.cart_id_counter += 1
-
-            self.cart_items[item_id] = {
-                "name": name,
-                "quantity": quantity,
-                "price": price,
-                "category": category,
-                "added_at": datetime.now().isoformat(),
-                "subtotal": quantity * price
-            }
+            for item_id in self._by_name.get(name.lower(), ()):
+                line = self.lines[item_id]
+                if line.price == price and line.category == category:
+                    self._set_quantity(line, line.quantity + quantity)
+                    return True
+
+            # Globally unique, so IDs never repeat after clear_cart
+            item_id = new_id("item")
+            self._index_line(item_id, CartLine(name, quantity, price, category, datetime.now().isoformat()))
             return True
         except Exception as e:
             print(f"Error adding item to cart: {e}")
@@ -28,8 +96,8 @@ class CartManager:
 
     def remove_item(self, item_id: str) -> bool:
         try:
-            if item_id in self.cart_items:
-                del self.cart_items[item_id]
+            if item_id in self.lines:
+                self._unindex_line(item_id)
                 return True
             return False
         except Exception as e:
@@ -38,35 +106,51 @@ class CartManager:
 
     def update_quantity(self, item_id: str, new_quantity: float) -> bool:
         try:
-            if item_id in self.cart_items and new_quantity > 0:
-                self.cart_items[item_id]["quantity"] = new_quantity
-                self.cart_items[item_id]["subtotal"] = new_quantity * self.cart_items[item_id]["price"]
+            if item_id in self.lines and new_quantity > 0:
+                self._set_quantity(self.lines[item_id], new_quantity)
                 return True
             return False
         except Exception as e:
             print(f"Error updating item quantity: {e}")
             return False
 
+    def get_line(self, item_id: str) -> Optional[CartLine]:
+        return self.lines.get(item_id)
+
     def get_cart_items(self) -> Dict[str, Dict[str, Any]]:
-        return self.cart_items.copy()
+        """Lines as plain dicts (the shape orders and receipts use).
+
+        Built once per change; each call gets its own copy, so an order
+        holding it is unaffected by later cart edits and vice versa.
+        """
+        if self._items_view is None:
+            self._items_view = {item_id: line.as_dict() for item_id, line in self.lines.items()}
+        return {item_id: dict(item) for item_id, item in self._items_view.items()}
 
     def get_cart_total(self) -> float:
-        return sum(item["subtotal"] for item in self.cart_items.values())
+        return self._total
+
+    def get_cart_quantity(self) -> float:
+        return self._quantity
 
     def get_cart_count(self) -> int:
-        return len(self.cart_items)
+        return len(self.lines)
 
     def clear_cart(self) -> bool:
         try:
-            self.cart_items.clear()
-            self.cart_id_counter = 1
+            self.lines.clear()
+            self._by_name.clear()
+            self._by_category.clear()
+            self._total = 0.0
+            self._quantity = 0.0
+            self._items_view = None
             return True
         except Exception as e:
             print(f"Error clearing cart: {e}")
             return False
 
     def get_cart_summary(self) -> Dict[str, Any]:
-        if not self.cart_items:
+        if not self.lines:
             return {
                 "items": [],
                 "total_items": 0,
@@ -75,66 +159,73 @@ class CartManager:
                 "is_empty": True
             }
 
-        items_summary = []
-        total_quantity = 0
-
-        for item_id, item in self.cart_items.items():
-            items_summary.append({
-                "id": item_id,
-                "name": item["name"],
-                "category": item["category"],
-                "quantity": item["quantity"],
-                "price": item["price"],
-                "subtotal": item["subtotal"]
-            })
-            total_quantity += item["quantity"]
+        items_summary = [{
+            "id": item_id,
+            "name": line.name,
+            "category": line.category,
+            "quantity": line.quantity,
+            "price": line.price,
+            "subtotal": line.subtotal
+        } for item_id, line in self.lines.items()]
 
         return {
             "items": items_summary,
-            "total_items": len(self.cart_items),
-            "total_quantity": total_quantity,
-            "total_amount": self.get_cart_total(),
+            "total_items": len(self.lines),
+            "total_quantity": self._quantity,
+            "total_amount": self._total,
             "is_empty": False
         }
 
-    def export_cart_json(self) -> str:
-        cart_data = {
+    def cart_record(self) -> Dict[str, Any]:
+        return {
             "cart_summary": self.get_cart_summary(),
             "timestamp": datetime.now().isoformat(),
             "export_type": "cart_data"
         }
-        return json.dumps(cart_data, indent=2)
+
+    def export_cart_json(self) -> str:
+        return json.dumps(self.cart_record(), indent=2)
 
     def import_cart_json(self, json_data: str) -> bool:
         try:
-            data = json.loads(json_data)
+            return self.import_cart_record(json.loads(json_data))
+        except Exception as e:
+            print(f"Error importing cart data: {e}")
+            return False
+
+    def import_cart_record(self, data: Dict[str, Any]) -> bool:
+        try:
             if "cart_summary" in data and "items" in data["cart_summary"]:
                 self.clear_cart()
+                now = datetime.now().isoformat()
                 for item in data["cart_summary"]["items"]:
-                    item_id = item["id"]
-                    self.cart_items[item_id] = {
-                        "name": item["name"],
-                        "quantity": item["quantity"],
-                        "price": item["price"],
-                        "category": item["category"],
-                        "added_at": datetime.now().isoformat(),
-                        "subtotal": item["subtotal"]
-                    }
+                    if item["id"] in self.lines:
+                        self._unindex_line(item["id"])
+                    self._index_line(item["id"], CartLine(
+                        item["name"], item["quantity"], item["price"], item["category"], now))
                 return True
             return False
         except Exception as e:
             print(f"Error importing cart data: {e}")
             return False
 
+    @staticmethod
+    def export_carts_jsonl(carts: Iterable["CartManager"], stream: TextIO) -> int:
+        """Stream one compact record per cart (see jsonl_export.open_jsonl)."""
+        return write_jsonl((cart.cart_record() for cart in carts), stream)
+
+    @staticmethod
+    def iter_carts_jsonl(stream: TextIO) -> Iterator["CartManager"]:
+        """Rebuild carts written by export_carts_jsonl, one at a time."""
+        for record in read_jsonl(stream):
+            cart = CartManager()
+            if cart.import_cart_record(record):
+                yield cart
+
     def find_item_by_name(self, name: str) -> Optional[str]:
-        for item_id, item in self.cart_items.items():
-            if item["name"].lower() == name.lower():
-                return item_id
-        return None
+        ids = self._by_name.get(name.lower())
+        return next(iter(ids)) if ids else None
 
     def get_items_by_category(self, category: str) -> Dict[str, Dict[str, Any]]:
-        category_items = {}
-        for item_id, item in self.cart_items.items():
-            if item["category"].lower() == category.lower():
-                category_items[item_id] = item
-        return category_items
\ No newline at end of file
+        return {item_id: self.lines[item_id].as_dict()
+                for item_id in self._by_category.get(category.lower(), ())}
@@ -0,0 +1,214 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from order_queue import OrderQueue, get_shared_order_queue
+from receipt_generator import ReceiptGenerator
+from sales_ledger import get_shared_sales_ledger
+
+PENDING = "pending"
+PROCESSING = "processing"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+
+_shared_pipeline = None
+_shared_pipeline_lock = threading.Lock()
+
+
+def get_shared_pipeline() -> "FulfilmentPipeline":
+    """Return the one running FulfilmentPipeline for this process.
+
+    VVAPP_FULFILMENT_WORKERS sets the number of worker threads (default 2).
+    """
+    global _shared_pipeline
+    if _shared_pipeline is None:
+        with _shared_pipeline_lock:
+            if _shared_pipeline is None:
+                workers = int(os.environ.get("VVAPP_FULFILMENT_WORKERS", "2"))
+                pipeline = FulfilmentPipeline(get_shared_order_queue(), ReceiptGenerator(),
+                                              workers=workers)
+                pipeline.add_completion_hook(get_shared_sales_ledger().record_order)
+                pipeline.start()
+                _shared_pipeline = pipeline
+    return _shared_pipeline
+
+
+class FulfilmentPipeline:
+    """Worker threads that fulfil queued orders off the Streamlit thread.
+
+    The UI calls submit(order_id) and polls get_status(order_id). A worker
+    runs the finalizers (stock was already taken when the items went into
+    the cart, so these are hooks for later bookkeeping), renders the
+    receipt and only then removes the order from the OrderQueue, so a
+    crash mid-way leaves it queued. Failed orders are retried with a
+    growing delay. The work queue is bounded: submit() returns False when
+    it is full instead of piling up work, and a retry that finds it full
+    marks the order failed so the till can submit it again.
+    """
+
+    def __init__(self, order_queue: OrderQueue, receipt_generator: ReceiptGenerator,
+                 workers: int = 2, max_pending: int = 200, max_attempts: int = 3,
+                 retry_delay: float = 0.5, keep_results: int = 5000):
+        self.order_queue = order_queue
+        self.receipt_generator = receipt_generator
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.keep_results = keep_results
+        self.finalizers: List[Callable[[Dict[str, Any]], None]] = []
+        self.completion_hooks: List[Callable[[Dict[str, Any]], None]] = []
+        self._work: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_finalizer(self, finalizer: Callable[[Dict[str, Any]], None]):
+        """Run finalizer(order) in the worker before the receipt is rendered.
+
+        A retried order runs its finalizers again, so they must be idempotent.
+        """
+        self.finalizers.append(finalizer)
+
+    def add_completion_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        """Run hook(order) once the order has been fulfilled and left the queue."""
+        self.completion_hooks.append(hook)
+
+    def start(self):
+        self._stopping.clear()
+        for n in range(self.workers):
+            name = f"fulfilment-{n + 1}"
+            self._stats[name] = {"processed": 0, "failed": 0, "retried": 0, "busy_seconds": 0.0}
+            thread = threading.Thread(target=self._run, args=(name,), name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Let each worker finish its current order and exit; queued work stays queued."""
+        self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._work.put_nowait(None)
+            except queue.Full:
+                break  # the workers will see _stopping when they take the next item
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, order_id: str) -> bool:
+        """Queue an order for fulfilment. False means the pipeline is full."""
+        with self._lock:
+            current = self._status.get(order_id)
+            if current is not None and current["status"] != FAILED:
+                return True
+            try:
+                self._work.put_nowait(order_id)
+            except queue.Full:
+                return False
+            self._set_status(order_id, PENDING, attempts=0)
+        return True
+
+    def get_status(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            status = self._status.get(order_id)
+            return dict(status) if status is not None else None
+
+    def pending_count(self) -> int:
+        return self._work.qsize()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-worker counters plus orders/second of busy time."""
+        with self._lock:
+            report = {}
+            for name, stats in self._stats.items():
+                busy = stats["busy_seconds"]
+                report[name] = dict(stats, orders_per_second=stats["processed"] / busy if busy else 0.0)
+            return report
+
+    def _set_status(self, order_id: str, status: str, **fields):
+        """Caller holds the lock. Old finished results are evicted first-in first-out."""
+        entry = self._status.pop(order_id, {"order_id": order_id})
+        entry.update(fields, status=status, updated_at=time.time())
+        self._status[order_id] = entry
+        while len(self._status) > self.keep_results:
+            self._status.popitem(last=False)
+
+    def _run(self, name: str):
+        while True:
+            order_id = self._work.get()
+            # Workers exit on the stop event; None only wakes them, and one
+            # left over from an earlier stop() is skipped after a restart
+            if self._stopping.is_set():
+                if order_id is not None:
+                    try:
+                        self._work.put_nowait(order_id)  # leave it for the next start()
+                    except queue.Full:
+                        with self._lock:
+                            self._set_status(order_id, FAILED, error="Fulfilment stopped before processing")
+                return
+            if order_id is None:
+                continue
+            started = time.perf_counter()
+            self._process(name, order_id)
+            with self._lock:
+                self._stats[name]["busy_seconds"] += time.perf_counter() - started
+
+    def _retry(self, order_id: str):
+        """Timer callback: put a failed order back without blocking on a full queue."""
+        with self._lock:
+            try:
+                self._work.put_nowait(order_id)
+            except queue.Full:
+                self._set_status(order_id, FAILED, error="Fulfilment is busy, retry was not queued")
+
+    def _process(self, name: str, order_id: str):
+        order = self.order_queue.get(order_id)
+        with self._lock:
+            attempts = self._status.get(order_id, {}).get("attempts", 0) + 1
+            if order is None:
+                self._set_status(order_id, FAILED, attempts=attempts, worker=name,
+                                 error="Order is no longer in the queue")
+                self._stats[name]["failed"] += 1
+                return
+            self._set_status(order_id, PROCESSING, attempts=attempts, worker=name)
+
+        try:
+            for finalizer in self.finalizers:
+                finalizer(order)
+            receipt = self.receipt_generator.generate_receipt(order)
+            if receipt.startswith("Error generating receipt"):
+                raise RuntimeError(receipt)
+        except Exception as e:
+            with self._lock:
+                if attempts < self.max_attempts:
+                    self._set_status(order_id, RETRYING, error=str(e))
+                    self._stats[name]["retried"] += 1
+                    retry = threading.Timer(self.retry_delay * attempts, self._retry, args=(order_id,))
+                    retry.daemon = True
+                    retry.start()
+                else:
+                    self._set_status(order_id, FAILED, error=str(e))
+                    self._stats[name]["failed"] += 1
+            return
+
+        # Removing the order is the commit point; if a till cancelled it in
+        # the meantime the stock has already gone back.
+        if self.order_queue.remove(order_id) is None:
+            with self._lock:
+                self._set_status(order_id, FAILED, error="Order was cancelled while processing")
+                self._stats[name]["failed"] += 1
+            return
+
+        for hook in self.completion_hooks:
+            try:
+                hook(order)
+            except Exception as e:
+                print(f"Error in completion hook for {order_id}: {e}")
+
+        with self._lock:
+            self._set_status(order_id, DONE, receipt=receipt, error=None)
+            self._stats[name]["processed"] += 1
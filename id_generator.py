@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from typing import Optional
+
+# 96-bit IDs, most significant bits first:
+#   48 bits  milliseconds since the Unix epoch
+#   22 bits  process id (unique among live processes on a host; pid_max <= 2**22)
+#   10 bits  node id for the host/worker (VVAPP_NODE_ID, default 0)
+#   16 bits  sequence within the millisecond
+# Rendered as fixed-width hex, so string order is creation order.
+PID_BITS = 22
+NODE_BITS = 10
+SEQUENCE_BITS = 16
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+HEX_WIDTH = 24
+
+
+class IdGenerator:
+    """Monotonic, sortable IDs that never repeat across threads or processes."""
+
+    def __init__(self, node_id: Optional[int] = None):
+        if node_id is None:
+            node_id = int(os.environ.get("VVAPP_NODE_ID", "0"))
+        if not 0 <= node_id < (1 << NODE_BITS):
+            raise ValueError(f"node_id must be in [0, {1 << NODE_BITS})")
+        self.node_id = node_id
+        self._lock = threading.Lock()
+        self._reset_process()
+
+    def _reset_process(self):
+        self._origin = ((os.getpid() & ((1 << PID_BITS) - 1)) << NODE_BITS | self.node_id) << SEQUENCE_BITS
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_int(self) -> int:
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                # Same millisecond, or the clock stepped back: keep counting
+                self._sequence += 1
+            else:
+                # Sequence exhausted: borrow the next millisecond
+                self._last_ms += 1
+                self._sequence = 0
+            return (self._last_ms << (PID_BITS + NODE_BITS + SEQUENCE_BITS)) | self._origin | self._sequence
+
+    def next_id(self, prefix: str = "") -> str:
+        value = format(self.next_int(), f"0{HEX_WIDTH}X")
+        return f"{prefix}_{value}" if prefix else value
+
+
+def id_timestamp_ms(id_value: str) -> int:
+    """Creation time (ms since epoch) of an ID made by IdGenerator.next_id."""
+    return int(id_value.rsplit("_", 1)[-1], 16) >> (PID_BITS + NODE_BITS + SEQUENCE_BITS)
+
+
+_default_generator = IdGenerator()
+
+# A forked child has a new pid; re-derive the process bits so it can't
+# repeat the parent's IDs.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default_generator._reset_process)
+
+
+def new_id(prefix: str = "") -> str:
+    """Next ID from the process-wide generator, e.g. new_id("ORD")."""
+    return _default_generator.next_id(prefix)
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+FSYNC_ALWAYS = "always"      # fsync after every append
+FSYNC_INTERVAL = "interval"  # fsync after every `fsync_every` appends
+FSYNC_NEVER = "never"        # leave flushing to the OS
+
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER)
+
+
+def write_json_atomic(path: str, data: Any, indent: int = None):
+    """Write JSON to a temp file, fsync it, then rename it over `path`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """Append-only log of compact JSON records, one record per line."""
+
+    def __init__(self, path: str, fsync_policy: str = FSYNC_ALWAYS, fsync_every: int = 20):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_every = fsync_every
+        self.entries = 0  # records appended since the last reset
+        self.offset = 0   # end of the last record this process wrote or read
+        self._unsynced = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _handle(self):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def append(self, record: Dict[str, Any]):
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict[str, Any]]):
+        """Append records with a single write (and at most one fsync)."""
+        payload = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        if not payload:
+            return
+        data = payload.encode('utf-8')
+        with self._lock:
+            f = self._handle()
+            f.write(data)
+            f.flush()
+            self.offset = f.tell()
+            self.entries += payload.count("\n")
+            self._unsynced += 1
+            if self.fsync_policy == FSYNC_ALWAYS or (
+                    self.fsync_policy == FSYNC_INTERVAL and self._unsynced >= self.fsync_every):
+                os.fsync(f.fileno())
+                self._unsynced = 0
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield every intact record. A torn trailing line is cut off."""
+        if not os.path.exists(self.path):
+            return
+        good_end = 0
+        count = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_end += len(line)
+                count += 1
+                yield record
+        with self._lock:
+            if os.path.getsize(self.path) > good_end:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good_end)
+            self.entries = count
+            self.offset = good_end
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def read_from(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Return complete records written after `offset` and the new offset."""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+        records = []
+        for line in chunk.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            offset += len(line)
+        self.entries += len(records)
+        self.offset = offset
+        return records, offset
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def reset(self):
+        """Discard all records, e.g. once they are folded into a snapshot."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.path, 'w') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries = 0
+            self.offset = 0
+            self._unsynced = 0
+
+    def rewrite(self, records: Iterable[Dict[str, Any]]):
+        """Atomically replace the whole log with `records` (used for compaction)."""
+        payload = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(tmp_path, self.path)
+            self.entries = payload.count("\n")
+            self.offset = len(payload.encode('utf-8'))
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
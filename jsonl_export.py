@@ -0,0 +1,31 @@
+import gzip
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+
+def open_jsonl(path: str, mode: str = "r", compress: Optional[bool] = None) -> TextIO:
+    """Open a JSON Lines file for text reading/writing, gzipped if the
+    name ends in .gz (or compress=True)."""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+    """Write one compact JSON record per line; returns the number written."""
+    count = 0
+    dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    for record in records:
+        stream.write(dumps(record))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield records one at a time, so memory stays flat for any file size."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
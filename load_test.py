@@ -0,0 +1,277 @@
+"""Concurrent till load test with an oversell check.
+
+    python load_test.py --tills 8 --orders 50
+    python load_test.py --tills 4 --mode processes --storage sqlite --latency 0.2
+
+Each till runs add-to-cart -> checkout -> process flows the way the app
+does, straight against VegetableDatabase, ReservationManager,
+CartManager, PaymentProcessor (on a MockGateway with the given latency
+and failure rate) and ReceiptGenerator. Carts hold their stock for only
+--hold-ttl seconds, so holds lapse mid-payment and checkout has to take
+the stock again or refuse the sale. A few "hot" SKUs get most of the
+traffic and little stock, so tills fight over them. At the end the
+inventory is reopened from disk and, for every SKU, final stock +
+quantity sold must equal starting stock.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from benchmark_suite import make_catalog
+from cart_manager import CartManager
+from id_generator import new_id
+from journal import write_json_atomic
+from payment_processor import MockGateway, PaymentProcessor
+from receipt_generator import ReceiptGenerator
+from reservations import ReservationManager
+from storage_backends import JsonStorage, SQLiteStorage, StorageBackend
+from vegetable_database import VegetableDatabase
+
+OPERATIONS = ("add_to_cart", "checkout", "process", "order")
+HOT_TRAFFIC = 0.8  # share of cart lines that go to the hot SKUs
+TOLERANCE = 1e-6   # kg; float rounding allowed by the stock invariant
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def open_storage(config: Dict[str, Any], shared: bool) -> StorageBackend:
+    if config["storage"] == "sqlite":
+        return SQLiteStorage(os.path.join(config["data_dir"], "inventory.db"), shared=shared)
+    return JsonStorage(os.path.join(config["data_dir"], "inventory.json"),
+                       os.path.join(config["data_dir"], "inventory.journal"),
+                       config["fsync"], shared=shared)
+
+
+def prepare_inventory(config: Dict[str, Any]) -> Dict[str, float]:
+    """Write the starting catalog to disk and return its stock by name."""
+    catalog = make_catalog(config["catalog_size"], seed=config["seed"])
+    names = [name for items in catalog.values() for name in items]
+    for items in catalog.values():
+        for name in names[:config["hot_skus"]]:
+            if name in items:
+                items[name]["stock"] = config["hot_stock"]
+
+    if config["storage"] == "sqlite":
+        storage = open_storage(config, shared=False)
+        storage.save(catalog)
+        storage.close()
+    else:
+        write_json_atomic(os.path.join(config["data_dir"], "inventory.json"), catalog)
+    return {name: details["stock"] for items in catalog.values() for name, details in items.items()}
+
+
+def run_till(till_id: int, config: Dict[str, Any], db: VegetableDatabase,
+             processor: PaymentProcessor, generator: ReceiptGenerator) -> Dict[str, Any]:
+    """One till's orders; returns its latencies (seconds), counters and quantities sold."""
+    rng = random.Random(config["seed"] * 1000 + till_id)
+    names = [name for items in db.get_all_vegetables().values() for name in items]
+    hot = names[:config["hot_skus"]]
+    latencies: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+    counts = {"orders": 0, "completed": 0, "empty_carts": 0, "stock_outs": 0, "payment_failures": 0,
+              "expired_holds": 0, "refunds": 0}
+    sold: Dict[str, float] = {}
+    ttl = config["hold_ttl"]
+    reservations = ReservationManager(db, ttl=ttl, sweep_interval=min(1.0, ttl / 2))
+    reservations.start()
+
+    try:
+        for _ in range(config["orders"]):
+            counts["orders"] += 1
+            _run_order(rng, names, hot, config, db, reservations, processor, generator,
+                       latencies, counts, sold)
+    finally:
+        reservations.stop()
+        counts["expired_holds"] = reservations.expired_count
+    return {"latencies": latencies, "counts": counts, "sold": sold}
+
+
+def _run_order(rng: random.Random, names: List[str], hot: List[str], config: Dict[str, Any],
+               db: VegetableDatabase, reservations: ReservationManager, processor: PaymentProcessor,
+               generator: ReceiptGenerator, latencies: Dict[str, List[float]], counts: Dict[str, int],
+               sold: Dict[str, float]):
+    order_start = time.perf_counter()
+    cart = CartManager()
+    cart_id = new_id("CART")
+    for _ in range(rng.randint(1, config["items_per_order"])):
+        name = rng.choice(hot) if hot and rng.random() < HOT_TRAFFIC else rng.choice(names)
+        quantity = rng.choice([0.5, 1.0, 2.0])
+        start = time.perf_counter()
+        # Same order as the inventory page: hold the stock, then add the line
+        if reservations.reserve(cart_id, name, quantity):
+            item = db.get_vegetable_by_name(name)
+            cart.add_item(name, quantity, item["price"], item["category"])
+        else:
+            counts["stock_outs"] += 1
+        latencies["add_to_cart"].append(time.perf_counter() - start)
+
+    cart_items = cart.get_cart_items()
+    if not cart_items:
+        counts["empty_carts"] += 1
+        return
+
+    start = time.perf_counter()
+    success, _, txn_id = processor.submit_payment(
+        cart.get_cart_total(), "UPI", {"upi_id": f"{cart_id}@bank"},
+        idempotency_key=new_id("PAY")).result()
+    latencies["checkout"].append(time.perf_counter() - start)
+    if not success:
+        counts["payment_failures"] += 1
+        reservations.release_all(cart_id)
+        return
+
+    start = time.perf_counter()
+    # Same as the payment page: keep the hold, or take the stock again if it lapsed
+    if not reservations.checkout(cart_id, [(item["name"], item["quantity"])
+                                           for item in cart_items.values()]):
+        counts["refunds"] += 1
+        return
+    order = {"order_id": new_id("ORD"), "items": cart_items, "total_amount": cart.get_cart_total(),
+             "timestamp": datetime.now().isoformat(), "payment_method": "UPI",
+             "transaction_id": txn_id}
+    generator.generate_receipt(order)
+    latencies["process"].append(time.perf_counter() - start)
+
+    for item in cart_items.values():
+        sold[item["name"]] = sold.get(item["name"], 0.0) + item["quantity"]
+    counts["completed"] += 1
+    latencies["order"].append(time.perf_counter() - order_start)
+
+
+def _process_till(args) -> Dict[str, Any]:
+    """Entry point for --mode processes: one till per process, own DB handle on the shared files."""
+    till_id, config = args
+    db = VegetableDatabase(storage=open_storage(config, shared=True))
+    processor = PaymentProcessor(MockGateway(config["latency"], config["failure_rate"]), max_workers=1)
+    try:
+        return run_till(till_id, config, db, processor, ReceiptGenerator())
+    finally:
+        processor.shutdown()
+        db.storage.close()
+
+
+def run_load_test(config: Dict[str, Any]) -> Dict[str, Any]:
+    starting_stock = prepare_inventory(config)
+    tills = config["tills"]
+
+    start = time.perf_counter()
+    if config["mode"] == "processes":
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(tills) as pool:
+            results = pool.map(_process_till, [(n, config) for n in range(tills)])
+    else:
+        db = VegetableDatabase(storage=open_storage(config, shared=False))
+        processor = PaymentProcessor(MockGateway(config["latency"], config["failure_rate"]),
+                                     max_workers=tills)
+        generator = ReceiptGenerator()
+        with ThreadPoolExecutor(max_workers=tills) as pool:
+            results = list(pool.map(lambda n: run_till(n, config, db, processor, generator), range(tills)))
+        processor.shutdown()
+        db.storage.close()
+    elapsed = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+    counts: Dict[str, int] = {}
+    sold: Dict[str, float] = {}
+    for result in results:
+        for op, samples in result["latencies"].items():
+            latencies[op].extend(samples)
+        for key, value in result["counts"].items():
+            counts[key] = counts.get(key, 0) + value
+        for name, quantity in result["sold"].items():
+            sold[name] = sold.get(name, 0.0) + quantity
+
+    # Reopen from disk so the check also covers what was persisted
+    final_db = VegetableDatabase(storage=open_storage(config, shared=False))
+    violations = []
+    for name, start_stock in starting_stock.items():
+        final = final_db.get_vegetable_by_name(name)["stock"]
+        if final < -TOLERANCE or abs(final + sold.get(name, 0.0) - start_stock) > TOLERANCE:
+            violations.append({"name": name, "start": start_stock, "final": final,
+                               "sold": sold.get(name, 0.0)})
+    final_db.storage.close()
+
+    operations = {}
+    for op, samples in latencies.items():
+        samples.sort()
+        operations[op] = {
+            "count": len(samples),
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    return {
+        "config": config,
+        "elapsed_seconds": elapsed,
+        "throughput_orders_per_second": counts.get("completed", 0) / elapsed if elapsed else 0.0,
+        "counts": counts,
+        "operations": operations,
+        "invariant_ok": not violations,
+        "violations": violations,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    config, counts = report["config"], report["counts"]
+    print(f"{config['tills']} tills ({config['mode']}, {config['storage']} storage), "
+          f"{counts['orders']} orders in {report['elapsed_seconds']:.2f}s: "
+          f"{report['throughput_orders_per_second']:.1f} completed orders/s")
+    print(f"  completed {counts['completed']}, payment failures {counts['payment_failures']}, "
+          f"stock-outs {counts['stock_outs']}, empty carts {counts['empty_carts']}")
+    print(f"  expired holds {counts['expired_holds']}, sold out after payment (refunds) {counts['refunds']}")
+    print(f"  {'operation':<12} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for op, stats in report["operations"].items():
+        print(f"  {op:<12} {stats['count']:>7} {stats['p50_ms']:>8.2f}ms "
+              f"{stats['p95_ms']:>8.2f}ms {stats['p99_ms']:>8.2f}ms")
+    if report["invariant_ok"]:
+        print("  Stock invariant OK: final stock + sold == starting stock for every SKU")
+    else:
+        print(f"  STOCK INVARIANT VIOLATED for {len(report['violations'])} SKU(s):")
+        for violation in report["violations"][:10]:
+            print(f"    {violation}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tills", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=50, help="orders per till")
+    parser.add_argument("--items-per-order", type=int, default=5)
+    parser.add_argument("--mode", choices=("threads", "processes"), default="threads")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--fsync", choices=("always", "interval", "never"), default="interval")
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--hot-skus", type=int, default=10, help="SKUs that get most of the traffic")
+    parser.add_argument("--hot-stock", type=float, default=30.0, help="starting kg of each hot SKU")
+    parser.add_argument("--latency", type=float, default=0.05, help="gateway latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--hold-ttl", type=float, default=0.05,
+                        help="seconds a cart holds its stock; short, so holds lapse mid-payment")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", help="where to put the inventory files (default: a temp dir)")
+    parser.add_argument("--output", help="also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    with tempfile.TemporaryDirectory() as tmp:
+        config["data_dir"] = args.data_dir or tmp
+        report = run_load_test(config)
+    print_report(report)
+    if args.output:
+        write_json_atomic(args.output, report, indent=2)
+    return 0 if report["invariant_ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
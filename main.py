@@ -1,31 +1,75 @@
 import streamlit as st
 import json
+import uuid
+from itertools import islice
+from concurrent.futures import wait
 from datetime import datetime
-from vegetable_database import VegetableDatabase
+from vegetable_database import get_shared_database
 from cart_manager import CartManager
 from receipt_generator import ReceiptGenerator
-from payment_processor import PaymentProcessor
-import plotly.express as px
+from payment_processor import get_shared_payment_processor
+from id_generator import new_id
+from order_queue import get_shared_order_queue
+from fulfilment import get_shared_pipeline, DONE, FAILED
+from sales_ledger import get_shared_sales_ledger
+from analytics_cache import get_shared_figure_cache, top_n_with_other
+from reservations import get_shared_reservations
+from metrics import REGISTRY, get_shared_exporter, timed
+from profiling import profile_rerun
+
+QUEUE_PAGE_SIZE = 50  # pending orders rendered on the queue page
+INVENTORY_PAGE_SIZE = 24  # item cards rendered per open category
+
+RERUN_SECONDS = REGISTRY.histogram("vvapp_rerun_seconds", "Time for one full main() rerun")
+PAGE_SECONDS = REGISTRY.histogram("vvapp_page_seconds", "Time to render one page", ("page",))
 
 if 'cart_manager' not in st.session_state:
     st.session_state.cart_manager = CartManager()
 
 if 'vegetable_db' not in st.session_state:
-    st.session_state.vegetable_db = VegetableDatabase()
+    st.session_state.vegetable_db = get_shared_database()
 
 if 'receipt_generator' not in st.session_state:
     st.session_state.receipt_generator = ReceiptGenerator()
 
 if 'payment_processor' not in st.session_state:
-    st.session_state.payment_processor = PaymentProcessor()
+    st.session_state.payment_processor = get_shared_payment_processor()
+
+if 'fulfilment' not in st.session_state:
+    st.session_state.fulfilment = get_shared_pipeline()
+
+if 'submitted_orders' not in st.session_state:
+    st.session_state.submitted_orders = []
 
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'inventory'
 
 if 'order_queue' not in st.session_state:
-    st.session_state.order_queue = []
+    st.session_state.order_queue = get_shared_order_queue()
+
+if 'sales_ledger' not in st.session_state:
+    st.session_state.sales_ledger = get_shared_sales_ledger()
+
+if 'figure_cache' not in st.session_state:
+    st.session_state.figure_cache = get_shared_figure_cache()
+
+if 'reservations' not in st.session_state:
+    st.session_state.reservations = get_shared_reservations()
 
+if 'cart_id' not in st.session_state:
+    # Stock in this session's cart is held under this ID
+    st.session_state.cart_id = new_id("CART")
 
+if 'metrics_exporter' not in st.session_state:
+    # Serves /metrics or writes a metrics file when VVAPP_METRICS_PORT/_FILE is set
+    st.session_state.metrics_exporter = get_shared_exporter()
+    REGISTRY.gauge("vvapp_cart_holds", "Carts currently holding stock").set_function(
+        st.session_state.reservations.__len__)
+    REGISTRY.gauge("vvapp_order_queue_depth", "Orders waiting in the queue").set_function(
+        st.session_state.order_queue.__len__)
+
+
+@timed(RERUN_SECONDS)
 def main():
     st.set_page_config(
         page_title="Vegetable Market Vendor",
@@ -33,6 +77,16 @@ def main():
         layout="wide"
     )
 
+    # Pick up stock sold by other server processes (a stat call if none)
+    st.session_state.vegetable_db.refresh_if_changed()
+
+    # Any rerun counts as cart activity
+    if st.session_state.cart_manager.get_cart_count():
+        if not st.session_state.reservations.renew(st.session_state.cart_id):
+            expire_cart()
+    if st.session_state.pop('cart_expired', False):
+        st.warning("Your cart expired after a period of inactivity and its items were returned to stock.")
+
     st.title("🥕 Vegetable Market Vendor System")
     st.markdown("---")
 
@@ -74,63 +128,126 @@ def main():
         show_payment_page()
 
 
+@timed(PAGE_SECONDS.labels("inventory"))
 def show_inventory_page():
     st.header("📦 Vegetable Inventory")
     
     # Search Bar
     search_term = st.text_input("🔍 Search for vegetables...", "")
     
-    vegetables = st.session_state.vegetable_db.get_all_vegetables()
+    # Indexed search: prefix/substring matches on names, aliases and
+    # categories, with typo-tolerant fallback, best matches first
+    if search_term.strip():
+        vegetables = st.session_state.vegetable_db.search(search_term)
+    else:
+        vegetables = st.session_state.vegetable_db.get_all_vegetables()
     
-    for category, items in vegetables.items():
-        # Filter logic
-        filtered_items = {k:v for k,v in items.items() if search_term.lower() in k.lower()}
-        
-        if filtered_items:
-            st.subheader(f"🥬 {category.title()} Vegetables")
-            
-            cols = st.columns(3)
-            col_idx = 0
+    # Categories render only when opened, one page at a time, so a rerun
+    # builds widgets for at most INVENTORY_PAGE_SIZE items per open category
+    for category, filtered_items in vegetables.items():
+        if not filtered_items:
+            continue
+        count = len(filtered_items)
+        is_open = st.toggle(
+            f"🥬 {category.title()} Vegetables ({count})",
+            value=bool(search_term.strip()),
+            key=f"open_{category}"
+        )
+        if not is_open:
+            continue
+
+        pages = (count + INVENTORY_PAGE_SIZE - 1) // INVENTORY_PAGE_SIZE
+        page = 1
+        if pages > 1:
+            page = st.number_input(
+                f"Page (of {pages})",
+                min_value=1,
+                max_value=pages,
+                step=1,
+                key=f"page_{category}"
+            )
+        start = (page - 1) * INVENTORY_PAGE_SIZE
+        page_items = islice(filtered_items, start, start + INVENTORY_PAGE_SIZE)
+
+        cols = st.columns(3)
+        for col_idx, vegetable in enumerate(page_items):
+            with cols[col_idx % 3]:
+                show_item_card(vegetable, category)
+
+
+def expire_cart():
+    """The cart's hold lapsed and its stock went back, so the cart has to go too.
+
+    The cart also gets a new ID, so the next add opens a new hold instead of
+    one that would sit under the old, no longer held lines.
+    """
+    st.session_state.cart_manager.clear_cart()
+    st.session_state.cart_id = new_id("CART")
+    st.session_state.cart_expired = True
+
+
+def add_to_cart(vegetable, price, category):
+    """Button callback; the card shows the message when it redraws."""
+    quantity = st.session_state.get(f"qty_{vegetable}", 0.0)
+    if quantity <= 0:
+        st.session_state[f"card_msg_{vegetable}"] = ("Please enter a valid quantity!", "⚠️")
+        return
+    # Callbacks run before main() renews the hold, so check for a lapse here too
+    expired = (st.session_state.cart_manager.get_cart_count()
+               and not st.session_state.reservations.renew(st.session_state.cart_id))
+    if expired:
+        expire_cart()
+    # Hold the stock for this cart first, so two tills can't both take the last kilo
+    if not st.session_state.reservations.reserve(st.session_state.cart_id, vegetable, quantity):
+        st.session_state[f"card_msg_{vegetable}"] = (f"Not enough {vegetable} in stock!", "⚠️")
+        return
+    success = st.session_state.cart_manager.add_item(vegetable, quantity, price, category)
+    if success:
+        message = f"Added {quantity} kg of {vegetable} to cart!"
+        if expired:
+            message = f"Your previous cart expired. Started a new one with {quantity} kg of {vegetable}."
+        st.session_state[f"card_msg_{vegetable}"] = (message, "✅")
+    else:
+        st.session_state.reservations.release(st.session_state.cart_id, vegetable, quantity)
+        st.session_state[f"card_msg_{vegetable}"] = ("Failed to add item to cart!", "❌")
+
+
+@st.fragment
+def show_item_card(vegetable, category):
+    """One inventory card; adding to cart reruns just this card."""
+    details = st.session_state.vegetable_db.get_vegetable_by_name(vegetable)
+    if details is None:
+        return
+
+    st.write(f"**{vegetable}**")
+    st.write(f"Price: ₹{details['price']}/kg")
+    
+    # Low Stock Indicator (per-item reorder level)
+    if st.session_state.vegetable_db.is_low_stock(vegetable):
+        st.error(f"⚠️ Low Stock: {details['stock']} kg")
+    else:
+        st.write(f"Stock: {details['stock']} kg")
+    
+    quantity = st.number_input(
+        f"Quantity (kg)",
+        min_value=0.0,
+        max_value=float(details['stock']),
+        step=0.5,
+        key=f"qty_{vegetable}",
+        format="%.1f"
+    )
+    
+    # The callback runs before the card redraws, so the stock shown is fresh
+    st.button(f"Add to Cart", key=f"add_{vegetable}", on_click=add_to_cart,
+              args=(vegetable, details['price'], category))
+    message = st.session_state.pop(f"card_msg_{vegetable}", None)
+    if message is not None:
+        st.toast(message[0], icon=message[1])
             
-            for vegetable, details in filtered_items.items():
-                with cols[col_idx % 3]:
-                    st.write(f"**{vegetable}**")
-                    st.write(f"Price: ₹{details['price']}/kg")
-                    
-                    # Low Stock Indicator
-                    if details['stock'] < 5:
-                        st.error(f"⚠️ Low Stock: {details['stock']} kg")
-                    else:
-                        st.write(f"Stock: {details['stock']} kg")
-                    
-                    quantity = st.number_input(
-                        f"Quantity (kg)",
-                        min_value=0.0,
-                        max_value=float(details['stock']),
-                        step=0.5,
-                        key=f"qty_{vegetable}",
-                        format="%.1f"
-                    )
-                    
-                    if st.button(f"Add to Cart", key=f"add_{vegetable}"):
-                        if quantity > 0:
-                            success = st.session_state.cart_manager.add_item(
-                                vegetable, quantity, details['price'], category
-                            )
-                            if success:
-                                st.session_state.vegetable_db.update_stock(vegetable, quantity)
-                                st.success(f"Added {quantity} kg of {vegetable} to cart!")
-                                st.rerun()
-                            else:
-                                st.error("Failed to add item to cart!")
-                        else:
-                            st.warning("Please enter a valid quantity!")
-                            
-                    st.markdown("---")
-                
-                col_idx += 1
+    st.markdown("---")
 
 
+@timed(PAGE_SECONDS.labels("cart"))
 def show_cart_page():
     st.header("🛒 Shopping Cart")
 
@@ -140,7 +257,7 @@ def show_cart_page():
         st.info("Your cart is empty. Go to inventory to add items!")
         return
 
-    total_amount = 0
+    total_amount = st.session_state.cart_manager.get_cart_total()
 
     for item_id, item in cart_items.items():
         col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
@@ -156,13 +273,12 @@ def show_cart_page():
             st.write(f"{item['quantity']} kg")
 
         with col4:
-            item_total = item['quantity'] * item['price']
-            st.write(f"₹{item_total:.2f}")
-            total_amount += item_total
+            st.write(f"₹{item['subtotal']:.2f}")
 
         with col5:
             if st.button("🗑️", key=f"remove_{item_id}"):
-                st.session_state.vegetable_db.return_stock(item['name'], item['quantity'])
+                st.session_state.reservations.release(
+                    st.session_state.cart_id, item['name'], item['quantity'])
                 st.session_state.cart_manager.remove_item(item_id)
                 st.success(f"Removed {item['name']} from cart!")
                 st.rerun()
@@ -175,8 +291,7 @@ def show_cart_page():
 
     with col1:
         if st.button("Clear Cart", use_container_width=True):
-            for item in cart_items.values():
-                st.session_state.vegetable_db.return_stock(item['name'], item['quantity'])
+            st.session_state.reservations.release_all(st.session_state.cart_id)
             st.session_state.cart_manager.clear_cart()
             st.success("Cart cleared!")
             st.rerun()
@@ -184,13 +299,21 @@ def show_cart_page():
     with col2:
         if st.button("Add to Order Queue", use_container_width=True):
             if cart_items:
+                # The queued order takes over the cart's stock (cancelling it returns it)
+                if not st.session_state.reservations.checkout(
+                        st.session_state.cart_id,
+                        [(item['name'], item['quantity']) for item in cart_items.values()]):
+                    st.session_state.cart_manager.clear_cart()
+                    st.error("Your cart's hold lapsed and some items have sold out since. "
+                             "Please add them to the cart again.")
+                    return
                 order = {
-                    'order_id': f"ORD_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    'order_id': new_id("ORD"),
                     'items': cart_items,
                     'total_amount': total_amount,
                     'timestamp': datetime.now().isoformat()
                 }
-                st.session_state.order_queue.append(order)
+                st.session_state.order_queue.enqueue(order)
                 st.session_state.cart_manager.clear_cart()
                 st.success("Order added to queue!")
                 st.rerun()
@@ -202,18 +325,60 @@ def show_cart_page():
                 st.rerun()
 
 
+@st.fragment(run_every=1.0)
+def show_fulfilment_status():
+    """Poll the worker pool for orders this session sent to be processed."""
+    for order_id in list(st.session_state.submitted_orders):
+        status = st.session_state.fulfilment.get_status(order_id)
+        if status is None:
+            st.session_state.submitted_orders.remove(order_id)
+            continue
+
+        if status['status'] == DONE:
+            st.success(f"✅ Order {order_id} processed successfully!")
+            with st.expander(f"🧾 Receipt {order_id}"):
+                st.text(status['receipt'])
+
+                # Download receipt
+                st.download_button(
+                    label="Download Receipt",
+                    data=status['receipt'],
+                    file_name=f"receipt_{order_id}.txt",
+                    mime="text/plain",
+                    key=f"download_{order_id}"
+                )
+            if st.button("Dismiss", key=f"dismiss_{order_id}"):
+                st.session_state.submitted_orders.remove(order_id)
+                st.rerun()
+        elif status['status'] == FAILED:
+            st.error(f"Order {order_id} failed: {status.get('error')}")
+            if st.button("Dismiss", key=f"dismiss_{order_id}"):
+                st.session_state.submitted_orders.remove(order_id)
+                st.rerun()
+        else:
+            st.info(f"⏳ Order {order_id}: {status['status']}...")
+
+
+@timed(PAGE_SECONDS.labels("queue"))
 def show_queue_page():
     st.header("📋 Order Queue")
 
-    if not st.session_state.order_queue:
+    if st.session_state.submitted_orders:
+        show_fulfilment_status()
+
+    order_queue = st.session_state.order_queue
+    if not order_queue:
         st.info("No orders in queue.")
         return
 
-    st.write(f"**Orders in queue: {len(st.session_state.order_queue)}**")
+    st.write(f"**Orders in queue: {len(order_queue)}**")
+    if len(order_queue) > QUEUE_PAGE_SIZE:
+        st.caption(f"Showing the oldest {QUEUE_PAGE_SIZE} orders.")
     st.markdown("---")
 
-    for idx, order in enumerate(st.session_state.order_queue):
-        with st.expander(f"Order {order['order_id']} - ₹{order['total_amount']:.2f}"):
+    for order in order_queue.list_orders(limit=QUEUE_PAGE_SIZE):
+        order_id = order['order_id']
+        with st.expander(f"Order {order_id} - ₹{order['total_amount']:.2f}"):
             st.write(f"**Timestamp:** {order['timestamp']}")
             st.write(f"**Total Amount:** ₹{order['total_amount']:.2f}")
 
@@ -224,44 +389,42 @@ def show_queue_page():
 
             col1, col2 = st.columns(2)
             with col1:
-                if st.button(f"Process Order", key=f"process_{idx}"):
-                    # Process (dequeue) the order
-                    processed_order = st.session_state.order_queue.pop(0)
-                    receipt = st.session_state.receipt_generator.generate_receipt(processed_order)
-
-                    st.success("✅ Order processed successfully!")
-                    st.markdown("### 🧾 Receipt")
-                    st.text(receipt)
-
-                    # Download receipt
-                    st.download_button(
-                        label="Download Receipt",
-                        data=receipt,
-                        file_name=f"receipt_{processed_order['order_id']}.txt",
-                        mime="text/plain",
-                        key=f"download_{idx}"
-                    )
-                    st.rerun()
+                status = st.session_state.fulfilment.get_status(order_id)
+                if status is not None and status['status'] not in (DONE, FAILED):
+                    st.info(f"⏳ {status['status'].title()}...")
+                elif st.button(f"Process Order", key=f"process_{order_id}"):
+                    # Hand the order to the background workers and poll for the result
+                    if st.session_state.fulfilment.submit(order_id):
+                        if order_id not in st.session_state.submitted_orders:
+                            st.session_state.submitted_orders.append(order_id)
+                        st.rerun()
+                    else:
+                        st.warning("Fulfilment is busy, please try again in a moment.")
 
             with col2:
-                if st.button(f"Cancel Order", key=f"cancel_{idx}"):
+                in_progress = status is not None and status['status'] not in (DONE, FAILED)
+                if not in_progress and st.button(f"Cancel Order", key=f"cancel_{order_id}"):
                     # Return stock for cancelled order
-                    cancelled_order = st.session_state.order_queue.pop(idx)
-                    for item in cancelled_order['items'].values():
-                        st.session_state.vegetable_db.return_stock(item['name'], item['quantity'])
-                    st.warning("Order cancelled and stock returned.")
+                    cancelled_order = order_queue.remove(order_id)
+                    if cancelled_order is not None:
+                        st.session_state.vegetable_db.return_stock_many(
+                            (item['name'], item['quantity']) for item in cancelled_order['items'].values()
+                        )
+                        st.warning("Order cancelled and stock returned.")
                     st.rerun()
 
 
+@timed(PAGE_SECONDS.labels("receipt"))
 def show_receipt_page():
     st.header("🧾 Receipt Generator")
 
-    if not st.session_state.order_queue:
+    orders = st.session_state.order_queue.list_orders(limit=QUEUE_PAGE_SIZE)
+    if not orders:
         st.info("No orders available for receipt generation.")
         return
 
     order_options = [f"{order['order_id']} - ₹{order['total_amount']:.2f}"
-                     for order in st.session_state.order_queue]
+                     for order in orders]
 
     selected_order_idx = st.selectbox(
         "Select order for receipt generation:",
@@ -270,7 +433,7 @@ def show_receipt_page():
     )
 
     if st.button("Generate Receipt"):
-        selected_order = st.session_state.order_queue[selected_order_idx]
+        selected_order = orders[selected_order_idx]
         receipt = st.session_state.receipt_generator.generate_receipt(selected_order)
 
         st.markdown("### Generated Receipt")
@@ -284,36 +447,91 @@ def show_receipt_page():
         )
 
 
+@timed(PAGE_SECONDS.labels("analytics"))
 def show_analytics_page():
     st.header("📈 Vendor Analytics Dashboard")
+
+    # Store-wide totals are maintained incrementally by the database
+    totals = st.session_state.vegetable_db.get_store_totals()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Items", f"{totals['items']:.0f}")
+    col2.metric("Total Stock", f"{totals['stock']:.1f} kg")
+    col3.metric("Inventory Value", f"₹{totals['value']:.2f}")
     
+    # Figures are cached across sessions by inventory/ledger version, so an
+    # unchanged dashboard is not rebuilt on every rerun
+    cache = st.session_state.figure_cache
+    db = st.session_state.vegetable_db
+    # Plotly (and pandas, via the summary frame) load on first analytics use
+    # instead of slowing every cold start
+    import plotly.express as px
+
     # 1. Inventory Levels Chart
     st.subheader("Current Stock Levels")
-    inv_df = st.session_state.vegetable_db.get_inventory_summary()
-    
-    if not inv_df.empty:
-        # Bar chart for stock
-        fig_stock = px.bar(
-            inv_df, 
+    version = db.version  # read first, so a concurrent change can't be cached under it
+
+    if totals['items']:
+        # Bar chart for stock; large catalogs show the top items plus "Other".
+        # The summary frame is only built on a miss and is never older than `version`.
+        fig_stock = cache.get_or_build(("stock_bar", version), lambda: px.bar(
+            top_n_with_other(db.get_inventory_summary(), "Stock (kg)"),
             x="Name", 
             y="Stock (kg)", 
             color="Category",
             title="Stock remaining by Item"
-        )
+        ))
         st.plotly_chart(fig_stock, use_container_width=True)
         
-        # Pie chart for Inventory Value
-        fig_val = px.pie(
-            inv_df, 
+        # Pie chart for Inventory Value, one slice per category
+        fig_val = cache.get_or_build(("value_pie", version), lambda: px.pie(
+            db.get_inventory_summary().groupby("Category", as_index=False)["Value (₹)"].sum(),
             values="Value (₹)", 
             names="Category", 
             title="Inventory Value Distribution"
-        )
+        ))
         st.plotly_chart(fig_val, use_container_width=True)
     else:
         st.warning("No inventory data available.")
 
+    # 2. Sales, from the ledger's pre-aggregated buckets
+    st.subheader("Sales")
+    ledger = st.session_state.sales_ledger
+    refunds = ledger.get_refunds_due()
+    if refunds:
+        st.warning(f"{len(refunds)} payment(s) were taken for orders that could not be completed "
+                   f"and are due a refund.")
+        st.dataframe(refunds, use_container_width=True)
+    if not ledger.order_count():
+        st.info("No completed sales yet.")
+        return
 
+    sales = ledger.get_totals()
+    col1, col2 = st.columns(2)
+    col1.metric("Orders", f"{sales['orders']:.0f}")
+    col2.metric("Revenue", f"₹{sales['revenue']:.2f}")
+
+    granularity = st.radio("Revenue trend by", ["hour", "day"], horizontal=True, key="sales_granularity")
+    periods = 24 if granularity == "hour" else 30
+    current_hour = datetime.now().strftime("%Y%m%d%H")
+    fig_trend = cache.get_or_build(("sales_trend", granularity, ledger.version, current_hour), lambda: px.line(
+        ledger.get_trend(granularity, periods),
+        x="Period",
+        y="Revenue (₹)",
+        title=f"Revenue over the last {periods} {granularity}s"
+    ))
+    st.plotly_chart(fig_trend, use_container_width=True)
+
+    fig_top = cache.get_or_build(("top_sellers", ledger.version), lambda: px.bar(
+        ledger.get_top_sellers(10),
+        x="Name",
+        y="Revenue (₹)",
+        color="Category",
+        title="Top Sellers"
+    ))
+    st.plotly_chart(fig_top, use_container_width=True)
+
+
+@timed(PAGE_SECONDS.labels("payment"))
 def show_payment_page():
     st.header("💳 Payment Gateway")
     
@@ -330,8 +548,8 @@ def show_payment_page():
         st.rerun()
         return
 
-    # Calculate Total
-    total_amount = sum(item['price'] * item['quantity'] for item in cart_items.values())
+    # Running total kept by the cart
+    total_amount = st.session_state.cart_manager.get_cart_total()
 
     col1, col2 = st.columns([1, 1])
 
@@ -367,50 +585,83 @@ def show_payment_page():
         st.markdown("---")
         
         if st.button(f"Pay ₹{total_amount:.2f}", use_container_width=True, type="primary"):
+            # One key per checkout so a double click or retry can't charge twice
+            if 'payment_key' not in st.session_state:
+                st.session_state.payment_key = uuid.uuid4().hex
+            st.session_state.pending_payment = st.session_state.payment_processor.submit_payment(
+                total_amount, method, payment_details,
+                idempotency_key=st.session_state.payment_key
+            )
+
+        pending = st.session_state.get('pending_payment')
+        if pending is not None:
+            # Poll instead of blocking the rerun on the gateway
             with st.spinner("Processing Payment..."):
-                success, message, txn_id = st.session_state.payment_processor.process_payment(
-                    total_amount, method, payment_details
-                )
+                done, _ = wait([pending], timeout=0.25)
+            if not done:
+                st.rerun()
+
+            del st.session_state.pending_payment
+            success, message, txn_id = pending.result()
+
+            if success:
+                del st.session_state.payment_key
+
+                # Create the final order
+                order = {
+                    'order_id': new_id("ORD"),
+                    'items': cart_items,
+                    'total_amount': total_amount,
+                    'timestamp': datetime.now().isoformat(),
+                    'payment_method': method,
+                    'transaction_id': txn_id
+                }
                 
-                if success:
-                    # Create the final order
-                    order = {
-                        'order_id': f"ORD_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                        'items': cart_items,
-                        'total_amount': total_amount,
-                        'timestamp': datetime.now().isoformat(),
-                        'payment_method': method,
-                        'transaction_id': txn_id
-                    }
-                    
-                    # Generate receipt
-                    receipt = st.session_state.receipt_generator.generate_receipt(order)
-                    
-                    # Clear cart logic
+                # The sale keeps the held stock; if the hold lapsed meanwhile, take
+                # it again before anything is recorded
+                if not st.session_state.reservations.checkout(
+                        st.session_state.cart_id,
+                        [(item['name'], item['quantity']) for item in cart_items.values()]):
+                    st.session_state.sales_ledger.record_refund_due(
+                        order, "Items sold out while the payment was processing")
                     st.session_state.cart_manager.clear_cart()
+                    st.error(f"Some items sold out while the payment was processing, so the order "
+                             f"could not be completed. Payment {txn_id} has been flagged for a "
+                             f"refund of ₹{total_amount:.2f}.")
+                    return
+
+                st.session_state.sales_ledger.record_order(order)
+
+                # Generate receipt
+                receipt = st.session_state.receipt_generator.generate_receipt(order)
+                
+                # Clear cart logic
+                st.session_state.cart_manager.clear_cart()
+                
+                # Show Success
+                st.success(f"Payment Successful! Transaction ID: {txn_id}")
+                st.balloons()
+                
+                st.markdown("### 🧾 Payment Receipt")
+                st.text(receipt)
+                
+                st.download_button(
+                    label="Download Receipt",
+                    data=receipt,
+                    file_name=f"receipt_{order['order_id']}.txt",
+                    mime="text/plain"
+                )
+                
+                if st.button("Start New Order"):
+                    st.session_state.current_page = 'inventory'
+                    st.rerun()
                     
-                    # Show Success
-                    st.success(f"Payment Successful! Transaction ID: {txn_id}")
-                    st.balloons()
-                    
-                    st.markdown("### 🧾 Payment Receipt")
-                    st.text(receipt)
-                    
-                    st.download_button(
-                        label="Download Receipt",
-                        data=receipt,
-                        file_name=f"receipt_{order['order_id']}.txt",
-                        mime="text/plain"
-                    )
-                    
-                    if st.button("Start New Order"):
-                        st.session_state.current_page = 'inventory'
-                        st.rerun()
-                        
-                else:
-                    st.error(f"Payment Failed: {message}")
+            else:
+                st.error(f"Payment Failed: {message}")
 
 
 if __name__ == "__main__":
-    main()
+    # VVAPP_PROFILE=1 profiles every Nth rerun, tagged with the page it started on
+    with profile_rerun(st.session_state.current_page):
+        main()
 
@@ -0,0 +1,431 @@
+import functools
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers a sub-millisecond receipt render up to a retried payment
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_EXPORT_INTERVAL = 15.0  # seconds between metrics file writes
+
+# VVAPP_METRICS=1 turns collection on; so does asking for an exporter
+_enabled = (os.environ.get("VVAPP_METRICS") == "1"
+            or bool(os.environ.get("VVAPP_METRICS_PORT"))
+            or bool(os.environ.get("VVAPP_METRICS_FILE")))
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    """Switch collection on or off for the whole process."""
+    global _enabled
+    _enabled = on
+
+
+def _format_value(value: float) -> str:
+    """A sample value in the text format, which spells the non-finite ones NaN, +Inf and -Inf."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if not _enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, label_str: str) -> List[str]:
+        return [f"{name}{label_str} {_format_value(self.value)}"]
+
+
+class _GaugeValue:
+    __slots__ = ("value", "function", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        if _enabled:
+            self.value = value
+
+    def inc(self, amount: float = 1.0):
+        if not _enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function() at exposition time instead."""
+        self.function = function
+
+    def samples(self, name: str, label_str: str) -> List[str]:
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                print(f"Error reading gauge {name}: {e}")
+                return []
+        return [f"{name}{label_str} {_format_value(value)}"]
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "_HistogramValue"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not _enabled:
+            return
+        i = bisect_left(self.bounds, value)  # first bucket with value <= le
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes the elapsed seconds."""
+        return _Timer(self) if _enabled else _NOOP_TIMER
+
+    def samples(self, name: str, label_str: str) -> List[str]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        # le goes after the metric's own labels
+        prefix = label_str[:-1] + "," if label_str else "{"
+        lines = []
+        cumulative = 0
+        for bound, bucket in zip(self.bounds + (float("inf"),), counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{prefix}le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{label_str} {_format_value(total)}")
+        lines.append(f"{name}_count{label_str} {count}")
+        return lines
+
+
+class _Metric(ABC):
+    """One metric family; unlabelled metrics act as their only child."""
+
+    type_name = ""
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh value holder for one set of label values."""
+
+    def labels(self, *values: str):
+        """The child for one set of label values, created on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in list(self._children.items()):
+            lines.extend(child.samples(self.name, _format_labels(self.labelnames, values)))
+        return lines
+
+
+class Counter(_Metric):
+    """Only goes up; by convention the name ends in _total."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+def timed(histogram) -> Callable:
+    """Decorator recording each call's duration in a histogram (or labelled child).
+
+    When collection is off the wrapper only checks a flag before calling
+    through, well under a microsecond.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class MetricsRegistry:
+    """Named metrics for one process, rendered in the Prometheus text format.
+
+    counter()/gauge()/histogram() return the existing metric when the name
+    is already registered, so modules (and Streamlit reruns of main.py) can
+    declare their metrics at import time.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name} "
+                                 f"with labels {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Serves a registry at http://host:port/metrics and/or rewrites a file.
+
+    The file is replaced atomically every `interval` seconds so a
+    node_exporter textfile collector never reads a half-written copy.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port: Optional[int] = None,
+                 path: Optional[str] = None, interval: float = DEFAULT_EXPORT_INTERVAL,
+                 host: str = "127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self.host = host
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """(host, port) actually bound; useful with port=0."""
+        return self._server.server_address[:2] if self._server is not None else None
+
+    def start(self):
+        self._stop.clear()
+        if self.port is not None:
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = registry.expose().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass  # scrapes every few seconds would flood the console
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever,
+                                                  name="metrics-http", daemon=True))
+        if self.path is not None:
+            self._threads.append(threading.Thread(target=self._run_file_writer,
+                                                  name="metrics-file", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.path is not None:
+            self.write_file()
+
+    def _run_file_writer(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write_file()
+            except Exception as e:
+                print(f"Error writing metrics file: {e}")
+
+    def write_file(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.expose())
+        os.replace(tmp_path, self.path)
+
+
+_shared_exporter = None
+_shared_exporter_checked = False
+_shared_exporter_lock = threading.Lock()
+
+
+def get_shared_exporter() -> Optional[MetricsExporter]:
+    """Start the process's exporter on first call, if one is configured.
+
+    VVAPP_METRICS_PORT serves /metrics on localhost; VVAPP_METRICS_FILE
+    rewrites that file every VVAPP_METRICS_INTERVAL seconds. None if
+    neither is set.
+    """
+    global _shared_exporter, _shared_exporter_checked
+    if not _shared_exporter_checked:
+        with _shared_exporter_lock:
+            if not _shared_exporter_checked:
+                port = os.environ.get("VVAPP_METRICS_PORT")
+                path = os.environ.get("VVAPP_METRICS_FILE")
+                if port or path:
+                    interval = float(os.environ.get("VVAPP_METRICS_INTERVAL", DEFAULT_EXPORT_INTERVAL))
+                    exporter = MetricsExporter(REGISTRY, int(port) if port else None, path or None,
+                                               interval)
+                    try:
+                        exporter.start()
+                        _shared_exporter = exporter
+                    except OSError as e:
+                        # Another server process already owns the port
+                        print(f"Error starting metrics exporter: {e}")
+                _shared_exporter_checked = True
+    return _shared_exporter
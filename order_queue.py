@@ -0,0 +1,122 @@
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+from journal import Journal, FSYNC_ALWAYS
+
+ORDER_QUEUE_FILE = "order_queue.journal"
+
+_shared_queue = None
+_shared_queue_lock = threading.Lock()
+
+
+def get_shared_order_queue() -> "OrderQueue":
+    """Return the one OrderQueue shared by every session in this process."""
+    global _shared_queue
+    if _shared_queue is None:
+        with _shared_queue_lock:
+            if _shared_queue is None:
+                _shared_queue = OrderQueue()
+    return _shared_queue
+
+
+class OrderQueue:
+    """FIFO of pending orders that survives restarts.
+
+    Order IDs sit in a deque and the orders themselves in a dict keyed by ID.
+    Removing an order by ID only drops it from the dict; its ID stays in the
+    deque as a tombstone that dequeue() skips, so every operation is O(1).
+    Each add/remove is one journal record, and the journal is rewritten
+    with just the live orders once it is mostly tombstones.
+    """
+
+    def __init__(self, path: str = ORDER_QUEUE_FILE, fsync_policy: str = FSYNC_ALWAYS,
+                 compact_every: int = 1000):
+        self.journal = Journal(path, fsync_policy)
+        self.compact_every = compact_every
+        self._ids: deque = deque()
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._recover()
+
+    def _recover(self):
+        for record in self.journal.replay():
+            if record["op"] == "add":
+                order = record["order"]
+                self._ids.append(order["order_id"])
+                self._orders[order["order_id"]] = order
+            elif record["op"] == "del":
+                self._orders.pop(record["id"], None)
+        # Tombstones left in the deque are skipped like any others
+        self._maybe_compact()
+
+    def _compact(self):
+        """Drop tombstones from the deque and rewrite the journal. Caller holds the lock."""
+        self._ids = deque(order_id for order_id in self._ids if order_id in self._orders)
+        self.journal.rewrite({"op": "add", "order": self._orders[order_id]}
+                             for order_id in self._ids)
+
+    def _maybe_compact(self):
+        if self.journal.entries >= self.compact_every and self.journal.entries > 2 * len(self._orders):
+            self._compact()
+
+    def enqueue(self, order: Dict[str, Any]) -> bool:
+        order_id = order["order_id"]
+        with self._lock:
+            if order_id in self._orders:
+                return False
+            self.journal.append({"op": "add", "order": order})
+            self._ids.append(order_id)
+            self._orders[order_id] = order
+        return True
+
+    def dequeue(self) -> Optional[Dict[str, Any]]:
+        """Remove and return the oldest pending order."""
+        with self._lock:
+            while self._ids:
+                order_id = self._ids.popleft()
+                if order_id in self._orders:
+                    return self._remove_locked(order_id)
+            return None
+
+    def remove(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Take a specific order out of the queue (to process or cancel it)."""
+        with self._lock:
+            if order_id not in self._orders:
+                return None
+            return self._remove_locked(order_id)
+
+    def _remove_locked(self, order_id: str) -> Dict[str, Any]:
+        self.journal.append({"op": "del", "id": order_id})
+        order = self._orders.pop(order_id)
+        self._maybe_compact()
+        return order
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self._orders.get(order_id)
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            while self._ids and self._ids[0] not in self._orders:
+                self._ids.popleft()
+            return self._orders[self._ids[0]] if self._ids else None
+
+    def list_orders(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Pending orders oldest first, optionally only the first `limit`."""
+        orders = []
+        with self._lock:
+            for order_id in self._ids:
+                order = self._orders.get(order_id)
+                if order is not None:
+                    orders.append(order)
+                    if limit is not None and len(orders) >= limit:
+                        break
+        return orders
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.list_orders())
+
+    def close(self):
+        self.journal.close()
@@ -1,42 +1,241 @@
+import asyncio
 import time
 import random
+import threading
+import uuid
+from collections import OrderedDict
+from id_generator import new_id
+from metrics import REGISTRY, timed
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+GATEWAY_TIMEOUT = "Payment Gateway Timeout"
+
+PaymentResult = Tuple[bool, str, Optional[str]]
+
+IDEMPOTENCY_TTL = 24 * 60 * 60   # seconds a settled key keeps answering repeats
+IDEMPOTENCY_MAX_KEYS = 10_000    # settled keys remembered at most
+
+PAYMENT_SECONDS = REGISTRY.histogram("vvapp_payment_seconds",
+                                     "Time to settle one payment, retries included")
+PAYMENTS_TOTAL = REGISTRY.counter("vvapp_payments_total", "Payments settled, by method and outcome",
+                                  ("method", "outcome"))
+
+_shared_processor = None
+_shared_processor_lock = threading.Lock()
+
+
+def get_shared_payment_processor() -> "PaymentProcessor":
+    """Return the one PaymentProcessor (and worker pool) shared by every session."""
+    global _shared_processor
+    if _shared_processor is None:
+        with _shared_processor_lock:
+            if _shared_processor is None:
+                _shared_processor = PaymentProcessor()
+    return _shared_processor
+
+
+class _IdempotencyCache:
+    """Futures by idempotency key, oldest first, for at most `ttl` seconds.
+
+    Settled entries older than `ttl`, or beyond the newest `max_keys`, are
+    dropped whenever a key is added. A Future that is still pending is
+    never dropped, so a repeat can always join an in-flight charge.
+    Callers hold their own lock around every method.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, max_keys: int = IDEMPOTENCY_MAX_KEYS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Future]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Future]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        added, future = entry
+        if future.done() and self._clock() - added > self.ttl:
+            del self._entries[key]
+            return None
+        return future
+
+    def add(self, key: str, future: Future):
+        now = self._clock()
+        self._entries[key] = (now, future)
+        self._entries.move_to_end(key)
+        while self._entries:
+            oldest, (added, pending) = next(iter(self._entries.items()))
+            if not pending.done() or (now - added <= self.ttl and len(self._entries) <= self.max_keys):
+                break
+            del self._entries[oldest]
+
+    def discard(self, key: str, future: Future):
+        """Drop `key` if it still maps to `future`."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is future:
+            del self._entries[key]
+
+
+class MockGateway:
+    """Local stand-in for Stripe/Razorpay with configurable latency and failures.
+
+    Charges are idempotent per key: a repeated key joins the in-flight call
+    or, for `idempotency_ttl` seconds, returns the earlier success instead
+    of charging again.
+    """
+
+    def __init__(self, latency: float = 1.5, failure_rate: float = 0.05, seed: Optional[int] = None,
+                 idempotency_ttl: float = IDEMPOTENCY_TTL, clock: Callable[[], float] = time.monotonic):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.charge_count = 0  # calls that actually reached the "bank"
+        self._random = random.Random(seed)
+        self._charges = _IdempotencyCache(idempotency_ttl, clock=clock)
+        self._lock = threading.Lock()
+
+    def charge(self, amount: float, method: str, idempotency_key: str) -> PaymentResult:
+        with self._lock:
+            pending = self._charges.get(idempotency_key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._charges.add(idempotency_key, pending)
+        if not owner:
+            return pending.result()
+
+        try:
+            # Simulate network delay for effect
+            time.sleep(self.latency)
+            with self._lock:
+                self.charge_count += 1
+                failed = method != "Cash" and self._random.random() < self.failure_rate
+
+            # Generate a fake transaction ID
+            transaction_id = new_id("TXN")
+
+            if method == "Cash":
+                result = (True, "Cash payment recorded. Please collect cash from customer.", transaction_id)
+            elif failed:
+                result = (False, GATEWAY_TIMEOUT, None)
+            else:
+                result = (True, "Payment Successful", transaction_id)
+        except Exception as e:
+            result = (False, f"Gateway error: {e}", None)
+
+        if not result[0]:
+            # Only successful charges are remembered; a failed key may be retried
+            with self._lock:
+                self._charges.discard(idempotency_key, pending)
+        pending.set_result(result)
+        return result
+
 
 class PaymentProcessor:
-    def __init__(self):
+    def __init__(self, gateway: Optional[MockGateway] = None, max_workers: int = 4,
+                 timeout: float = 5.0, max_retries: int = 2, backoff: float = 0.5,
+                 idempotency_ttl: float = IDEMPOTENCY_TTL, clock: Callable[[], float] = time.monotonic):
         # In a real app, this would connect to Stripe/Razorpay/Auth.net
         self.supported_methods = ["Credit Card", "UPI", "Cash"]
+        self.gateway = gateway if gateway is not None else MockGateway()
+        self.timeout = timeout          # seconds allowed per gateway call
+        self.max_retries = max_retries  # extra attempts after a gateway timeout
+        self.backoff = backoff          # first retry delay, doubled each time
+        # Requests run on one bounded pool; each gateway call runs on another
+        # so a hung call can be abandoned after `timeout`.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="payment")
+        self._gateway_executor = ThreadPoolExecutor(max_workers=max_workers * 2,
+                                                    thread_name_prefix="gateway")
+        self._requests = _IdempotencyCache(idempotency_ttl, clock=clock)
+        self._lock = threading.Lock()
 
-    def process_payment(self, amount, method, details):
-        """
-        Simulate processing a payment.
-        Returns (success: bool, message: str, transaction_id: str)
-        """
+    def validate(self, method: str, details: Dict[str, Any]) -> Optional[str]:
+        """Return an error message, or None if the details look valid."""
         if method not in self.supported_methods:
-            return False, "Invalid payment method", None
-
-        # Simulate network delay for effect
-        time.sleep(1.5)
-
-        # Generate a fake transaction ID
-        transaction_id = f"TXN_{int(time.time())}_{random.randint(1000, 9999)}"
-
-        if method == "Cash":
-            return True, "Cash payment recorded. Please collect cash from customer.", transaction_id
+            return "Invalid payment method"
 
         # Simulate simple validation
         if method == "Credit Card":
             if not details.get("card_number") or len(details.get("card_number")) < 12:
-                return False, "Invalid Card Number", None
+                return "Invalid Card Number"
             if not details.get("cvv") or len(details.get("cvv")) != 3:
-                return False, "Invalid CVV", None
-            
+                return "Invalid CVV"
+
         elif method == "UPI":
             if not details.get("upi_id") or "@" not in details.get("upi_id"):
-                return False, "Invalid UPI ID", None
+                return "Invalid UPI ID"
+        return None
+
+    def submit_payment(self, amount: float, method: str, details: Dict[str, Any],
+                       idempotency_key: Optional[str] = None) -> Future:
+        """Start a payment without blocking; the Future yields
+        (success: bool, message: str, transaction_id: str).
 
-        # Randomly fail 10% of online transactions to simulate real world issues
-        # (Optional: can remove this for smoother demo if desired, effectively 100% success)
-        if random.random() < 0.05: 
-             return False, "Payment Gateway Timeout", None
+        Submitting the same idempotency key again returns the same Future
+        while it is pending or for `idempotency_ttl` seconds after it
+        succeeded, so it never charges twice within that window.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        with self._lock:
+            existing = self._requests.get(key)
+            if existing is not None:
+                return existing
+
+            error = self.validate(method, details)
+            if error is not None:
+                future = Future()
+                future.set_result((False, error, None))
+                return future
+
+            future = self._executor.submit(self._charge_with_retries, amount, method, key)
+            self._requests.add(key, future)
+        future.add_done_callback(lambda f: self._forget_failure(key, f))
+        return future
+
+    def _forget_failure(self, key: str, future: Future):
+        if future.cancelled() or future.exception() is not None or not future.result()[0]:
+            with self._lock:
+                self._requests.discard(key, future)
+
+    @timed(PAYMENT_SECONDS)
+    def _charge_with_retries(self, amount: float, method: str, key: str) -> PaymentResult:
+        result = self._charge_attempts(amount, method, key)
+        PAYMENTS_TOTAL.labels(method, "success" if result[0] else "failure").inc()
+        return result
+
+    def _charge_attempts(self, amount: float, method: str, key: str) -> PaymentResult:
+        result = (False, GATEWAY_TIMEOUT, None)
+        for attempt in range(self.max_retries + 1):
+            call = self._gateway_executor.submit(self.gateway.charge, amount, method, key)
+            try:
+                result = call.result(timeout=self.timeout)
+            except FutureTimeout:
+                # The call may still land; retrying with the same key joins it
+                result = (False, GATEWAY_TIMEOUT, None)
+            if result[0] or result[1] != GATEWAY_TIMEOUT:
+                return result
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt))
+        return result
+
+    async def process_payment_async(self, amount: float, method: str, details: Dict[str, Any],
+                                    idempotency_key: Optional[str] = None) -> PaymentResult:
+        """asyncio flavour of submit_payment; awaiting never blocks the loop."""
+        return await asyncio.wrap_future(
+            self.submit_payment(amount, method, details, idempotency_key)
+        )
+
+    def process_payment(self, amount, method, details, idempotency_key=None):
+        """
+        Process a payment and wait for the result.
+        Returns (success: bool, message: str, transaction_id: str)
+        """
+        return self.submit_payment(amount, method, details, idempotency_key).result()
 
-        return True, "Payment Successful", transaction_id
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        self._gateway_executor.shutdown(wait=wait)
@@ -0,0 +1,194 @@
+import contextlib
+import cProfile
+import itertools
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_SAMPLE_EVERY = 10   # profile one rerun in this many
+DEFAULT_KEEP = 20           # .pstats files kept per page
+TOP_ALLOCATIONS = 15        # lines listed in each page's allocation report
+TRACE_FRAMES = 1            # tracemalloc frames per allocation; more is slower
+
+# Allocations made by the profiler itself or the import machinery
+_IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, contextlib.__file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _safe_page(page: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", page or "unknown")
+
+
+class PageStats:
+    """What the sampled reruns of one page have cost so far."""
+
+    __slots__ = ("samples", "total_seconds", "max_seconds", "peak_bytes", "allocations")
+
+    def __init__(self):
+        self.samples = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.peak_bytes = 0
+        self.allocations: Dict[str, List[int]] = {}  # "file:line" -> [bytes, blocks] summed over samples
+
+
+class RerunProfiler:
+    """cProfile + tracemalloc around every `sample_every`-th Streamlit rerun.
+
+    Each sampled rerun writes <out_dir>/<page>/<timestamp>_<n>.pstats,
+    which snakeviz, flameprof or gprof2dot turn into call graphs and
+    flame graphs; only the newest `keep` files per page are kept. The
+    allocations still alive at the end of each sample are summed per
+    source line into <out_dir>/<page>/allocations.txt.
+
+    Only one rerun is profiled at a time; a sample that comes due while
+    another session is being profiled is skipped. tracemalloc sees the
+    whole process, so allocations by other sessions' threads during a
+    sample are counted too.
+    """
+
+    def __init__(self, out_dir: str = DEFAULT_PROFILE_DIR, sample_every: int = DEFAULT_SAMPLE_EVERY,
+                 keep: int = DEFAULT_KEEP, top_allocations: int = TOP_ALLOCATIONS):
+        self.out_dir = out_dir
+        self.sample_every = max(1, sample_every)
+        self.keep = keep
+        self.top_allocations = top_allocations
+        self.skipped = 0
+        self.pages: Dict[str, PageStats] = {}
+        self._reruns = itertools.count(1)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, page: str):
+        """Wrap one rerun; profiles it if it is due and nothing else is being profiled."""
+        if next(self._reruns) % self.sample_every:
+            yield
+            return
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            yield
+            return
+        try:
+            owns_tracing = not tracemalloc.is_tracing()
+            if owns_tracing:
+                tracemalloc.start(TRACE_FRAMES)
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                # Also on st.rerun()/st.stop(), which unwind main() with an exception
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_ALLOCATIONS)
+                peak = tracemalloc.get_traced_memory()[1]
+                if owns_tracing:
+                    tracemalloc.stop()
+                try:
+                    self._record(_safe_page(page), profiler, snapshot, elapsed, peak)
+                except Exception as e:
+                    print(f"Error writing profile for {page}: {e}")
+        finally:
+            self._busy.release()
+
+    def _record(self, page: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot,
+                elapsed: float, peak: int):
+        page_dir = os.path.join(self.out_dir, page)
+        os.makedirs(page_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        with self._lock:
+            stats = self.pages.setdefault(page, PageStats())
+            stats.samples += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+            for stat in snapshot.statistics("lineno"):
+                frame = stat.traceback[0]
+                totals = stats.allocations.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+                totals[0] += stat.size
+                totals[1] += stat.count
+            sample_number = stats.samples
+            report = self.page_report(page)
+
+        profiler.dump_stats(os.path.join(page_dir, f"{stamp}_{sample_number:06d}.pstats"))
+        self._prune(page_dir)
+        tmp_path = os.path.join(page_dir, "allocations.txt.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(report)
+        os.replace(tmp_path, os.path.join(page_dir, "allocations.txt"))
+
+    def _prune(self, page_dir: str):
+        """Keep the newest `keep` .pstats files; names sort oldest first."""
+        files = sorted(name for name in os.listdir(page_dir) if name.endswith(".pstats"))
+        for name in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(page_dir, name))
+            except OSError:
+                pass  # another process pruned it first
+
+    def page_report(self, page: str) -> str:
+        """Timing summary and top allocating lines for one page."""
+        stats = self.pages.get(page)
+        if stats is None or not stats.samples:
+            return f"{page}: no samples\n"
+        lines = [
+            f"Page: {page}",
+            f"Sampled reruns: {stats.samples} (every {self.sample_every})",
+            f"Rerun time: avg {stats.total_seconds / stats.samples * 1000:.1f}ms, "
+            f"max {stats.max_seconds * 1000:.1f}ms",
+            f"Peak traced memory: {stats.peak_bytes / 1024:.1f} KiB",
+            f"Top {self.top_allocations} allocating lines (live at end of rerun, avg per sample):",
+        ]
+        top = sorted(stats.allocations.items(), key=lambda item: item[1][0], reverse=True)
+        for location, (size, count) in top[:self.top_allocations]:
+            lines.append(f"  {size / stats.samples / 1024:>10.1f} KiB  {count / stats.samples:>9.1f} blocks  {location}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        """page_report() for every page sampled so far."""
+        with self._lock:
+            return "\n".join(self.page_report(page) for page in sorted(self.pages))
+
+
+_shared_profiler = None
+_shared_profiler_checked = False
+_shared_profiler_lock = threading.Lock()
+
+
+def get_shared_profiler() -> Optional[RerunProfiler]:
+    """The process's RerunProfiler, or None unless VVAPP_PROFILE=1.
+
+    VVAPP_PROFILE_EVERY, VVAPP_PROFILE_DIR and VVAPP_PROFILE_KEEP override
+    the sampling rate, output directory and files kept per page.
+    """
+    global _shared_profiler, _shared_profiler_checked
+    if not _shared_profiler_checked:
+        with _shared_profiler_lock:
+            if not _shared_profiler_checked:
+                if os.environ.get("VVAPP_PROFILE") == "1":
+                    _shared_profiler = RerunProfiler(
+                        os.environ.get("VVAPP_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+                        int(os.environ.get("VVAPP_PROFILE_EVERY", DEFAULT_SAMPLE_EVERY)),
+                        int(os.environ.get("VVAPP_PROFILE_KEEP", DEFAULT_KEEP)))
+                _shared_profiler_checked = True
+    return _shared_profiler
+
+
+def profile_rerun(page: str):
+    """Context manager for one rerun of `page`; does nothing unless profiling is on."""
+    profiler = get_shared_profiler()
+    return profiler.profile(page) if profiler is not None else nullcontext()
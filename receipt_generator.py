@@ -1,6 +1,140 @@
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, TextIO, Tuple
 import json
+from jsonl_export import write_jsonl, read_jsonl
+from metrics import REGISTRY, timed
+import threading
+import time
+from functools import lru_cache
+
+_MISSING = object()
+
+RECEIPT_SECONDS = REGISTRY.histogram("vvapp_generate_receipt_seconds", "Time to render one receipt")
+
+
+@lru_cache(maxsize=8192)
+def _display_name(name: str) -> str:
+    """'Sweet_Potato' -> 'Sweet Potato', cut to fit the 20-char ITEM column."""
+    name = name.replace('_', ' ').title()
+    if len(name) > 18:
+        name = name[:15] + "..."
+    return name
+
+
+def _format_timestamp(timestamp: Any) -> str:
+    if isinstance(timestamp, str):
+        try:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return timestamp
+        # A valid ISO string already holds the digits we print; slicing
+        # them out is much cheaper than strftime.
+        if len(timestamp) >= 19 and timestamp[10] in "T ":
+            return f"{timestamp[:10]} {timestamp[11:19]}"
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    return str(timestamp)
+
+
+class ReceiptTemplate:
+    """The constant parts of a receipt, built once per store configuration."""
+
+    _cache: Dict[Tuple[str, str, str, float], "ReceiptTemplate"] = {}
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def for_store(cls, name: str, address: str, phone: str, tax_rate: float) -> "ReceiptTemplate":
+        key = (name, address, phone, tax_rate)
+        template = cls._cache.get(key)
+        if template is None:
+            with cls._cache_lock:
+                template = cls._cache.setdefault(key, cls(name, address, phone, tax_rate))
+        return template
+
+    def __init__(self, name: str, address: str, phone: str, tax_rate: float):
+        self.tax_rate = tax_rate
+        self.header = "\n".join([
+            "=" * 50,
+            f"{name:^50}",
+            f"{address:^50}",
+            f"Phone: {phone:^44}",
+            "=" * 50,
+            "",
+            ""
+        ])
+        self.columns = "\n".join([
+            f"Cashier: Vendor System",
+            "",
+            "-" * 50,
+            f"{'ITEM':<20} {'QTY':<8} {'RATE':<8} {'AMOUNT':<12}",
+            "-" * 50,
+            ""
+        ])
+        self.item_line = "{:<20} {:<8.1f} {:<8.0f} {:<12.2f}\n".format
+        self.subtotal_label = f"{'Subtotal:':<38} ₹"
+        self.tax_label = f"{f'Tax ({tax_rate * 100:g}%):':<38} ₹"
+        self.rule = "=" * 50
+        self.total_label = f"{'TOTAL AMOUNT:':<38} ₹"
+        self.payment_label = f"{'Payment Method:':<20} Cash\n{'Amount Paid:':<20} ₹"
+        self.change_line = f"{'Change:':<20} ₹0.00"
+        self.footer = "\n".join([
+            "-" * 50,
+            "Thank you for shopping with us!",
+            "Fresh vegetables, fresh prices!",
+            "",
+            "* Please check your items before leaving",
+            "* No returns on perishable items",
+            "* Have a great day!",
+            "",
+            "Receipt generated on: "
+        ])
+        self._stamp_second = None
+        self._stamp = ""
+
+    def _generated_stamp(self) -> str:
+        """strftime of now, recomputed at most once per second."""
+        second = int(time.time())
+        if second != self._stamp_second:
+            self._stamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._stamp_second = second
+        return self._stamp
+
+    def render(self, order_data: Dict[str, Any]) -> str:
+        order_id = order_data.get('order_id', 'N/A')
+        timestamp = order_data.get('timestamp', _MISSING)
+        if timestamp is _MISSING:
+            timestamp = datetime.now().isoformat()
+
+        parts = [
+            self.header,
+            f"Order ID: {order_id}\nDate & Time: {_format_timestamp(timestamp)}\n",
+            self.columns
+        ]
+
+        subtotal = 0
+        item_line = self.item_line
+        for item in order_data.get('items', {}).values():
+            quantity = item.get('quantity', 0)
+            price = item.get('price', 0)
+            amount = quantity * price
+            subtotal += amount
+            parts.append(item_line(_display_name(item.get('name', 'Unknown')), quantity, price, amount))
+
+        tax_amount = subtotal * self.tax_rate
+        total_amount = subtotal + tax_amount
+
+        parts.append(
+            f"{'-' * 50}\n"
+            f"{self.subtotal_label}{subtotal:>9.2f}\n"
+            f"{self.tax_label}{tax_amount:>9.2f}\n"
+            f"{self.rule}\n"
+            f"{self.total_label}{total_amount:>9.2f}\n"
+            f"{self.rule}\n\n"
+            f"{self.payment_label}{total_amount:.2f}\n"
+            f"{self.change_line}\n\n"
+            f"{self.footer}{self._generated_stamp()}\n"
+            f"{self.rule}"
+        )
+        return "".join(parts)
 
 
 class ReceiptGenerator:
@@ -10,95 +144,42 @@ class ReceiptGenerator:
         self.store_phone = "+91-9876543210"
         self.tax_rate = 0.05  # 5% tax
 
+    @property
+    def template(self) -> ReceiptTemplate:
+        """Precompiled template for the current store details."""
+        return ReceiptTemplate.for_store(self.store_name, self.store_address,
+                                         self.store_phone, self.tax_rate)
+
+    @timed(RECEIPT_SECONDS)
     def generate_receipt(self, order_data: Dict[str, Any]) -> str:
         try:
-            receipt_lines = []
-
-            receipt_lines.extend([
-                "=" * 50,
-                f"{self.store_name:^50}",
-                f"{self.store_address:^50}",
-                f"Phone: {self.store_phone:^44}",
-                "=" * 50,
-                ""
-            ])
-
-            order_id = order_data.get('order_id', 'N/A')
-            timestamp = order_data.get('timestamp', datetime.now().isoformat())
-
-            if isinstance(timestamp, str):
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    formatted_time = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    formatted_time = timestamp
-            else:
-                formatted_time = str(timestamp)
-
-            receipt_lines.extend([
-                f"Order ID: {order_id}",
-                f"Date & Time: {formatted_time}",
-                f"Cashier: Vendor System",
-                "",
-                "-" * 50,
-                f"{'ITEM':<20} {'QTY':<8} {'RATE':<8} {'AMOUNT':<12}",
-                "-" * 50
-            ])
-
-            subtotal = 0
-            items = order_data.get('items', {})
-
-            for item_id, item in items.items():
-                name = item.get('name', 'Unknown').replace('_', ' ').title()
-                quantity = item.get('quantity', 0)
-                price = item.get('price', 0)
-                amount = quantity * price
-                subtotal += amount
-
-                if len(name) > 18:
-                    name = name[:15] + "..."
-
-                receipt_lines.append(
-                    f"{name:<20} {quantity:<8.1f} {price:<8.0f} {amount:<12.2f}"
-                )
-
-            tax_amount = subtotal * self.tax_rate
-            total_amount = subtotal + tax_amount
-
-            receipt_lines.extend([
-                "-" * 50,
-                f"{'Subtotal:':<38} ₹{subtotal:>9.2f}",
-                f"{'Tax (5%):':<38} ₹{tax_amount:>9.2f}",
-                "=" * 50,
-                f"{'TOTAL AMOUNT:':<38} ₹{total_amount:>9.2f}",
-                "=" * 50,
-                ""
-            ])
-
-            receipt_lines.extend([
-                f"{'Payment Method:':<20} Cash",
-                f"{'Amount Paid:':<20} ₹{total_amount:.2f}",
-                f"{'Change:':<20} ₹0.00",
-                ""
-            ])
+            return self.template.render(order_data)
+        except Exception as e:
+            return f"Error generating receipt: {str(e)}"
 
-            receipt_lines.extend([
-                "-" * 50,
-                "Thank you for shopping with us!",
-                "Fresh vegetables, fresh prices!",
-                "",
-                "* Please check your items before leaving",
-                "* No returns on perishable items",
-                "* Have a great day!",
-                "",
-                f"Receipt generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                "=" * 50
-            ])
+    def write_receipts(self, orders: Iterable[Dict[str, Any]], stream: TextIO,
+                       separator: str = "\n\n") -> int:
+        """Render each order straight to `stream`; returns the number written.
 
-            return "\n".join(receipt_lines)
+        Orders are consumed one at a time, so a generator of a whole day's
+        orders never has to sit in memory.
+        """
+        template = self.template
+        count = 0
+        for order_data in orders:
+            if count:
+                stream.write(separator)
+            try:
+                stream.write(template.render(order_data))
+            except Exception as e:
+                stream.write(f"Error generating receipt: {str(e)}")
+            count += 1
+        return count
 
-        except Exception as e:
-            return f"Error generating receipt: {str(e)}"
+    def export_receipts_text(self, orders: Iterable[Dict[str, Any]], path: str) -> int:
+        """Write every receipt to a text file, e.g. for end-of-day archiving."""
+        with open(path, 'w', encoding='utf-8') as f:
+            return self.write_receipts(orders, f)
 
     def generate_simple_receipt(self, order_data: Dict[str, Any]) -> str:
         try:
@@ -133,8 +214,8 @@ class ReceiptGenerator:
         except Exception:
             return "Error generating simple receipt"
 
-    def export_receipt_data(self, order_data: Dict[str, Any]) -> str:
-        receipt_data = {
+    def receipt_record(self, order_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "store_info": {
                 "name": self.store_name,
                 "address": self.store_address,
@@ -145,7 +226,17 @@ class ReceiptGenerator:
             "tax_rate": self.tax_rate
         }
 
-        return json.dumps(receipt_data, indent=2)
+    def export_receipt_data(self, order_data: Dict[str, Any]) -> str:
+        return json.dumps(self.receipt_record(order_data), indent=2)
+
+    def export_receipts_jsonl(self, orders: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+        """Stream one compact receipt record per order (see jsonl_export.open_jsonl)."""
+        return write_jsonl((self.receipt_record(order) for order in orders), stream)
+
+    @staticmethod
+    def iter_receipts_jsonl(stream: TextIO) -> Iterator[Dict[str, Any]]:
+        """Read back receipt records written by export_receipts_jsonl, one at a time."""
+        return read_jsonl(stream)
 
     def calculate_totals(self, items: Dict[str, Any]) -> Dict[str, float]:
         subtotal = sum(item.get('quantity', 0) * item.get('price', 0)
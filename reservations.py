@@ -0,0 +1,223 @@
+import heapq
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from vegetable_database import VegetableDatabase, get_shared_database
+
+DEFAULT_HOLD_TTL = 900.0  # seconds a cart holds stock without activity
+
+_shared_reservations = None
+_shared_reservations_lock = threading.Lock()
+
+
+def get_shared_reservations() -> "ReservationManager":
+    """Return the one running ReservationManager for this process.
+
+    VVAPP_CART_TTL sets how long an idle cart keeps its stock (seconds).
+    """
+    global _shared_reservations
+    if _shared_reservations is None:
+        with _shared_reservations_lock:
+            if _shared_reservations is None:
+                ttl = float(os.environ.get("VVAPP_CART_TTL", DEFAULT_HOLD_TTL))
+                reservations = ReservationManager(get_shared_database(), ttl=ttl)
+                reservations.start()
+                _shared_reservations = reservations
+    return _shared_reservations
+
+
+class Hold:
+    """Stock one cart has taken out of the inventory, by item name."""
+
+    __slots__ = ("hold_id", "lines", "expires_at")
+
+    def __init__(self, hold_id: str, expires_at: float):
+        self.hold_id = hold_id
+        self.lines: Dict[str, float] = {}
+        self.expires_at = expires_at
+
+
+class ReservationManager:
+    """Time-limited holds on stock for carts that have not checked out yet.
+
+    reserve() takes stock from the database straight away, as adding to the
+    cart always did, but the hold expires `ttl` seconds after the cart's
+    last activity. Expiry times sit in a min-heap; renew() only moves the
+    hold's deadline, and the sweeper re-queues an entry it finds was
+    renewed, so renewals are O(1) and each sweep costs O(log n) per
+    expired hold. All holds that expire in one sweep go back to stock in a
+    single return_stock_many batch.
+    """
+
+    def __init__(self, db: VegetableDatabase, ttl: float = DEFAULT_HOLD_TTL,
+                 sweep_interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.db = db
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.expired_count = 0
+        self._holds: Dict[str, Hold] = {}
+        self._heap: List[Tuple[float, int, Hold]] = []
+        self._pushes = 0  # heap tie-breaker
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping expired reservations: {e}")
+
+    def _touch(self, hold_id: str) -> Hold:
+        """Get or create the hold and push its deadline out. Caller holds the lock."""
+        expires_at = self.clock() + self.ttl
+        hold = self._holds.get(hold_id)
+        if hold is None:
+            hold = Hold(hold_id, expires_at)
+            self._holds[hold_id] = hold
+            self._push(hold)
+        else:
+            hold.expires_at = expires_at
+        return hold
+
+    def _push(self, hold: Hold):
+        self._pushes += 1
+        heapq.heappush(self._heap, (hold.expires_at, self._pushes, hold))
+
+    def reserve(self, hold_id: str, name: str, quantity: float) -> bool:
+        """Take stock for a cart. False if there isn't enough."""
+        if not self.db.update_stock(name, quantity):
+            return False
+        with self._lock:
+            hold = self._touch(hold_id)
+            hold.lines[name] = hold.lines.get(name, 0.0) + quantity
+        return True
+
+    def release(self, hold_id: str, name: str, quantity: float) -> bool:
+        """Give back part of a hold, e.g. when one cart line is removed."""
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            held = hold.lines.get(name, 0.0) if hold is not None else 0.0
+            if held <= 0:
+                return False
+            quantity = min(quantity, held)
+            if held - quantity > 1e-9:
+                hold.lines[name] = held - quantity
+            else:
+                del hold.lines[name]
+            self._touch(hold_id)
+        return self.db.return_stock(name, quantity)
+
+    def release_all(self, hold_id: str) -> bool:
+        """Give back everything a cart holds (clear cart)."""
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+        if hold is None or not hold.lines:
+            return False
+        return self.db.return_stock_many(hold.lines.items())
+
+    def commit(self, hold_id: str) -> bool:
+        """The cart became an order: its stock stays sold and the hold ends.
+
+        False means the hold had already expired and its stock was returned.
+        """
+        with self._lock:
+            return self._holds.pop(hold_id, None) is not None
+
+    def checkout(self, hold_id: str, lines: Iterable[Tuple[str, float]]) -> bool:
+        """End the hold and keep exactly the cart's (name, quantity) lines sold.
+
+        The hold may not cover the cart: it can lapse and hand its stock
+        back, and a later reserve() under the same ID then opens a fresh
+        hold with only the newer lines. Whatever the cart has beyond what
+        is held is taken again, all or nothing, and anything held beyond
+        the cart goes back. False means the missing stock has gone since;
+        the hold's own stock is returned too and nothing stays taken.
+        """
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+        held: Dict[str, Tuple[str, float]] = {}
+        if hold is not None:
+            for name, quantity in hold.lines.items():
+                key = name.lower()
+                held[key] = (name, held.get(key, (name, 0.0))[1] + quantity)
+        wanted: Dict[str, Tuple[str, float]] = {}
+        for name, quantity in lines:
+            key = name.lower()
+            wanted[key] = (name, wanted.get(key, (name, 0.0))[1] + quantity)
+
+        missing = [(name, quantity - held.get(key, (name, 0.0))[1])
+                   for key, (name, quantity) in wanted.items()
+                   if quantity - held.get(key, (name, 0.0))[1] > 1e-9]
+        extra = [(name, quantity - wanted.get(key, (name, 0.0))[1])
+                 for key, (name, quantity) in held.items()
+                 if quantity - wanted.get(key, (name, 0.0))[1] > 1e-9]
+        if missing and not self.db.update_stock_many(missing):
+            if held:
+                self.db.return_stock_many(held.values())
+            return False
+        if extra:
+            self.db.return_stock_many(extra)
+        return True
+
+    def renew(self, hold_id: str) -> bool:
+        """Record cart activity. False if the cart holds nothing (or expired)."""
+        with self._lock:
+            if hold_id not in self._holds:
+                return False
+            self._touch(hold_id)
+            return True
+
+    def is_active(self, hold_id: str) -> bool:
+        return hold_id in self._holds
+
+    def get_held(self, hold_id: str) -> Dict[str, float]:
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            return dict(hold.lines) if hold is not None else {}
+
+    def seconds_left(self, hold_id: str) -> Optional[float]:
+        hold = self._holds.get(hold_id)
+        return max(0.0, hold.expires_at - self.clock()) if hold is not None else None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Expire every hold past its deadline; returns how many expired."""
+        if now is None:
+            now = self.clock()
+        expired: List[Hold] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, hold = heapq.heappop(self._heap)
+                if self._holds.get(hold.hold_id) is not hold:
+                    continue  # released or committed since it was queued
+                if hold.expires_at > now:
+                    self._push(hold)  # renewed since it was queued
+                    continue
+                del self._holds[hold.hold_id]
+                expired.append(hold)
+            self.expired_count += len(expired)
+
+        totals: Dict[str, float] = {}
+        for hold in expired:
+            for name, quantity in hold.lines.items():
+                totals[name] = totals.get(name, 0.0) + quantity
+        if totals:
+            self.db.return_stock_many(totals.items())
+        return len(expired)
@@ -0,0 +1,338 @@
+import heapq
+import threading
+from array import array
+from datetime import date, datetime, time as dtime
+from typing import Any, Dict, List, Optional, Tuple
+from journal import Journal, FSYNC_ALWAYS
+
+SALES_LEDGER_FILE = "sales_ledger.journal"
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+
+STORE = ("store", "")  # rollup scope for store-wide totals
+
+HOURLY_RETENTION_DAYS = 14   # hourly buckets, order lines and order IDs kept this long
+DAILY_RETENTION_DAYS = 730   # daily buckets kept this long
+COMPACT_EVERY = 5000         # journal records before it is replaced by a snapshot
+
+_shared_ledger = None
+_shared_ledger_lock = threading.Lock()
+
+
+def get_shared_sales_ledger() -> "SalesLedger":
+    """Return the one SalesLedger shared by every session in this process."""
+    global _shared_ledger
+    if _shared_ledger is None:
+        with _shared_ledger_lock:
+            if _shared_ledger is None:
+                _shared_ledger = SalesLedger()
+    return _shared_ledger
+
+
+def _buckets(when: datetime) -> Dict[str, int]:
+    """Local-time hour and day bucket numbers for a sale."""
+    day = when.toordinal()
+    return {HOUR: day * 24 + when.hour, DAY: day}
+
+
+def _bucket_label(granularity: str, bucket: int) -> str:
+    if granularity == DAY:
+        return date.fromordinal(bucket).isoformat()
+    return datetime.combine(date.fromordinal(bucket // 24), dtime(bucket % 24)).strftime("%Y-%m-%d %H:00")
+
+
+class SalesLedger:
+    """Append-only record of every completed order line.
+
+    Lines are kept column-wise in compact arrays (timestamp, item code,
+    quantity, revenue) and persisted as one journal record per order.
+    Every sale also bumps running totals per item and per category, and
+    hourly/daily buckets for the store, each item and each category, so
+    trends and top sellers never re-scan the history.
+
+    Only the last `hourly_retention_days` of order lines, hourly buckets
+    and order IDs (for duplicate checks) are kept, and daily buckets for
+    `daily_retention_days`, counted back from the newest sale; all-time
+    totals are kept in full. Orders dated before that window are refused,
+    so recording stays idempotent per order ID. Once the journal holds `compact_every`
+    records it is replaced by one snapshot of that state, so startup
+    replays a bounded file.
+
+    Payments taken for orders that could not be completed are journaled
+    as refunds due, and stay listed until settle_refund() is called.
+    """
+
+    def __init__(self, path: str = SALES_LEDGER_FILE, fsync_policy: str = FSYNC_ALWAYS,
+                 hourly_retention_days: int = HOURLY_RETENTION_DAYS,
+                 daily_retention_days: int = DAILY_RETENTION_DAYS, compact_every: int = COMPACT_EVERY):
+        self.journal = Journal(path, fsync_policy)
+        self.hourly_retention_days = hourly_retention_days
+        self.daily_retention_days = daily_retention_days
+        self.compact_every = compact_every
+        self.timestamps = array('d')
+        self.item_codes = array('I')
+        self.quantities = array('d')
+        self.revenues = array('d')
+        self._item_names: List[str] = []
+        self._item_categories: List[str] = []
+        self._item_codes: Dict[str, int] = {}
+        self._order_ids: Dict[str, float] = {}  # order ID -> sale timestamp, oldest first
+        self.order_total = 0
+        self.line_total = 0
+        self.version = 0  # bumps on every recorded order
+        self._pruned_day = 0  # newest sale day the retention window was applied for
+        self._item_totals: Dict[str, List[float]] = {}
+        self._category_totals: Dict[str, List[float]] = {}
+        self._rollups: Dict[str, Dict[Tuple[Tuple[str, str], int], List[float]]] = {
+            granularity: {} for granularity in GRANULARITIES
+        }
+        self._refunds_due: Dict[str, Dict[str, Any]] = {}  # transaction ID -> refund, oldest first
+        self._lock = threading.Lock()
+        for record in self.journal.replay():
+            if "snapshot" in record:
+                self._load_snapshot(record["snapshot"])
+            elif "refund" in record:
+                self._refunds_due[record["refund"]["transaction_id"]] = record["refund"]
+            elif "settled" in record:
+                self._refunds_due.pop(record["settled"], None)
+            else:
+                self._apply(record)
+        if self.journal.entries >= self.compact_every:
+            self._compact()
+
+    def _code_for(self, name: str, category: str) -> int:
+        code = self._item_codes.get(name)
+        if code is None:
+            code = len(self._item_names)
+            self._item_codes[name] = code
+            self._item_names.append(name)
+            self._item_categories.append(category)
+        return code
+
+    def _apply(self, record: Dict[str, Any]):
+        """Fold one order record into the columns and rollups. Caller holds the lock."""
+        when = datetime.fromisoformat(record["t"])
+        stamp = when.timestamp()
+        buckets = _buckets(when)
+        self._order_ids[record["o"]] = stamp
+        self.order_total += 1
+        self.line_total += len(record["l"])
+        self.version += 1
+        for name, category, quantity, revenue in record["l"]:
+            self.timestamps.append(stamp)
+            self.item_codes.append(self._code_for(name, category))
+            self.quantities.append(quantity)
+            self.revenues.append(revenue)
+
+            for totals, key in ((self._item_totals, name), (self._category_totals, category)):
+                entry = totals.setdefault(key, [0.0, 0.0])
+                entry[0] += quantity
+                entry[1] += revenue
+
+            for granularity, bucket in buckets.items():
+                rollup = self._rollups[granularity]
+                for scope in (STORE, ("item", name), ("category", category)):
+                    entry = rollup.setdefault((scope, bucket), [0.0, 0.0])
+                    entry[0] += quantity
+                    entry[1] += revenue
+
+        if buckets[DAY] > self._pruned_day:
+            self._prune(buckets[DAY])
+
+    def _prune(self, day: int):
+        """Drop what has fallen out of the retention windows ending on `day`. Caller holds the lock."""
+        self._pruned_day = day
+        for granularity, cutoff in ((HOUR, (day - self.hourly_retention_days) * 24),
+                                    (DAY, day - self.daily_retention_days)):
+            rollup = self._rollups[granularity]
+            for key in [key for key in rollup if key[1] < cutoff]:
+                del rollup[key]
+
+        # Queued orders are recorded late with their earlier timestamp, so
+        # expired lines can sit anywhere in the columns
+        cutoff = self._retention_start()
+        keep = [row for row, stamp in enumerate(self.timestamps) if stamp >= cutoff]
+        if len(keep) < len(self.timestamps):
+            for column in (self.timestamps, self.item_codes, self.quantities, self.revenues):
+                column[:] = array(column.typecode, [column[row] for row in keep])
+        self._order_ids = {order_id: stamp for order_id, stamp in self._order_ids.items()
+                           if stamp >= cutoff}
+
+    def _retention_start(self) -> float:
+        """Timestamp where the order-line window starts; older orders are forgotten."""
+        return datetime.fromordinal(self._pruned_day - self.hourly_retention_days).timestamp()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Everything _apply() has built so far, as JSON. Caller holds the lock."""
+        return {
+            "orders": self.order_total,
+            "lines": self.line_total,
+            "pruned_day": self._pruned_day,
+            "items": [[name, category] for name, category in zip(self._item_names, self._item_categories)],
+            "order_ids": list(self._order_ids.items()),
+            "columns": [self.timestamps.tolist(), self.item_codes.tolist(),
+                        self.quantities.tolist(), self.revenues.tolist()],
+            "item_totals": self._item_totals,
+            "category_totals": self._category_totals,
+            "rollups": {granularity: [[scope[0], scope[1], bucket, entry[0], entry[1]]
+                                      for (scope, bucket), entry in rollup.items()]
+                        for granularity, rollup in self._rollups.items()},
+            "refunds_due": list(self._refunds_due.values()),
+        }
+
+    def _load_snapshot(self, snapshot: Dict[str, Any]):
+        self.order_total = snapshot["orders"]
+        self.line_total = snapshot["lines"]
+        self.version = self.order_total
+        self._pruned_day = snapshot["pruned_day"]
+        for name, category in snapshot["items"]:
+            self._code_for(name, category)
+        self._order_ids = {order_id: stamp for order_id, stamp in snapshot["order_ids"]}
+        for column, values in zip((self.timestamps, self.item_codes, self.quantities, self.revenues),
+                                  snapshot["columns"]):
+            column.extend(values)
+        self._item_totals = snapshot["item_totals"]
+        self._category_totals = snapshot["category_totals"]
+        for granularity, entries in snapshot["rollups"].items():
+            self._rollups[granularity] = {((kind, name), bucket): [quantity, revenue]
+                                          for kind, name, bucket, quantity, revenue in entries}
+        self._refunds_due = {refund["transaction_id"]: refund for refund in snapshot.get("refunds_due", [])}
+
+    def _compact(self):
+        """Replace the journal with one snapshot record. Caller holds the lock."""
+        self.journal.rewrite([{"snapshot": self._snapshot()}])
+
+    def record_order(self, order: Dict[str, Any]) -> bool:
+        """Record a completed order. False if it was already recorded.
+
+        Orders dated before the retention window are refused as well: their
+        IDs may already have been forgotten, so a repeat could not be told
+        apart from a new sale.
+        """
+        timestamp = order.get('timestamp') or datetime.now().isoformat()
+        lines = [
+            [item['name'], item.get('category', ''), float(item['quantity']),
+             round(float(item['quantity']) * float(item['price']), 2)]
+            for item in order['items'].values()
+        ]
+        record = {"o": order['order_id'], "t": timestamp, "l": lines}
+        stamp = datetime.fromisoformat(timestamp).timestamp()
+        with self._lock:
+            if order['order_id'] in self._order_ids:
+                return False
+            if self._pruned_day and stamp < self._retention_start():
+                print(f"Not recording {order['order_id']}: dated before the sales retention window")
+                return False
+            self.journal.append(record)
+            self._apply(record)
+            if self.journal.entries >= self.compact_every:
+                self._compact()
+        return True
+
+    def record_refund_due(self, order: Dict[str, Any], reason: str) -> bool:
+        """Journal a payment that was taken but has no sale behind it.
+
+        `order` is the order that could not be completed, with its
+        transaction_id, payment_method and total_amount. False if that
+        transaction is already due a refund.
+        """
+        refund = {
+            "transaction_id": order['transaction_id'],
+            "order_id": order['order_id'],
+            "amount": float(order['total_amount']),
+            "payment_method": order.get('payment_method', ''),
+            "timestamp": order.get('timestamp') or datetime.now().isoformat(),
+            "reason": reason,
+        }
+        with self._lock:
+            if refund["transaction_id"] in self._refunds_due:
+                return False
+            self.journal.append({"refund": refund})
+            self._refunds_due[refund["transaction_id"]] = refund
+            if self.journal.entries >= self.compact_every:
+                self._compact()
+        return True
+
+    def settle_refund(self, transaction_id: str) -> bool:
+        """Mark a refund as paid back. False if none was due for that transaction."""
+        with self._lock:
+            if transaction_id not in self._refunds_due:
+                return False
+            self.journal.append({"settled": transaction_id})
+            del self._refunds_due[transaction_id]
+        return True
+
+    def get_refunds_due(self) -> List[Dict[str, Any]]:
+        """Outstanding refunds, oldest first."""
+        with self._lock:
+            return [dict(refund) for refund in self._refunds_due.values()]
+
+    def __len__(self) -> int:
+        """Number of order lines recorded, including those past the retention window."""
+        return self.line_total
+
+    def order_count(self) -> int:
+        return self.order_total
+
+    def item_name(self, code: int) -> str:
+        """Item name for a value in the item_codes column."""
+        return self._item_names[code]
+
+    def get_totals(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "orders": self.order_total,
+                "lines": self.line_total,
+                "quantity": sum(entry[0] for entry in self._category_totals.values()),
+                "revenue": sum(entry[1] for entry in self._category_totals.values()),
+            }
+
+    def get_trend(self, granularity: str = HOUR, periods: int = 24, item: Optional[str] = None,
+                  category: Optional[str] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Quantity and revenue for the last `periods` hours or days, oldest first.
+
+        Covers the whole store unless an item or category is given. Periods
+        with no sales, or past the retention window, are included as zeros
+        so the result charts directly.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        scope = STORE
+        if item is not None:
+            scope = ("item", item)
+        elif category is not None:
+            scope = ("category", category)
+        current = _buckets(now or datetime.now())[granularity]
+        rollup = self._rollups[granularity]
+        trend = []
+        with self._lock:
+            for bucket in range(current - periods + 1, current + 1):
+                quantity, revenue = rollup.get((scope, bucket), (0.0, 0.0))
+                trend.append({"Period": _bucket_label(granularity, bucket),
+                              "Quantity (kg)": quantity, "Revenue (₹)": revenue})
+        return trend
+
+    def get_top_sellers(self, n: int = 5, by: str = "revenue",
+                        category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The n best-selling items by all-time revenue or quantity."""
+        index = 1 if by == "revenue" else 0
+        with self._lock:
+            candidates = [
+                (totals[index], name, totals) for name, totals in self._item_totals.items()
+                if category is None or self._item_categories[self._item_codes[name]] == category
+            ]
+            best = heapq.nlargest(n, candidates, key=lambda entry: entry[0])
+            return [{"Name": name,
+                     "Category": self._item_categories[self._item_codes[name]],
+                     "Quantity (kg)": totals[0],
+                     "Revenue (₹)": totals[1]} for _, name, totals in best]
+
+    def get_category_sales(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {category: {"quantity": totals[0], "revenue": totals[1]}
+                    for category, totals in self._category_totals.items()}
+
+    def close(self):
+        self.journal.close()
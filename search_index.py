@@ -0,0 +1,211 @@
+import heapq
+import math
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Iterable, List, Set, Tuple
+
+MIN_FUZZY_MATCH = 0.5  # share of the query's trigrams a typo match must contain
+MAX_RANKED = 2000      # candidates ranked per stage; beyond that, an arbitrary subset
+
+
+def normalize(text: str) -> str:
+    """Lowercase and treat underscores/hyphens as spaces, e.g. "Lady_Finger" -> "lady finger"."""
+    return " ".join(text.lower().replace("_", " ").replace("-", " ").split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of a normalized term, padded so word starts and ends count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """In-memory search over item names, aliases and categories.
+
+    Three structures, all updated per item on add/remove:
+      - a sorted list of (word, term length, term, key) for word-prefix
+        lookups by bisection; within one word, entries are already in
+        rank order (shortest name first);
+      - trigram -> keys posting sets, for substring and typo-tolerant
+        matching;
+      - category word -> category, so a category hit does not have to
+        touch every item in it.
+
+    search() ranks exact matches, then word-prefix matches, then
+    substrings, then category matches, then fuzzy matches, and stops once
+    it has `limit` results.
+    """
+
+    def __init__(self):
+        self._words: List[Tuple[str, int, str, str]] = []
+        self._exact: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._docs: Dict[str, Tuple[str, List[str], List[Tuple[str, int, str, str]], Set[str]]] = {}
+        self._categories: Dict[str, Dict[str, None]] = {}  # category -> ordered set of keys
+        self._category_words: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._docs
+
+    @staticmethod
+    def _make_doc(key: str, name: str, category: str, aliases: Iterable[str]):
+        """(category, terms, word entries, trigrams); the first term is the name."""
+        terms = []
+        for term in [normalize(name)] + [normalize(alias) for alias in aliases or ()]:
+            if term and term not in terms:
+                terms.append(term)
+        words = {(word, len(term), term, key) for term in terms for word in term.split()}
+        grams = set()
+        for term in terms:
+            grams |= trigrams(term)
+        return category, terms, sorted(words), grams
+
+    def rebuild(self, items: Iterable[Tuple[str, str, str, Iterable[str]]]):
+        """Replace the index with (key, name, category, aliases) entries."""
+        words, exact, postings, docs, categories = [], {}, {}, {}, {}
+        for key, name, category, aliases in items:
+            doc = self._make_doc(key, name, category, aliases)
+            docs[key] = doc
+            words.extend(doc[2])
+            for term in doc[1]:
+                exact.setdefault(term, set()).add(key)
+            for gram in doc[3]:
+                postings.setdefault(gram, set()).add(key)
+            categories.setdefault(category, {})[key] = None
+        words.sort()
+        category_words = sorted((word, category) for category in categories
+                                for word in set(normalize(category).split()))
+        with self._lock:
+            self._words, self._exact, self._postings, self._docs = words, exact, postings, docs
+            self._categories, self._category_words = categories, category_words
+
+    def add(self, key: str, name: str, category: str, aliases: Iterable[str] = ()):
+        """Index an item, replacing any previous entry under the same key."""
+        doc = self._make_doc(key, name, category, aliases)
+        with self._lock:
+            self._remove_locked(key)
+            self._docs[key] = doc
+            for entry in doc[2]:
+                insort(self._words, entry)
+            for term in doc[1]:
+                self._exact.setdefault(term, set()).add(key)
+            for gram in doc[3]:
+                self._postings.setdefault(gram, set()).add(key)
+            members = self._categories.setdefault(category, {})
+            if not members:
+                for word in set(normalize(category).split()):
+                    insort(self._category_words, (word, category))
+            members[key] = None
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove_locked(key)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], value: str, key: str):
+        keys = index[value]
+        keys.discard(key)
+        if not keys:
+            del index[value]
+
+    def _remove_locked(self, key: str):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        category, terms, words, grams = doc
+        for entry in words:
+            del self._words[bisect_left(self._words, entry)]
+        for term in terms:
+            self._discard(self._exact, term, key)
+        for gram in grams:
+            self._discard(self._postings, gram, key)
+        members = self._categories[category]
+        del members[key]
+        if not members:
+            del self._categories[category]
+            for word in set(normalize(category).split()):
+                del self._category_words[bisect_left(self._category_words, (word, category))]
+
+    def _prefixed_words(self, prefix: str, limit: int) -> List[Tuple[str, int, str, str]]:
+        """The first `limit` entries of every word starting with prefix."""
+        words = self._words
+        found = []
+        i = bisect_left(words, (prefix,))
+        while i < len(words) and words[i][0].startswith(prefix):
+            # Entries for one word are contiguous and already in rank order
+            end = bisect_left(words, (words[i][0] + "\0",), i)
+            found.extend(words[i:min(end, i + limit)])
+            i = end
+        return found
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Keys of the best `limit` matches for query, best first."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        results: Dict[str, None] = {}  # ordered set
+
+        def take(keys: Iterable[str]) -> bool:
+            for key in keys:
+                if key not in results:
+                    results[key] = None
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        with self._lock:
+            docs = self._docs
+
+            def by_name(key: str) -> Tuple[int, str]:
+                name = docs[key][1][0]
+                return len(name), name
+
+            # 1: the whole name or an alias
+            if take(sorted(self._exact.get(query, ()), key=by_name)):
+                return list(results)
+
+            # 2: a word starting with the query, shortest name first
+            if " " not in query:
+                entries = self._prefixed_words(query, limit)
+                if take(entry[3] for entry in heapq.nsmallest(limit, entries, key=lambda e: e[1:3])):
+                    return list(results)
+
+            query_grams = trigrams(query)
+            # 3: substrings, from the items holding every inner trigram of the query
+            inner = [gram for gram in query_grams if " " not in (gram[0], gram[2])]
+            if inner:
+                postings = sorted((self._postings.get(gram, set()) for gram in inner), key=len)
+                candidates = postings[0].intersection(*postings[1:])
+                if len(inner) > 1:
+                    # Several trigrams can all be present without being adjacent
+                    candidates = [key for key in candidates if any(query in term for term in docs[key][1])]
+                if take(heapq.nsmallest(limit, islice(candidates, MAX_RANKED), key=by_name)):
+                    return list(results)
+
+            # 4: items in matching categories
+            for word, category in self._category_words[bisect_left(self._category_words, (query,)):]:
+                if not word.startswith(query):
+                    break
+                if take(self._categories.get(category, ())):
+                    return list(results)
+
+            # 5: typo-tolerant matches sharing enough of the query's trigrams.
+            # A match needs `needed` of n trigrams, so it must hold at least one
+            # of the n - needed + 1 rarest ones; only those are scanned.
+            ranked = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+            needed = math.ceil(MIN_FUZZY_MATCH * len(ranked))
+            candidates = set()
+            for gram in ranked[:len(ranked) - needed + 1]:
+                candidates.update(self._postings.get(gram, ()))
+            scored = []
+            for key in islice(candidates, MAX_RANKED):
+                count = len(query_grams & docs[key][3])
+                if count >= needed:
+                    scored.append((-count, by_name(key), key))
+            take(key for _, _, key in heapq.nsmallest(limit, scored))
+        return list(results)
@@ -0,0 +1,339 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+from journal import Journal, write_json_atomic, FSYNC_ALWAYS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+DB_FILE = "inventory_data.json"
+JOURNAL_FILE = "inventory_data.journal"
+SQLITE_FILE = "inventory_data.db"
+
+# (name, delta, new_stock) as produced by VegetableDatabase
+Change = Tuple[str, float, float]
+
+
+class FileLock:
+    """Exclusive lock between threads and, via an advisory lock file, processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            self._thread_lock.release()
+
+
+class StorageBackend(ABC):
+    """Where VegetableDatabase persists its category -> name -> record data.
+
+    A backend created with shared=True may be written by several processes.
+    Writers then hold locked() and first apply read_changes() so their
+    in-memory copy is current before they check and change stock.
+
+    load(), save() and record_changes() are abstract, so a backend missing
+    one fails when it is created rather than on its first write.
+    """
+
+    shared = False
+    _file_lock: Optional[FileLock] = None
+
+    def locked(self):
+        """Exclusive write section across processes (a no-op unless shared)."""
+        return self._file_lock if self._file_lock is not None else nullcontext()
+
+    def changed(self) -> bool:
+        """Cheap check for writes made by other processes."""
+        return False
+
+    def read_changes(self) -> Optional[List[Change]]:
+        """Changes other processes made since we last looked, or None when a
+        full load() is needed."""
+        return []
+
+    @abstractmethod
+    def load(self, default_data: Dict) -> Dict:
+        """The stored inventory, or default_data if nothing is stored yet."""
+
+    @abstractmethod
+    def save(self, data: Dict):
+        """Persist a full copy of the inventory."""
+
+    @abstractmethod
+    def record_changes(self, changes: List[Change]):
+        """Persist stock changes as one all-or-nothing unit."""
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+
+class JsonStorage(StorageBackend):
+    """JSON snapshot plus an append-only journal of stock changes."""
+
+    def __init__(self, db_file: str = DB_FILE, journal_file: str = JOURNAL_FILE,
+                 fsync_policy: str = FSYNC_ALWAYS, compact_every: int = 500,
+                 shared: bool = False):
+        self.db_file = db_file
+        self.journal = Journal(journal_file, fsync_policy)
+        self.compact_every = compact_every
+        self.shared = shared
+        if shared:
+            self._file_lock = FileLock(f"{db_file}.lock")
+        self._snapshot_sig = None
+
+    def _stat_snapshot(self):
+        """(inode, mtime, size) of the snapshot; a rename changes all three."""
+        try:
+            st = os.stat(self.db_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def changed(self) -> bool:
+        return (self._stat_snapshot() != self._snapshot_sig
+                or self.journal.size() != self.journal.offset)
+
+    def read_changes(self) -> Optional[List[Change]]:
+        # Another process compacted (or truncated) underneath us: reload
+        if self._stat_snapshot() != self._snapshot_sig or self.journal.size() < self.journal.offset:
+            return None
+        entries, _ = self.journal.read_from(self.journal.offset)
+        changes = []
+        for entry in entries:
+            changes.extend(entry["b"] if "b" in entry else [(entry["n"], entry["d"], entry["s"])])
+        return changes
+
+    def load(self, default_data: Dict) -> Dict:
+        """Load the last snapshot (or default) and replay the journal on top.
+
+        Replay cuts off a torn tail, so shared callers must hold locked().
+        """
+        data = default_data
+        self._snapshot_sig = self._stat_snapshot()
+        if os.path.exists(self.db_file):
+            try:
+                with open(self.db_file, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = default_data
+
+        records = {name.lower(): details
+                   for items in data.values() for name, details in items.items()}
+        for entry in self.journal.replay():
+            # A batch is one record, so a transaction is replayed whole or not at all
+            changes = entry["b"] if "b" in entry else [(entry["n"], entry["d"], entry["s"])]
+            for name, _, stock in changes:
+                details = records.get(name.lower())
+                if details is not None:
+                    # Records carry the resulting stock, so replay is idempotent
+                    details["stock"] = stock
+        return data
+
+    def save(self, data: Dict):
+        """Write a full snapshot atomically and truncate the journal."""
+        write_json_atomic(self.db_file, data, indent=4)
+        self.journal.reset()
+        self._snapshot_sig = self._stat_snapshot()
+
+    def record_changes(self, changes: List[Change]):
+        if len(changes) == 1:
+            name, delta, new_stock = changes[0]
+            self.journal.append({"n": name, "d": delta, "s": new_stock})
+        else:
+            self.journal.append({"b": changes})
+
+    def needs_compaction(self) -> bool:
+        return self.journal.entries >= self.compact_every
+
+    def close(self):
+        self.journal.close()
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite database in WAL mode, one row per vegetable."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vegetables (
+            name TEXT PRIMARY KEY COLLATE NOCASE,
+            category TEXT NOT NULL,
+            price REAL NOT NULL,
+            stock REAL NOT NULL,
+            reorder_level REAL,
+            aliases TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_vegetables_category ON vegetables (category);
+        CREATE INDEX IF NOT EXISTS idx_vegetables_stock ON vegetables (stock);
+    """
+    UPDATE_STOCK = "UPDATE vegetables SET stock = ? WHERE name = ?"
+    UPSERT = """
+        INSERT INTO vegetables (name, category, price, stock, reorder_level, aliases)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            category = excluded.category, price = excluded.price, stock = excluded.stock,
+            reorder_level = excluded.reorder_level, aliases = excluded.aliases
+    """
+    COLUMNS = "category, name, price, stock, reorder_level, aliases"
+    # Columns added after the first release, for upgrading older databases
+    ADDED_COLUMNS = (("reorder_level", "REAL"), ("aliases", "TEXT"))
+
+    def __init__(self, path: str = SQLITE_FILE, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        if shared:
+            self._file_lock = FileLock(f"{path}.lock")
+        # One connection shared by every thread; the lock serializes access.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(vegetables)")}
+            for column, column_type in self.ADDED_COLUMNS:
+                if columns and column not in columns:
+                    self._conn.execute(f"ALTER TABLE vegetables ADD COLUMN {column} {column_type}")
+            self._conn.executescript(self.SCHEMA)
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self) -> int:
+        # data_version only moves when a *different* connection commits
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        return self._read_data_version() != self._data_version
+
+    def read_changes(self) -> Optional[List[Change]]:
+        return None
+
+    def _rows_to_data(self, rows) -> Dict:
+        data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for category, name, price, stock, reorder_level, aliases in rows:
+            details = {"price": price, "stock": stock}
+            if reorder_level is not None:
+                details["reorder_level"] = reorder_level
+            if aliases:
+                details["aliases"] = json.loads(aliases)
+            data.setdefault(category, {})[name] = details
+        return data
+
+    def load(self, default_data: Dict) -> Dict:
+        self._data_version = self._read_data_version()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM vegetables ORDER BY rowid"
+            ).fetchall()
+        if not rows:
+            self.save(default_data)
+            return default_data
+        return self._rows_to_data(rows)
+
+    def save(self, data: Dict):
+        rows = [(name, category, details["price"], details["stock"], details.get("reorder_level"),
+                 json.dumps(details["aliases"]) if details.get("aliases") else None)
+                for category, items in data.items() for name, details in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(self.UPSERT, rows)
+                keep = {row[0].lower() for row in rows}
+                stale = [(name,) for (name,) in self._conn.execute("SELECT name FROM vegetables")
+                         if name.lower() not in keep]
+                self._conn.executemany("DELETE FROM vegetables WHERE name = ?", stale)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_changes(self, changes: List[Change]):
+        # sqlite3 caches the compiled UPDATE, so this is a prepared statement
+        params = [(new_stock, name) for name, _, new_stock in changes]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(self.UPDATE_STOCK, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def items_in_stock_range(self, low: float, high: float) -> Dict:
+        """Vegetables with low <= stock <= high, served from the stock index."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM vegetables "
+                "WHERE stock BETWEEN ? AND ? ORDER BY stock", (low, high)
+            ).fetchall()
+        return self._rows_to_data(rows)
+
+    def items_in_category(self, category: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM vegetables WHERE category = ?",
+                (category,)
+            ).fetchall()
+        return self._rows_to_data(rows).get(category, {})
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(db_file: str = DB_FILE, journal_file: str = JOURNAL_FILE,
+                           sqlite_file: str = SQLITE_FILE) -> int:
+    """Copy the JSON inventory (with its journal replayed) into SQLite once.
+
+    Returns the number of rows migrated, or 0 if the SQLite database
+    already holds data.
+    """
+    if not os.path.exists(db_file) and not os.path.exists(journal_file):
+        return 0
+    target = SQLiteStorage(sqlite_file)
+    try:
+        with target._lock:
+            existing = target._conn.execute("SELECT COUNT(*) FROM vegetables").fetchone()[0]
+        if existing:
+            return 0
+        source = JsonStorage(db_file, journal_file)
+        data = source.load({})
+        source.close()
+        target.save(data)
+        return sum(len(items) for items in data.values())
+    finally:
+        target.close()
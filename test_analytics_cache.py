@@ -0,0 +1,55 @@
+import time
+import pandas as pd
+import plotly.express as px
+from analytics_cache import FigureCache, top_n_with_other
+
+
+def make_summary(n):
+    return pd.DataFrame([{
+        "Name": f"Item {i}",
+        "Category": f"Category {i % 7}",
+        "Price (₹/kg)": 10.0,
+        "Stock (kg)": float(i),
+        "Value (₹)": 10.0 * i
+    } for i in range(n)])
+
+
+def test_cache_reuses_until_version_changes():
+    cache = FigureCache(max_entries=2)
+    builds = []
+    def build():
+        builds.append(1)
+        return object()
+
+    first = cache.get_or_build(("stock_bar", 1), build)
+    assert cache.get_or_build(("stock_bar", 1), build) is first
+    assert cache.get_or_build(("stock_bar", 2), build) is not first
+    cache.get_or_build(("value_pie", 2), build)
+    assert len(cache) == 2, "LRU did not evict!"
+    assert len(builds) == 3 and cache.stats()["hits"] == 1
+    print("Figure Cache Test PASSED!")
+
+
+def test_top_n_downsampling():
+    df = make_summary(5000)
+    reduced = top_n_with_other(df, "Stock (kg)", n=30)
+    assert len(reduced) == 31
+    assert reduced["Stock (kg)"].sum() == df["Stock (kg)"].sum()
+    assert reduced.iloc[-1]["Name"] == "Other (4970 items)"
+    assert reduced.iloc[-1]["Category"] == "Other"
+    small_catalog = make_summary(10)
+    assert top_n_with_other(small_catalog, "Stock (kg)") is small_catalog
+
+    start = time.perf_counter()
+    px.bar(df, x="Name", y="Stock (kg)", color="Category")
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    px.bar(reduced, x="Name", y="Stock (kg)", color="Category")
+    small = time.perf_counter() - start
+    print(f"Bar chart for 5000 items: {full * 1000:.1f}ms full, {small * 1000:.1f}ms top-30 + Other")
+    print("Top-N Downsampling Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_cache_reuses_until_version_changes()
+    test_top_n_downsampling()
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+from benchmark_suite import compare_results, main, make_catalog, run_suite
+
+
+def test_catalog_generator():
+    catalog = make_catalog(1000)
+    names = [name.lower() for items in catalog.values() for name in items]
+    assert len(names) == 1000 and len(set(names)) == 1000, "SKU names must be unique!"
+    assert make_catalog(1000) == catalog, "Catalog is not reproducible!"
+    print("Catalog Generator Test PASSED!")
+
+
+def test_suite_and_baseline_gate():
+    report = run_suite([30], repeat=20, io_repeat=2)
+    benches = report["results"]["30"]
+    for name in ("update_stock", "save_data", "load_data", "get_inventory_summary_cold",
+                 "cart_add_item", "cart_get_summary", "cart_export_json", "generate_receipt"):
+        assert benches[name]["median_us"] > 0, f"{name} was not measured!"
+
+    # A baseline twice as fast as now flags the slow benchmarks
+    baseline = json.loads(json.dumps(report))
+    baseline["results"]["30"]["save_data"]["median_us"] /= 2
+    rows = {row["benchmark"]: row for row in compare_results(report, baseline, threshold=0.25)}
+    assert rows["save_data"]["regressed"]
+    assert not rows["generate_receipt"]["regressed"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_path = os.path.join(tmp, "baseline.json")
+        output_path = os.path.join(tmp, "results.json")
+        with open(baseline_path, "w") as f:
+            json.dump(report, f)
+        # Comparing against itself with a huge threshold passes; an impossible baseline fails
+        assert main(["--sizes", "30", "--repeat", "10", "--io-repeat", "1", "--output", output_path,
+                     "--baseline", baseline_path, "--threshold", "100"]) == 0
+        for stats in report["results"]["30"].values():
+            stats["median_us"] = 1e-3
+        with open(baseline_path, "w") as f:
+            json.dump(report, f)
+        assert main(["--sizes", "30", "--repeat", "10", "--io-repeat", "1", "--output", output_path,
+                     "--baseline", baseline_path]) == 1
+        with open(output_path) as f:
+            assert "30" in json.load(f)["results"]
+    print("Benchmark Suite Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_catalog_generator()
+    test_suite_and_baseline_gate()
@@ -0,0 +1,58 @@
+import time
+from cart_manager import CartManager, CartLine
+
+
+def test_merge_and_indexes():
+    cart = CartManager()
+    assert cart.add_item("Potato", 2.0, 30, "Ground")
+    assert cart.add_item("potato", 1.5, 30, "Ground")   # same SKU and price: merged
+    assert cart.add_item("Potato", 1.0, 25, "Ground")   # different price: own line
+    assert cart.add_item("Mint", 0.5, 60, "Leafy")
+    assert cart.get_cart_count() == 3
+    assert cart.get_cart_total() == 3.5 * 30 + 25 + 30
+
+    potato_id = cart.find_item_by_name("POTATO")
+    assert cart.get_line(potato_id).quantity == 3.5
+    assert isinstance(cart.get_line(potato_id), CartLine)
+    assert len(cart.get_items_by_category("ground")) == 2
+
+    # Orders and receipts still see plain dict lines
+    items = cart.get_cart_items()
+    assert items[potato_id]["subtotal"] == 105.0 and items[potato_id]["name"] == "Potato"
+    items[potato_id]["quantity"] = 99.0
+    items.clear()
+    assert cart.get_cart_items()[potato_id]["quantity"] == 3.5, "Caller edits leaked into the cart!"
+    assert not hasattr(cart.get_line(potato_id), "__dict__"), "CartLine lost its slots"
+
+    assert cart.update_quantity(potato_id, 1.0)
+    assert cart.get_cart_total() == 30 + 25 + 30
+    assert cart.remove_item(potato_id)
+    assert potato_id not in cart.get_items_by_category("Ground")
+    assert cart.get_cart_summary()["total_quantity"] == 1.5
+    cart.remove_item(cart.find_item_by_name("Potato"))
+    cart.remove_item(cart.find_item_by_name("Mint"))
+    assert cart.get_cart_total() == 0.0 and cart.find_item_by_name("Mint") is None
+    print("Cart Merge/Index Test PASSED!")
+
+
+def test_wholesale_cart():
+    cart = CartManager()
+    start = time.perf_counter()
+    for n in range(10000):
+        cart.add_item(f"SKU_{n}", 1.0, 10, f"Category_{n % 20}")
+    for n in range(10000):
+        cart.add_item(f"SKU_{n}", 0.5, 10, f"Category_{n % 20}")
+    for n in range(1000):
+        cart.get_cart_total()
+        cart.find_item_by_name(f"sku_{n}")
+    elapsed = time.perf_counter() - start
+    print(f"20k adds + 1k total/lookup pairs on a 10k-line cart: {elapsed * 1000:.1f}ms")
+    assert cart.get_cart_count() == 10000
+    assert abs(cart.get_cart_total() - 150000.0) < 1e-6
+    assert len(cart.get_items_by_category("category_3")) == 500
+    print("Wholesale Cart Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_merge_and_indexes()
+    test_wholesale_cart()
@@ -1,41 +1,352 @@
 from vegetable_database import VegetableDatabase
 import os
 import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from storage_backends import JsonStorage, SQLiteStorage, StorageBackend, migrate_json_to_sqlite
+
+
+@contextmanager
+def in_scratch_dir():
+    """Run a test that uses the default file names without touching the real inventory."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
 
 def test_persistence():
-    # remove json if exists to start fresh
-    if os.path.exists("inventory_data.json"):
-        os.remove("inventory_data.json")
+    with in_scratch_dir():
+        # remove json and journal if they exist to start fresh
+        for path in ("inventory_data.json", "inventory_data.journal"):
+            if os.path.exists(path):
+                os.remove(path)
     
-    # 1. Init DB (should load default)
-    db = VegetableDatabase()
-    potato_stock = db.get_vegetable_by_name("Potato")["stock"]
-    print(f"Initial Potato Stock: {potato_stock}")
+        # 1. Init DB (should load default)
+        db = VegetableDatabase()
+        potato_stock = db.get_vegetable_by_name("Potato")["stock"]
+        print(f"Initial Potato Stock: {potato_stock}")
     
-    # 2. Update Stock (should save)
-    db.update_stock("Potato", 5.0)
-    print("Sold 5.0kg Potato")
+        # 2. Update Stock (should be journaled)
+        db.update_stock("Potato", 5.0)
+        print("Sold 5.0kg Potato")
     
-    # 3. Verify file exists
-    if os.path.exists("inventory_data.json"):
-        print("inventory_data.json created.")
-        with open("inventory_data.json") as f:
-            data = json.load(f)
-            saved_stock = data["Ground"]["Potato"]["stock"]
-            print(f"Saved Potato Stock in JSON: {saved_stock}")
-            assert saved_stock == potato_stock - 5.0, "Saved stock mismatch!"
-    else:
-        print("ERROR: inventory_data.json NOT created!")
-        return
+        # 3. Verify the journal holds one compact record
+        with open("inventory_data.journal") as f:
+            records = [json.loads(line) for line in f]
+        print(f"Journal records: {records}")
+        assert records == [{"n": "Potato", "d": -5.0, "s": potato_stock - 5.0}], "Journal mismatch!"
 
-    # 4. Reload DB (should load from file)
-    db2 = VegetableDatabase()
-    reloaded_stock = db2.get_vegetable_by_name("Potato")["stock"]
-    print(f"Reloaded Potato Stock: {reloaded_stock}")
+        # 4. Reload DB (should replay the journal)
+        db2 = VegetableDatabase()
+        reloaded_stock = db2.get_vegetable_by_name("Potato")["stock"]
+        print(f"Reloaded Potato Stock: {reloaded_stock}")
     
-    assert reloaded_stock == potato_stock - 5.0, "Reloaded stock mismatch!"
+        assert reloaded_stock == potato_stock - 5.0, "Reloaded stock mismatch!"
+
+        # 5. Compact into a snapshot (journal is truncated)
+        db2.save_data()
+        if os.path.exists("inventory_data.json"):
+            print("inventory_data.json created.")
+            with open("inventory_data.json") as f:
+                data = json.load(f)
+                saved_stock = data["Ground"]["Potato"]["stock"]
+                print(f"Saved Potato Stock in JSON: {saved_stock}")
+                assert saved_stock == potato_stock - 5.0, "Saved stock mismatch!"
+        else:
+            print("ERROR: inventory_data.json NOT created!")
+            return
+        assert os.path.getsize("inventory_data.journal") == 0, "Journal not truncated!"
+
+        # 6. A torn trailing record is ignored on recovery
+        with open("inventory_data.journal", "a") as f:
+            f.write('{"n":"Potato","d":-1.0,"s":')
+        db3 = VegetableDatabase()
+        assert db3.get_vegetable_by_name("Potato")["stock"] == potato_stock - 5.0, "Torn record applied!"
     
-    print("Persistence Test PASSED!")
+        print("Persistence Test PASSED!")
+
+def test_name_index():
+    with in_scratch_dir():
+        db = VegetableDatabase()
+
+        # Lookups are case-insensitive and return the stored name
+        potato = db.get_vegetable_by_name("potato")
+        assert potato is not None and potato["name"] == "Potato"
+        assert potato["category"] == "Ground"
+        assert db.check_availability("POTATO", 1.0)
+        assert db.get_vegetable_by_name("Dragonfruit") is None
+
+        # The same name in two categories is rejected instead of shadowed
+        db.vegetables["Leafy"]["potato"] = {"price": 10, "stock": 1}
+        try:
+            db._rebuild_index()
+        except ValueError as e:
+            print(f"Duplicate detected: {e}")
+        else:
+            raise AssertionError("Duplicate name was not detected!")
+
+        print("Name Index Test PASSED!")
+
+def test_update_stock_many():
+    with in_scratch_dir():
+        for path in ("inventory_data.json", "inventory_data.journal"):
+            if os.path.exists(path):
+                os.remove(path)
+
+        db = VegetableDatabase()
+        potato = db.get_vegetable_by_name("Potato")["stock"]
+        onion = db.get_vegetable_by_name("Onion")["stock"]
+
+        # One line over stock rejects the whole batch
+        assert not db.update_stock_many([("Potato", 1.0), ("Onion", onion + 1)])
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato, "Partial batch applied!"
+
+        # Repeated names are merged and journaled as a single record
+        assert db.update_stock_many([("Potato", 1.0), ("Onion", 2.0), ("potato", 0.5)])
+        with open("inventory_data.journal") as f:
+            assert len(f.readlines()) == 1, "Batch not journaled as one record!"
+
+        db2 = VegetableDatabase()
+        assert db2.get_vegetable_by_name("Potato")["stock"] == potato - 1.5
+        assert db2.get_vegetable_by_name("Onion")["stock"] == onion - 2.0
+
+        assert db2.return_stock_many([("Potato", 1.5), ("Onion", 2.0)])
+        assert db2.get_vegetable_by_name("Potato")["stock"] == potato
+
+        print("Batch Update Test PASSED!")
+
+def test_concurrent_updates():
+    with in_scratch_dir():
+        for path in ("inventory_data.json", "inventory_data.journal"):
+            if os.path.exists(path):
+                os.remove(path)
+
+        db = VegetableDatabase(fsync_policy="never")
+        db.compare_and_set_stock("Mint", db.get_stock_version("Mint")[1], 50)
+
+        # 8 tills race for 50kg of Mint; exactly 50 single-kg sales succeed
+        sold = []
+        def till():
+            for _ in range(10):
+                if db.update_stock("Mint", 1):
+                    sold.append(1)
+        threads = [threading.Thread(target=till) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stock, version = db.get_stock_version("Mint")
+        print(f"Sold {len(sold)}kg Mint, remaining {stock}kg (version {version})")
+        assert len(sold) == 50 and stock == 0, "Lost update or oversell!"
+
+        # A stale version is rejected
+        assert not db.compare_and_set_stock("Mint", version - 1, 10)
+        assert db.compare_and_set_stock("Mint", version, 10)
+        assert VegetableDatabase().get_vegetable_by_name("Mint")["stock"] == 10
+
+        print("Concurrent Update Test PASSED!")
+
+def test_sqlite_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "inventory.json")
+        journal_path = os.path.join(tmp, "inventory.journal")
+        sqlite_path = os.path.join(tmp, "inventory.db")
+
+        # Build a JSON store with an unsnapshotted journal entry, then migrate it
+        db = VegetableDatabase(storage=JsonStorage(json_path, journal_path))
+        db.save_data()
+        potato = db.get_vegetable_by_name("Potato")["stock"]
+        db.update_stock("Potato", 2.0)
+        db.storage.close()
+        migrated = migrate_json_to_sqlite(json_path, journal_path, sqlite_path)
+        print(f"Migrated {migrated} rows to SQLite")
+        assert migrated == sum(len(items) for items in db.get_all_vegetables().values())
+        assert migrate_json_to_sqlite(json_path, journal_path, sqlite_path) == 0, "Migrated twice!"
+
+        storage = SQLiteStorage(sqlite_path)
+        sdb = VegetableDatabase(storage=storage)
+        assert sdb.get_vegetable_by_name("potato")["stock"] == potato - 2.0
+        assert sdb.update_stock_many([("Potato", 1.0), ("Onion", 1.0)])
+        storage.close()
+
+        reopened = SQLiteStorage(sqlite_path)
+        sdb2 = VegetableDatabase(storage=reopened)
+        assert sdb2.get_vegetable_by_name("Potato")["stock"] == potato - 3.0
+        low = reopened.items_in_stock_range(0, 10)
+        assert "Mint" in low.get("Leafy", {}), "Range query missed Mint!"
+        assert set(reopened.items_in_category("Legumes")) == set(sdb2.get_vegetables_by_category("Legumes"))
+        reopened.close()
+
+    print("SQLite Backend Test PASSED!")
+
+def test_incomplete_backend_rejected():
+    class NoSave(StorageBackend):
+        def load(self, default_data):
+            return default_data
+
+        def record_changes(self, changes):
+            pass
+
+    # Missing save() is caught when the backend is created, not mid-write
+    try:
+        NoSave()
+    except TypeError as e:
+        print(f"Incomplete backend rejected: {e}")
+    else:
+        raise AssertionError("Backend without save() was instantiated!")
+
+    print("Backend Interface Test PASSED!")
+
+def test_multiprocess_refresh():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "inventory.json")
+        journal_path = os.path.join(tmp, "inventory.journal")
+
+        # Two "processes" sharing the same files
+        a = VegetableDatabase(storage=JsonStorage(json_path, journal_path, shared=True))
+        a.save_data()
+        b = VegetableDatabase(storage=JsonStorage(json_path, journal_path, shared=True))
+        potato = a.get_vegetable_by_name("Potato")["stock"]
+
+        assert not b.refresh_if_changed(), "Reloaded without a change!"
+        a.update_stock("Potato", 3.0)
+        assert b.refresh_if_changed(), "Missed the other writer!"
+        assert b.get_vegetable_by_name("Potato")["stock"] == potato - 3.0
+
+        # b writes against the fresh stock; a catches up before it checks stock
+        assert b.update_stock("Potato", potato - 3.0)
+        assert not a.update_stock("Potato", 1.0), "Oversold across processes!"
+
+        # A compaction by b forces a full reload in a
+        b.save_data()
+        a.return_stock("Potato", 2.0)
+        b.refresh_if_changed()
+        assert b.get_vegetable_by_name("Potato")["stock"] == 2.0
+
+        # A process starting while another is mid-append waits for the lock
+        # instead of cutting the half-written record off as a torn tail
+        opened = []
+        with a.storage.locked():
+            with open(journal_path, "a") as f:
+                f.write('{"n": "Potato", "d": -1.0, ')
+            opener = threading.Thread(target=lambda: opened.append(
+                VegetableDatabase(storage=JsonStorage(json_path, journal_path, shared=True))))
+            opener.start()
+            time.sleep(0.1)
+            with open(journal_path, "a") as f:
+                f.write('"s": 1.0}\n')
+        opener.join(5)
+        assert opened[0].get_vegetable_by_name("Potato")["stock"] == 1.0, "Startup truncated a live append!"
+
+    print("Multiprocess Refresh Test PASSED!")
+
+def test_running_totals():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = VegetableDatabase(storage=JsonStorage(os.path.join(tmp, "inventory.json"),
+                                                   os.path.join(tmp, "inventory.journal")))
+
+        def recomputed():
+            items = [d for cat in db.get_all_vegetables().values() for d in cat.values()]
+            return sum(d["stock"] for d in items), sum(d["price"] * d["stock"] for d in items)
+
+        db.update_stock("Potato", 4.0)
+        db.return_stock("Onion", 1.5)
+        db.update_stock_many([("Mint", 1.0), ("Peas", 2.0)])
+        db.add_vegetable("Leafy", "Kale", 90, 8)
+
+        totals = db.get_store_totals()
+        stock, value = recomputed()
+        print(f"Running totals: {totals}")
+        assert abs(totals["stock"] - stock) < 1e-9 and abs(totals["value"] - value) < 1e-9
+        assert db.get_category_totals()["Leafy"]["items"] == 7
+
+        # The summary frame is reused until the inventory changes
+        summary = db.get_inventory_summary()
+        assert db.get_inventory_summary() is summary
+        db.update_stock("Potato", 1.0)
+        assert db.get_inventory_summary() is not summary
+
+        # The records form holds the same rows without needing pandas
+        records = db.get_inventory_summary(as_records=True)
+        assert records == db.get_inventory_summary().to_dict("records")
+        assert db.get_inventory_summary(as_records=True) is records
+
+    print("Running Totals Test PASSED!")
+
+def test_low_stock_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = VegetableDatabase(storage=JsonStorage(os.path.join(tmp, "inventory.json"),
+                                                   os.path.join(tmp, "inventory.journal")))
+        events = []
+        db.subscribe_low_stock(lambda name, category, stock, level, is_low:
+                               events.append((name, is_low)))
+
+        # Defaults match the old fixed 5kg rule
+        assert set(db.get_low_stock_items()) == set(db.get_low_stock_items(5.0))
+
+        db.set_reorder_level("Potato", 20)
+        db.update_stock("Potato", db.get_vegetable_by_name("Potato")["stock"] - 19)
+        assert db.is_low_stock("Potato") and events == [("Potato", True)]
+        assert list(db.get_low_stock_items())[0] == "Potato", "Most urgent item not first!"
+
+        db.return_stock("Potato", 5)
+        assert not db.is_low_stock("Potato") and events[-1] == ("Potato", False)
+
+        # Listeners run after the stripe lock is released, so they may restock
+        def restock(name, category, stock, level, is_low):
+            if is_low:
+                db.return_stock(name, level - stock + 10)
+        db.subscribe_low_stock(restock)
+        db.update_stock("Onion", db.get_vegetable_by_name("Onion")["stock"] - 1)
+        assert not db.is_low_stock("Onion") and events[-2:] == [("Onion", True), ("Onion", False)]
+        db.unsubscribe_low_stock(restock)
+
+        # Most urgent first across several low items
+        db.update_stock("Carrot", db.get_vegetable_by_name("Carrot")["stock"] - 2)
+        db.update_stock("Radish", db.get_vegetable_by_name("Radish")["stock"] - 4)
+        low = list(db.get_low_stock_items())
+        assert low.index("Carrot") < low.index("Radish"), low  # 3kg short before 1kg short
+
+        # Reorder levels survive a reload
+        db2 = VegetableDatabase(storage=JsonStorage(os.path.join(tmp, "inventory.json"),
+                                                    os.path.join(tmp, "inventory.journal")))
+        assert db2.get_reorder_level("potato") == 20
+
+    print("Low Stock Index Test PASSED!")
+
+def test_core_imports_without_pandas():
+    # Cold start: only the analytics page should pull in pandas/plotly
+    code = ("import sys, vegetable_database, cart_manager, receipt_generator, payment_processor, "
+            "order_queue, fulfilment, sales_ledger, reservations, analytics_cache; "
+            "vegetable_database.VegetableDatabase(storage=vegetable_database.JsonStorage("
+            "sys.argv[1] + '/inventory.json', sys.argv[1] + '/inventory.journal'))"
+            ".get_inventory_summary(as_records=True); "
+            "print(sorted(m for m in ('pandas', 'plotly.express') if m in sys.modules))")
+    with tempfile.TemporaryDirectory() as tmp:
+        loaded = subprocess.check_output([sys.executable, "-c", code, tmp],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)), text=True)
+    print(f"Heavy modules loaded by the core: {loaded.strip()}")
+    assert loaded.strip() == "[]", "Core modules import pandas/plotly at startup!"
+
+    print("Lazy Import Test PASSED!")
 
 if __name__ == "__main__":
     test_persistence()
+    test_name_index()
+    test_update_stock_many()
+    test_concurrent_updates()
+    test_sqlite_backend()
+    test_incomplete_backend_rejected()
+    test_multiprocess_refresh()
+    test_running_totals()
+    test_low_stock_index()
+    test_core_imports_without_pandas()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import time
+from order_queue import OrderQueue
+from receipt_generator import ReceiptGenerator
+from fulfilment import FulfilmentPipeline, DONE, FAILED
+
+
+def make_order(n):
+    return {
+        'order_id': f"ORD_{n:05d}",
+        'items': {"item_1": {"name": "Potato", "quantity": 2.0, "price": 30, "category": "Ground"}},
+        'total_amount': 60.0,
+        'timestamp': "2024-01-01T10:00:00"
+    }
+
+
+def wait_for(pipeline, order_ids, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        statuses = [pipeline.get_status(order_id)["status"] for order_id in order_ids]
+        if all(status in (DONE, FAILED) for status in statuses):
+            return statuses
+        time.sleep(0.01)
+    raise AssertionError("Orders were not fulfilled in time!")
+
+
+def test_pipeline_processes_and_retries():
+    with tempfile.TemporaryDirectory() as tmp:
+        order_queue = OrderQueue(os.path.join(tmp, "queue.journal"), fsync_policy="never")
+        pipeline = FulfilmentPipeline(order_queue, ReceiptGenerator(), workers=3, retry_delay=0.01)
+
+        # The first attempt at every order fails once, then succeeds
+        seen = set()
+        seen_lock = threading.Lock()
+        def flaky(order):
+            with seen_lock:
+                if order['order_id'] not in seen:
+                    seen.add(order['order_id'])
+                    raise RuntimeError("printer jam")
+        pipeline.add_finalizer(flaky)
+        pipeline.start()
+
+        order_ids = []
+        for n in range(30):
+            order_queue.enqueue(make_order(n))
+            assert pipeline.submit(f"ORD_{n:05d}")
+            order_ids.append(f"ORD_{n:05d}")
+
+        assert wait_for(pipeline, order_ids) == [DONE] * 30
+        assert len(order_queue) == 0, "Processed orders left in the queue!"
+        assert "TOTAL AMOUNT" in pipeline.get_status("ORD_00000")["receipt"]
+
+        stats = pipeline.stats()
+        print(f"Worker stats: {stats}")
+        assert sum(s["processed"] for s in stats.values()) == 30
+        assert sum(s["retried"] for s in stats.values()) == 30
+        pipeline.stop()
+    print("Pipeline Test PASSED!")
+
+
+def test_pipeline_backpressure():
+    with tempfile.TemporaryDirectory() as tmp:
+        order_queue = OrderQueue(os.path.join(tmp, "queue.journal"), fsync_policy="never")
+        pipeline = FulfilmentPipeline(order_queue, ReceiptGenerator(), workers=1, max_pending=2)
+        # Not started: nothing drains the work queue
+        for n in range(3):
+            order_queue.enqueue(make_order(n))
+        assert pipeline.submit("ORD_00000") and pipeline.submit("ORD_00001")
+        assert not pipeline.submit("ORD_00002"), "Full pipeline accepted more work!"
+        assert pipeline.submit("ORD_00000"), "Resubmitting a pending order should be a no-op"
+
+        # A retry that finds the queue full fails the order instead of waiting
+        pipeline._retry("ORD_00002")
+        assert pipeline.get_status("ORD_00002")["status"] == FAILED
+        assert pipeline.pending_count() == 2
+
+        # stop() does not block on a full queue while a worker is busy
+        release = threading.Event()
+        pipeline.add_finalizer(lambda order: release.wait(5))
+        pipeline.start()
+        time.sleep(0.05)
+        pipeline.submit("ORD_00002")
+        workers = list(pipeline._threads)
+        started = time.time()
+        pipeline.stop(timeout=0.1)
+        assert time.time() - started < 1, "stop() blocked on the full work queue!"
+        release.set()
+        for worker in workers:
+            worker.join(5)
+        assert pipeline.pending_count() == 2, "Stopping dropped queued work!"
+    print("Backpressure Test PASSED!")
+
+
+def test_pipeline_restart_with_queued_work():
+    with tempfile.TemporaryDirectory() as tmp:
+        order_queue = OrderQueue(os.path.join(tmp, "queue.journal"), fsync_policy="never")
+        pipeline = FulfilmentPipeline(order_queue, ReceiptGenerator(), workers=2)
+        gate = threading.Event()
+        pipeline.add_finalizer(lambda order: gate.wait(5))
+        pipeline.start()
+
+        order_ids = [f"ORD_{n:05d}" for n in range(6)]
+        for n, order_id in enumerate(order_ids):
+            order_queue.enqueue(make_order(n))
+            assert pipeline.submit(order_id)
+        time.sleep(0.05)
+
+        # Stop while both workers are busy: they finish, put back what they
+        # take next and leave their wake-up sentinels behind in the queue
+        workers = list(pipeline._threads)
+        pipeline.stop(timeout=0.05)
+        gate.set()
+        for worker in workers:
+            worker.join(5)
+        assert not any(worker.is_alive() for worker in workers)
+
+        # The restarted workers skip the stale sentinels and drain the rest
+        pipeline.start()
+        assert wait_for(pipeline, order_ids) == [DONE] * 6, "Queued orders stranded by the restart!"
+        assert all(thread.is_alive() for thread in pipeline._threads)
+        pipeline.stop()
+    print("Pipeline Restart Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_pipeline_processes_and_retries()
+    test_pipeline_backpressure()
+    test_pipeline_restart_with_queued_work()
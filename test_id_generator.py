@@ -0,0 +1,52 @@
+import multiprocessing
+import threading
+import time
+from id_generator import IdGenerator, new_id, id_timestamp_ms
+
+
+def _child_ids(queue):
+    queue.put([new_id("ORD") for _ in range(20000)])
+
+
+def test_unique_across_threads():
+    generator = IdGenerator(node_id=1)
+    batches = []
+
+    def worker():
+        batches.append([generator.next_id("ORD") for _ in range(50000)])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ids = [i for batch in batches for i in batch]
+    print(f"Generated {len(ids)} IDs in {elapsed:.3f}s ({len(ids) / elapsed:,.0f}/s)")
+    assert len(set(ids)) == len(ids), "Duplicate IDs across threads!"
+    # Each thread sees strictly increasing IDs
+    for batch in batches:
+        assert batch == sorted(batch)
+    assert abs(id_timestamp_ms(ids[0]) - time.time() * 1000) < 60000
+    print("Thread Uniqueness Test PASSED!")
+
+
+def test_unique_across_processes():
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    new_id("ORD")  # parent state is inherited by the forked children
+    children = [ctx.Process(target=_child_ids, args=(queue,)) for _ in range(2)]
+    for child in children:
+        child.start()
+    ids = queue.get() + queue.get() + [new_id("ORD") for _ in range(20000)]
+    for child in children:
+        child.join()
+    assert len(set(ids)) == len(ids), "Duplicate IDs across processes!"
+    print("Process Uniqueness Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_unique_across_threads()
+    test_unique_across_processes()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import tracemalloc
+from cart_manager import CartManager
+from jsonl_export import open_jsonl
+from receipt_generator import ReceiptGenerator
+
+
+def make_order(n):
+    return {
+        'order_id': f"ORD_{n:06d}",
+        'items': {"item_1": {"name": "Onion", "quantity": 1.5, "price": 40, "category": "Ground"}},
+        'total_amount': 60.0,
+        'timestamp': "2024-01-01T10:00:00"
+    }
+
+
+def test_receipts_roundtrip_bounded_memory():
+    generator = ReceiptGenerator()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "receipts.jsonl.gz")
+
+        tracemalloc.start()
+        with open_jsonl(path, "w") as f:
+            written = generator.export_receipts_jsonl((make_order(n) for n in range(50000)), f)
+        count = 0
+        with open_jsonl(path) as f:
+            for record in ReceiptGenerator.iter_receipts_jsonl(f):
+                assert record["order_info"]["order_id"] == f"ORD_{count:06d}"
+                count += 1
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"Round-tripped {count} receipts, {os.path.getsize(path)} bytes gzipped, "
+              f"peak {peak / 1024:.0f} KiB")
+        assert written == count == 50000
+        assert peak < 5 * 1024 * 1024, "Export/import is not streaming!"
+    print("Receipts Round-trip Test PASSED!")
+
+
+def test_carts_roundtrip():
+    carts = []
+    for n in range(3):
+        cart = CartManager()
+        cart.add_item("Potato", n + 1.0, 30, "Ground")
+        cart.add_item("Mint", 0.5, 60, "Leafy")
+        carts.append(cart)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "carts.jsonl")
+        with open_jsonl(path, "w") as f:
+            assert CartManager.export_carts_jsonl(carts, f) == 3
+        with open(path) as f:
+            assert all("\n" not in line.rstrip("\n") and "  " not in line for line in f), "Not compact!"
+        with open_jsonl(path) as f:
+            imported = list(CartManager.iter_carts_jsonl(f))
+
+    assert [c.get_cart_total() for c in imported] == [c.get_cart_total() for c in carts]
+    assert set(imported[0].get_cart_items()) == set(carts[0].get_cart_items())
+    print("Carts Round-trip Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_receipts_roundtrip_bounded_memory()
+    test_carts_roundtrip()
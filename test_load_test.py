@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from load_test import main, percentile, run_load_test
+
+
+def make_config(data_dir, **overrides):
+    config = {"tills": 4, "orders": 10, "items_per_order": 4, "mode": "threads", "storage": "json",
+              "fsync": "never", "catalog_size": 60, "hot_skus": 3, "hot_stock": 5.0,
+              "latency": 0.0, "failure_rate": 0.2, "hold_ttl": 60.0, "seed": 3,
+              "data_dir": data_dir}
+    config.update(overrides)
+    return config
+
+
+def test_percentile():
+    samples = sorted(float(n) for n in range(1, 101))
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([], 95) == 0.0
+    print("Percentile Test PASSED!")
+
+
+def test_threaded_tills_never_oversell():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Holds lapse during the payment, so checkout races the other tills
+        report = run_load_test(make_config(tmp, latency=0.01, hold_ttl=0.002))
+    counts = report["counts"]
+    print(f"Threaded load test: {counts}")
+    # 15kg of hot stock for 40 orders: tills must run out and be refused
+    assert counts["stock_outs"] > 0, "Hot SKUs never ran out!"
+    assert counts["expired_holds"] > 0, "No hold ever lapsed mid-payment!"
+    assert counts["orders"] == 40
+    assert report["operations"]["add_to_cart"]["count"] > 0
+    assert report["invariant_ok"], f"Oversold: {report['violations']}"
+    print("Threaded Load Test PASSED!")
+
+
+def test_process_tills_never_oversell():
+    for storage in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run_load_test(make_config(tmp, tills=2, orders=8, mode="processes", storage=storage))
+        print(f"Process load test ({storage}): {report['counts']}")
+        assert report["counts"]["orders"] == 16
+        assert report["invariant_ok"], f"Oversold across processes: {report['violations']}"
+    print("Process Load Test PASSED!")
+
+
+def test_cli_writes_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "report.json")
+        assert main(["--tills", "2", "--orders", "5", "--latency", "0", "--catalog-size", "30",
+                     "--fsync", "never", "--data-dir", tmp, "--output", output]) == 0
+        with open(output) as f:
+            report = json.load(f)
+        assert report["invariant_ok"] and set(report["operations"]) == {"add_to_cart", "checkout",
+                                                                        "process", "order"}
+    print("Load Test CLI Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_threaded_tills_never_oversell()
+    test_process_tills_never_oversell()
+    test_cli_writes_report()
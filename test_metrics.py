@@ -0,0 +1,158 @@
+import os
+import tempfile
+import time
+import urllib.request
+import metrics
+from metrics import MetricsExporter, MetricsRegistry, timed
+from receipt_generator import ReceiptGenerator
+from storage_backends import JsonStorage
+from vegetable_database import VegetableDatabase
+
+
+def test_exposition_format():
+    metrics.enable(True)
+    try:
+        registry = MetricsRegistry()
+        orders = registry.counter("vvapp_test_orders_total", "Orders", ("method",))
+        orders.labels("UPI").inc()
+        orders.labels("UPI").inc(2)
+        registry.gauge("vvapp_test_holds", "Holds").set_function(lambda: 7)
+        latency = registry.histogram("vvapp_test_seconds", "Latency", ("page",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.labels("cart").observe(value)
+
+        text = registry.expose()
+        print(text)
+        assert "# TYPE vvapp_test_orders_total counter" in text
+        assert 'vvapp_test_orders_total{method="UPI"} 3' in text
+        assert "vvapp_test_holds 7" in text
+        # Buckets are cumulative and le="0.1" includes 0.1 itself
+        assert 'vvapp_test_seconds_bucket{page="cart",le="0.1"} 2' in text
+        assert 'vvapp_test_seconds_bucket{page="cart",le="1"} 3' in text
+        assert 'vvapp_test_seconds_bucket{page="cart",le="+Inf"} 4' in text
+        assert 'vvapp_test_seconds_count{page="cart"} 4' in text
+
+        # Non-finite gauge values are written out, not dropped with the whole scrape
+        odd = registry.gauge("vvapp_test_odd", "Odd values", ("kind",))
+        odd.labels("nan").set(float("nan"))
+        odd.labels("low").set(float("-inf"))
+        odd.labels("high").set_function(lambda: float("inf"))
+        text = registry.expose()
+        assert 'vvapp_test_odd{kind="nan"} NaN' in text
+        assert 'vvapp_test_odd{kind="low"} -Inf' in text
+        assert 'vvapp_test_odd{kind="high"} +Inf' in text
+        assert "vvapp_test_holds 7" in text
+
+        # A metric type without a value holder fails when it is declared
+        class NoChildren(metrics._Metric):
+            type_name = "untyped"
+        try:
+            NoChildren("vvapp_test_broken")
+        except TypeError as e:
+            print(f"Incomplete metric rejected: {e}")
+        else:
+            raise AssertionError("Metric without _new_child() was instantiated!")
+
+        # Declaring a metric again returns it; a conflicting declaration is an error
+        assert registry.counter("vvapp_test_orders_total", "Orders", ("method",)) is orders
+        try:
+            registry.gauge("vvapp_test_orders_total")
+        except ValueError as e:
+            print(f"Conflict detected: {e}")
+        else:
+            raise AssertionError("Conflicting metric was accepted!")
+    finally:
+        metrics.enable(False)
+    print("Exposition Format Test PASSED!")
+
+
+def test_disabled_cost():
+    metrics.enable(False)
+    registry = MetricsRegistry()
+    histogram = registry.histogram("vvapp_test_disabled_seconds")
+
+    def plain(x):
+        return x
+
+    wrapped = timed(histogram)(plain)
+    n = 200000
+    best_overhead = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for i in range(n):
+            plain(i)
+        base = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(n):
+            wrapped(i)
+        best_overhead = min(best_overhead, (time.perf_counter() - start - base) / n)
+    start = time.perf_counter()
+    for _ in range(n):
+        with histogram.time():
+            pass
+    context_cost = (time.perf_counter() - start) / n
+
+    print(f"Disabled overhead: decorator {best_overhead * 1e9:.0f}ns, context manager {context_cost * 1e9:.0f}ns")
+    assert best_overhead < 1e-6 and context_cost < 1e-6, "Disabled metrics cost over 1us!"
+    assert histogram.labels().count == 0, "Recorded while disabled!"
+    print("Disabled Cost Test PASSED!")
+
+
+def test_hot_paths_are_timed():
+    metrics.enable(True)
+    try:
+        receipts = metrics.REGISTRY.get("vvapp_generate_receipt_seconds").labels()
+        saves = metrics.REGISTRY.get("vvapp_save_data_seconds").labels()
+        before, saves_before = receipts.count, saves.count
+        ReceiptGenerator().generate_receipt({
+            "order_id": "ORD_1",
+            "items": {"item_1": {"name": "Potato", "quantity": 1.0, "price": 30, "category": "Ground"}},
+            "total_amount": 30.0,
+            "timestamp": "2024-01-01T10:00:00"
+        })
+        assert receipts.count == before + 1, "generate_receipt was not timed!"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = VegetableDatabase(storage=JsonStorage(os.path.join(tmp, "inventory.json"),
+                                                       os.path.join(tmp, "inventory.journal")))
+            db.save_data()
+            db.storage.close()
+        assert saves.count == saves_before + 1, "save_data was not timed!"
+    finally:
+        metrics.enable(False)
+    print("Hot Path Timing Test PASSED!")
+
+
+def test_exporters():
+    metrics.enable(True)
+    try:
+        registry = MetricsRegistry()
+        registry.counter("vvapp_test_scrapes_total", "Scrapes").inc()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vvapp.prom")
+            exporter = MetricsExporter(registry, port=0, path=path, interval=0.05)
+            exporter.start()
+            try:
+                host, port = exporter.address
+                with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                    body = response.read().decode()
+                    assert response.headers["Content-Type"].startswith("text/plain")
+                assert "vvapp_test_scrapes_total 1" in body
+
+                deadline = time.time() + 5
+                while not os.path.exists(path) and time.time() < deadline:
+                    time.sleep(0.01)
+                with open(path) as f:
+                    assert "vvapp_test_scrapes_total 1" in f.read()
+            finally:
+                exporter.stop()
+    finally:
+        metrics.enable(False)
+    print("Exporter Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_disabled_cost()
+    test_hot_paths_are_timed()
+    test_exporters()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from order_queue import OrderQueue
+
+
+def make_order(n):
+    return {
+        'order_id': f"ORD_{n:05d}",
+        'items': {f"item_{n}": {"name": "Potato", "quantity": 1.0, "price": 30, "category": "Ground"}},
+        'total_amount': 30.0,
+        'timestamp': "2024-01-01T10:00:00"
+    }
+
+
+def test_queue_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queue.journal")
+        queue = OrderQueue(path, fsync_policy="never")
+        for n in range(5):
+            assert queue.enqueue(make_order(n))
+        assert not queue.enqueue(make_order(0)), "Duplicate order accepted!"
+
+        # Process/cancel by ID, not by position
+        assert queue.remove("ORD_00003")['order_id'] == "ORD_00003"
+        assert queue.remove("ORD_00003") is None
+        assert queue.dequeue()['order_id'] == "ORD_00000"
+        queue.close()
+
+        # A restart recovers the same pending orders in the same order,
+        # without rewriting a journal that is not worth compacting
+        inode = os.stat(path).st_ino
+        recovered = OrderQueue(path)
+        assert os.stat(path).st_ino == inode, "Journal rewritten on startup!"
+        print(f"Recovered {len(recovered)} orders")
+        assert [o['order_id'] for o in recovered] == ["ORD_00001", "ORD_00002", "ORD_00004"]
+        assert recovered.peek()['order_id'] == "ORD_00001"
+        recovered.close()
+    print("Queue Recovery Test PASSED!")
+
+
+def test_queue_compaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queue.journal")
+        queue = OrderQueue(path, fsync_policy="never", compact_every=100)
+        for n in range(3000):
+            queue.enqueue(make_order(n))
+        for n in range(0, 3000, 2):
+            queue.remove(f"ORD_{n:05d}")
+        while len(queue) > 10:
+            queue.dequeue()
+
+        # The journal was rewritten with only the live orders
+        assert queue.journal.entries < 200, "Journal never compacted!"
+        remaining = [o['order_id'] for o in queue.list_orders()]
+        queue.close()
+        assert [o['order_id'] for o in OrderQueue(path).list_orders()] == remaining
+    print("Queue Compaction Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_queue_recovery()
+    test_queue_compaction()
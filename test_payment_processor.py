@@ -0,0 +1,93 @@
+import asyncio
+from payment_processor import PaymentProcessor, MockGateway, GATEWAY_TIMEOUT
+
+UPI = {"upi_id": "stall@bank"}
+
+
+def test_idempotent_submit():
+    gateway = MockGateway(latency=0.05, failure_rate=0.0)
+    processor = PaymentProcessor(gateway=gateway)
+
+    first = processor.submit_payment(100, "UPI", UPI, idempotency_key="order-1")
+    second = processor.submit_payment(100, "UPI", UPI, idempotency_key="order-1")
+    assert first is second, "Same key started a second payment!"
+    success, message, txn_id = first.result()
+    print(f"{message}: {txn_id}")
+    assert success and gateway.charge_count == 1
+
+    # Validation failures never reach the gateway
+    assert processor.process_payment(100, "UPI", {"upi_id": "nobank"}) == (False, "Invalid UPI ID", None)
+    assert gateway.charge_count == 1
+    processor.shutdown()
+    print("Idempotent Submit Test PASSED!")
+
+
+def test_timeout_retry_does_not_double_charge():
+    # Each call outlives the per-call timeout; retries join the in-flight charge
+    gateway = MockGateway(latency=0.3, failure_rate=0.0)
+    processor = PaymentProcessor(gateway=gateway, timeout=0.1, max_retries=4, backoff=0.05)
+
+    success, _, _ = processor.process_payment(50, "Credit Card",
+                                              {"card_number": "4111111111111111", "cvv": "123"},
+                                              idempotency_key="order-2")
+    assert success and gateway.charge_count == 1, "Retry charged twice!"
+
+    # Transient failures are retried, then reported
+    flaky = PaymentProcessor(gateway=MockGateway(latency=0.0, failure_rate=1.0),
+                             max_retries=2, backoff=0.01)
+    assert flaky.process_payment(50, "UPI", UPI) == (False, GATEWAY_TIMEOUT, None)
+    assert flaky.gateway.charge_count == 3
+    processor.shutdown()
+    flaky.shutdown()
+    print("Timeout Retry Test PASSED!")
+
+
+def test_idempotency_keys_expire():
+    now = [0.0]
+    clock = lambda: now[0]
+    gateway = MockGateway(latency=0.0, failure_rate=0.0, idempotency_ttl=60, clock=clock)
+    processor = PaymentProcessor(gateway=gateway, idempotency_ttl=60, clock=clock)
+
+    first = processor.submit_payment(20, "UPI", UPI, idempotency_key="order-3")
+    first.result()
+    now[0] = 30
+    assert processor.submit_payment(20, "UPI", UPI, idempotency_key="order-3") is first
+    assert gateway.charge_count == 1, "Repeat inside the window charged again!"
+
+    # Past the window the key is forgotten and adding new keys prunes it
+    now[0] = 61
+    processor.process_payment(20, "UPI", UPI, idempotency_key="order-4")
+    assert len(processor._requests) == 1 and len(gateway._charges) == 1
+    assert processor.submit_payment(20, "UPI", UPI, idempotency_key="order-3") is not first
+
+    # The size cap drops the oldest settled keys too
+    capped = PaymentProcessor(gateway=MockGateway(latency=0.0, failure_rate=0.0), clock=clock)
+    capped._requests.max_keys = 3
+    for i in range(10):
+        capped.process_payment(5, "Cash", {}, idempotency_key=f"cap-{i}")
+    assert len(capped._requests) <= 4
+    processor.shutdown()
+    capped.shutdown()
+    print("Idempotency Expiry Test PASSED!")
+
+
+def test_async_payment():
+    processor = PaymentProcessor(gateway=MockGateway(latency=0.05, failure_rate=0.0))
+
+    async def checkout_many():
+        return await asyncio.gather(*(
+            processor.process_payment_async(10, "Cash", {}, idempotency_key=f"till-{i}")
+            for i in range(4)
+        ))
+
+    results = asyncio.run(checkout_many())
+    assert all(success for success, _, _ in results)
+    processor.shutdown()
+    print("Async Payment Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_idempotent_submit()
+    test_timeout_retry_does_not_double_charge()
+    test_idempotency_keys_expire()
+    test_async_payment()
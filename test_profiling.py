@@ -0,0 +1,79 @@
+import os
+import pstats
+import tempfile
+import threading
+from profiling import RerunProfiler
+
+
+def build_strings(n):
+    return [str(i) * 10 for i in range(n)]
+
+
+def test_sampled_reruns_write_rolling_profiles():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = RerunProfiler(tmp, sample_every=3, keep=2)
+        kept = []
+        for _ in range(12):
+            with profiler.profile("cart"):
+                kept.append(build_strings(5000))
+
+        page_dir = os.path.join(tmp, "cart")
+        files = sorted(name for name in os.listdir(page_dir) if name.endswith(".pstats"))
+        print(f"Profiles kept: {files}")
+        assert profiler.pages["cart"].samples == 4, "Did not sample every 3rd rerun!"
+        assert len(files) == 2 and files[-1].endswith("_000004.pstats"), "Old profiles not rolled!"
+
+        stats = pstats.Stats(os.path.join(page_dir, files[-1]))
+        assert any(func[2] == "build_strings" for func in stats.stats), "Rerun code not profiled!"
+
+        with open(os.path.join(page_dir, "allocations.txt")) as f:
+            report = f.read()
+        print(report)
+        assert "Sampled reruns: 4" in report
+        assert "test_profiling.py" in report, "Top allocation not attributed to its line!"
+    print("Rolling Profiles Test PASSED!")
+
+
+def test_rerun_exceptions_still_recorded():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = RerunProfiler(tmp, sample_every=1)
+        # st.rerun() unwinds main() with an exception; the sample must still land
+        try:
+            with profiler.profile("inventory"):
+                raise RuntimeError("rerun")
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("Exception was swallowed!")
+        assert profiler.pages["inventory"].samples == 1
+        assert "Page: inventory" in profiler.report()
+    print("Rerun Exception Test PASSED!")
+
+
+def test_one_profile_at_a_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = RerunProfiler(tmp, sample_every=1)
+        inside, release = threading.Event(), threading.Event()
+
+        def slow_rerun():
+            with profiler.profile("analytics"):
+                inside.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=slow_rerun)
+        thread.start()
+        inside.wait(5)
+        with profiler.profile("queue"):
+            pass
+        release.set()
+        thread.join()
+
+        assert profiler.skipped == 1 and "queue" not in profiler.pages
+        assert profiler.pages["analytics"].samples == 1
+    print("Single Profile Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_sampled_reruns_write_rolling_profiles()
+    test_rerun_exceptions_still_recorded()
+    test_one_profile_at_a_time()
@@ -0,0 +1,47 @@
+import io
+from receipt_generator import ReceiptGenerator, ReceiptTemplate
+
+
+def make_order(n):
+    return {
+        'order_id': f"ORD_{n:05d}",
+        'items': {
+            "item_1": {"name": "Sweet_Potato", "quantity": 2.5, "price": 45, "category": "Ground"},
+            "item_2": {"name": "Green_Chili", "quantity": 0.5, "price": 100, "category": "Legumes"}
+        },
+        'total_amount': 162.5,
+        'timestamp': "2024-01-01T10:30:15.123456"
+    }
+
+
+def test_template_receipt():
+    generator = ReceiptGenerator()
+    receipt = generator.generate_receipt(make_order(1))
+    print(receipt)
+    assert "Date & Time: 2024-01-01 10:30:15" in receipt
+    assert "Sweet Potato         2.5      45       112.50" in receipt
+    assert "Tax (5%):" in receipt and "₹   170.62" in receipt
+
+    # The template is compiled once per store configuration
+    assert generator.template is ReceiptGenerator().template
+    generator.store_name = "Hill Top Greens"
+    assert generator.template is not ReceiptTemplate.for_store(
+        "Green Valley Vegetable Market", "123 Market Street, Fresh City", "+91-9876543210", 0.05)
+    assert "Hill Top Greens" in generator.generate_receipt(make_order(1))
+    print("Template Receipt Test PASSED!")
+
+
+def test_batch_receipts():
+    generator = ReceiptGenerator()
+    stream = io.StringIO()
+    written = generator.write_receipts((make_order(n) for n in range(500)), stream)
+    assert written == 500
+    text = stream.getvalue()
+    assert text.count("TOTAL AMOUNT") == 500
+    assert text.split("\n\n=")[0] == generator.generate_receipt(make_order(0)).split("\n\n=")[0]
+    print("Batch Receipts Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_template_receipt()
+    test_batch_receipts()
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import time
+from reservations import ReservationManager
+from storage_backends import JsonStorage
+from vegetable_database import VegetableDatabase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_db(tmp):
+    return VegetableDatabase(storage=JsonStorage(os.path.join(tmp, "inventory.json"),
+                                                 os.path.join(tmp, "inventory.journal"), "never"))
+
+
+def test_holds_expire_and_renew():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        clock = FakeClock()
+        reservations = ReservationManager(db, ttl=60, clock=clock)
+        potato = db.get_vegetable_by_name("Potato")["stock"]
+
+        assert reservations.reserve("CART_A", "Potato", 5.0)
+        assert reservations.reserve("CART_B", "Potato", 2.0)
+        assert not reservations.reserve("CART_B", "Potato", 10000.0), "Oversold!"
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 7.0
+
+        # CART_B stays active, CART_A goes idle past its TTL
+        clock.now += 45
+        assert reservations.renew("CART_B")
+        clock.now += 30
+        assert reservations.sweep() == 1
+        assert not reservations.is_active("CART_A") and reservations.is_active("CART_B")
+        assert not reservations.renew("CART_A")
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 2.0
+
+        # Releasing part of a hold, then committing the rest as a sale
+        assert reservations.reserve("CART_B", "Onion", 1.0)
+        assert reservations.release("CART_B", "Potato", 1.0)
+        assert reservations.get_held("CART_B") == {"Potato": 1.0, "Onion": 1.0}
+        assert reservations.commit("CART_B")
+        clock.now += 1000
+        assert reservations.sweep() == 0
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 1.0
+
+        # Checking out a lapsed cart takes its stock again, all or nothing
+        assert reservations.reserve("CART_C", "Potato", 3.0)
+        clock.now += 61
+        assert reservations.sweep() == 1
+        assert reservations.checkout("CART_C", [("Potato", 3.0)])
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 4.0
+        assert not reservations.checkout("CART_D", [("Potato", 1.0), ("Onion", 100000.0)]), "Oversold!"
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 4.0
+        db.storage.close()
+    print("Reservation Expiry Test PASSED!")
+
+
+def test_checkout_after_hold_lapsed_and_reopened():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        clock = FakeClock()
+        reservations = ReservationManager(db, ttl=60, clock=clock)
+        mint = db.get_vegetable_by_name("Mint")["stock"]
+        potato = db.get_vegetable_by_name("Potato")["stock"]
+        cart = [("Mint", 5.0)]
+
+        # The Mint hold lapses, then an add under the same cart ID opens a new hold
+        assert reservations.reserve("CART_A", "Mint", 5.0)
+        clock.now += 61
+        assert reservations.sweep() == 1
+        assert reservations.reserve("CART_A", "Potato", 1.0)
+        cart.append(("Potato", 1.0))
+
+        # Another till buys all the Mint; the stale line must not be sold again
+        assert reservations.reserve("CART_B", "Mint", mint)
+        assert reservations.checkout("CART_B", [("Mint", mint)])
+        assert not reservations.checkout("CART_A", cart), "Sold stock that was never held!"
+        assert db.get_vegetable_by_name("Mint")["stock"] == 0
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato, "Failed checkout kept the hold's stock"
+
+        # With the stock still there, checkout takes just the unheld lines again
+        db.return_stock("Mint", 5.0)
+        assert reservations.reserve("CART_C", "Mint", 5.0)
+        clock.now += 61
+        reservations.sweep()
+        assert reservations.reserve("CART_C", "Potato", 1.0)
+        assert reservations.checkout("CART_C", [("Mint", 5.0), ("potato", 1.0)])
+        assert db.get_vegetable_by_name("Mint")["stock"] == 0
+        assert db.get_vegetable_by_name("Potato")["stock"] == potato - 1.0
+        db.storage.close()
+    print("Lapsed Hold Checkout Test PASSED!")
+
+
+def test_many_holds_batch_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        clock = FakeClock()
+        reservations = ReservationManager(db, ttl=60, clock=clock)
+        returned_batches = []
+        return_stock_many = db.return_stock_many
+        def counting_return(lines):
+            lines = list(lines)
+            returned_batches.append(len(lines))
+            return return_stock_many(lines)
+        db.return_stock_many = counting_return
+
+        before = db.get_store_totals()["stock"]
+        for n in range(20000):
+            assert reservations.reserve(f"CART_{n}", "Potato" if n % 2 else "Onion", 0.001)
+        for n in range(0, 20000, 4):
+            reservations.renew(f"CART_{n}")  # O(1): no heap push
+
+        clock.now += 61
+        start = time.perf_counter()
+        expired = reservations.sweep()
+        elapsed = time.perf_counter() - start
+        print(f"Expired {expired} holds in {elapsed * 1000:.1f}ms")
+        assert expired == 20000 and len(reservations) == 0
+        assert returned_batches == [2], "Expired stock was not returned in one batch!"
+        assert abs(db.get_store_totals()["stock"] - before) < 1e-6
+        db.storage.close()
+    print("Batch Expiry Test PASSED!")
+
+
+def test_background_sweeper():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        reservations = ReservationManager(db, ttl=0.05, sweep_interval=0.01)
+        reservations.start()
+        onion = db.get_vegetable_by_name("Onion")["stock"]
+        reservations.reserve("CART_X", "Onion", 3.0)
+        deadline = time.time() + 2.0
+        while reservations.is_active("CART_X") and time.time() < deadline:
+            time.sleep(0.01)
+        reservations.stop()
+        assert db.get_vegetable_by_name("Onion")["stock"] == onion
+        db.storage.close()
+    print("Background Sweeper Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_holds_expire_and_renew()
+    test_checkout_after_hold_lapsed_and_reopened()
+    test_many_holds_batch_expiry()
+    test_background_sweeper()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from datetime import datetime
+from sales_ledger import SalesLedger
+
+
+def make_order(n, hour, name="Potato", category="Ground", quantity=2.0, price=30):
+    return {
+        'order_id': f"ORD_{n:05d}",
+        'items': {"item_1": {"name": name, "quantity": quantity, "price": price, "category": category},
+                  "item_2": {"name": "Mint", "quantity": 0.5, "price": 60, "category": "Leafy"}},
+        'total_amount': quantity * price + 30,
+        'timestamp': f"2024-01-01T{hour:02d}:15:00"
+    }
+
+
+def test_ledger_rollups_and_recovery():
+    now = datetime(2024, 1, 1, 12, 30)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sales.journal")
+        ledger = SalesLedger(path, fsync_policy="never")
+        for n in range(10):
+            assert ledger.record_order(make_order(n, hour=10 + n % 2))
+        assert ledger.record_order(make_order(10, hour=12, name="Tomato", quantity=5.0, price=40))
+        assert not ledger.record_order(make_order(0, hour=10)), "Order counted twice!"
+
+        assert len(ledger) == 22 and ledger.order_count() == 11
+        trend = ledger.get_trend("hour", 4, now=now)
+        assert [t["Revenue (₹)"] for t in trend] == [0.0, 5 * 90.0, 5 * 90.0, 230.0]
+        assert trend[-1]["Period"] == "2024-01-01 12:00"
+        assert ledger.get_trend("day", 1, category="Leafy", now=now)[0]["Quantity (kg)"] == 5.5
+        assert ledger.get_trend("hour", 1, item="Tomato", now=now)[0]["Revenue (₹)"] == 200.0
+
+        top = ledger.get_top_sellers(2)
+        assert [t["Name"] for t in top] == ["Potato", "Mint"]
+        assert ledger.get_top_sellers(1, by="quantity", category="Ground")[0]["Name"] == "Potato"
+        totals = ledger.get_totals()
+        ledger.close()
+
+        # A restart rebuilds the same columns and rollups from the journal
+        recovered = SalesLedger(path)
+        assert recovered.get_totals() == totals
+        assert recovered.get_trend("hour", 4, now=now) == trend
+        assert recovered.item_name(recovered.item_codes[-2]) == "Tomato"
+        recovered.close()
+    print(f"Ledger totals: {totals}")
+    print("Sales Ledger Test PASSED!")
+
+
+def test_ledger_retention_and_compaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sales.journal")
+        ledger = SalesLedger(path, fsync_policy="never", hourly_retention_days=2,
+                             daily_retention_days=5, compact_every=25)
+        for n in range(30):
+            order = make_order(n, hour=9)
+            order['timestamp'] = f"2024-01-{n + 1:02d}T09:15:00"
+            assert ledger.record_order(order)
+        now = datetime(2024, 1, 30, 12)
+
+        # All-time totals survive; detail older than the windows does not
+        assert ledger.order_count() == 30 and len(ledger) == 60
+        assert len(ledger.timestamps) == 6, "Old order lines were never pruned!"
+        assert len(ledger._rollups["hour"]) == 3 * 5 and len(ledger._rollups["day"]) == 6 * 5
+        assert [t["Revenue (₹)"] for t in ledger.get_trend("day", 7, now=now)] == [0.0] + [90.0] * 6
+        # Recording stays idempotent: a repeat past the window is refused, not recounted
+        repeat = make_order(0, hour=9)
+        assert not ledger.record_order(repeat), "Forgotten order ID counted again!"
+        repeat = make_order(29, hour=9)
+        repeat['timestamp'] = "2024-01-30T09:15:00"
+        assert not ledger.record_order(repeat), "Order counted twice!"
+        assert ledger.order_count() == 30
+
+        # The journal was replaced by a snapshot and still restores everything
+        assert ledger.journal.entries < 25, "Journal never compacted!"
+        totals = ledger.get_totals()
+        trend = ledger.get_trend("hour", 72, now=now)
+        top = ledger.get_top_sellers(2)
+        ledger.close()
+        recovered = SalesLedger(path, hourly_retention_days=2, daily_retention_days=5, compact_every=25)
+        assert recovered.get_totals() == totals
+        assert recovered.get_trend("hour", 72, now=now) == trend
+        assert recovered.get_top_sellers(2) == top
+        assert list(recovered.timestamps) == list(ledger.timestamps)
+
+        # A queued order recorded late keeps its earlier timestamp; it is still
+        # pruned once it falls out of the window, wherever it sits
+        late = make_order(100, hour=20)
+        late['timestamp'] = "2024-01-28T20:15:00"
+        assert recovered.record_order(late)
+        latest = make_order(101, hour=9)
+        latest['timestamp'] = "2024-02-01T09:15:00"
+        assert recovered.record_order(latest)
+        cutoff = datetime(2024, 1, 30).timestamp()
+        assert min(recovered.timestamps) >= cutoff, "Late order lines were never pruned!"
+        assert "ORD_00100" not in recovered._order_ids
+        recovered.close()
+    print("Ledger Retention Test PASSED!")
+
+
+def test_refunds_due_survive_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sales.journal")
+        ledger = SalesLedger(path, fsync_policy="never", compact_every=4)
+        for n in range(3):
+            order = dict(make_order(n, hour=10), transaction_id=f"TXN_{n}", payment_method="UPI")
+            assert ledger.record_refund_due(order, "Items sold out")
+        assert not ledger.record_refund_due(order, "Items sold out"), "Refund flagged twice!"
+        assert ledger.settle_refund("TXN_1") and not ledger.settle_refund("TXN_1")
+        assert ledger.order_count() == 0, "A refund counted as a sale!"
+        ledger.close()
+
+        # Replayed from the journal, then again from the compacted snapshot
+        for _ in range(2):
+            recovered = SalesLedger(path, compact_every=4)
+            refunds = recovered.get_refunds_due()
+            assert [r["transaction_id"] for r in refunds] == ["TXN_0", "TXN_2"]
+            assert refunds[0]["amount"] == 90.0 and refunds[0]["order_id"] == "ORD_00000"
+            recovered.close()
+    print("Refunds Due Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_ledger_rollups_and_recovery()
+    test_ledger_retention_and_compaction()
+    test_refunds_due_survive_restart()
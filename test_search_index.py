@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+import time
+from search_index import SearchIndex
+from storage_backends import SQLiteStorage
+from vegetable_database import VegetableDatabase
+
+
+def test_ranking_and_typos():
+    index = SearchIndex()
+    index.rebuild([
+        ("potato", "Potato", "Ground", []),
+        ("sweet_potato", "Sweet_Potato", "Ground", []),
+        ("tomato", "Tomato", "Fruity_Veges", []),
+        ("okra", "Okra", "Fruity_Veges", ["Bhindi", "Lady Finger"]),
+        ("spinach", "Spinach", "Leafy", []),
+    ])
+    assert index.search("potato") == ["potato", "sweet_potato"]   # exact, then word prefix
+    assert index.search("ato") == ["potato", "tomato", "sweet_potato"]  # substring, shortest first
+    assert index.search("bhin") == ["okra"]                       # alias prefix
+    assert index.search("lady fing") == ["okra"]                  # multi-word alias
+    assert index.search("leaf") == ["spinach"]                    # category
+    assert index.search("spinch")[0] == "spinach"                 # typo
+    assert index.search("tomaot")[0] == "tomato"
+    assert index.search("potato", limit=1) == ["potato"]
+    assert index.search("xyz") == []
+
+    # Incremental updates
+    index.add("potato", "Baby_Potato", "Ground", [])
+    assert index.search("baby") == ["potato"]
+    index.remove("sweet_potato")
+    assert index.search("sweet") == []
+    index.remove("spinach")
+    assert index.search("leaf") == []
+    print("Search Ranking Test PASSED!")
+
+
+def test_search_latency_100k():
+    rng = random.Random(7)
+    words = ["potato", "tomato", "onion", "carrot", "spinach", "mint", "lady", "finger", "bitter",
+             "gourd", "red", "green", "baby", "organic", "sweet", "corn", "cabbage", "brinjal",
+             "radish", "beans", "garlic", "ginger", "chilli", "capsicum", "pumpkin", "cucumber"]
+    index = SearchIndex()
+    index.rebuild((f"sku{i}", f"{' '.join(rng.sample(words, 2))} {i}", f"cat{i % 12}", [])
+                  for i in range(100000))
+
+    worst = 0.0
+    for query in ["pot", "tomato", "ato", "gourd 99", "spinch", "ladyfinger", "cat3", "zzz"]:
+        start = time.perf_counter()
+        results = index.search(query, 20)
+        elapsed = time.perf_counter() - start
+        worst = max(worst, elapsed)
+        print(f"{query!r}: {len(results)} results in {elapsed * 1000:.2f}ms")
+    assert worst < 0.05, "Search is too slow at 100k SKUs!"
+    print("Search Latency Test PASSED!")
+
+
+def test_database_search_updates():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteStorage(os.path.join(tmp, "inventory.db"))
+        db = VegetableDatabase(storage=storage)
+        assert "Okra" in db.search("okr")["Fruity_Veges"]
+
+        # The index follows adds, renames, aliases and removals
+        assert db.add_vegetable("Leafy", "Fenugreek", 40, 10, aliases=["Methi"])
+        assert list(db.search("methi")["Leafy"]) == ["Fenugreek"]
+        assert db.rename_vegetable("Okra", "Lady_Finger")
+        assert db.get_vegetable_by_name("Okra") is None
+        assert list(db.search("lady")["Fruity_Veges"]) == ["Lady_Finger"]
+        assert db.set_aliases("Lady_Finger", ["Bhindi"])
+        assert list(db.search("bhindi")["Fruity_Veges"]) == ["Lady_Finger"]
+        assert db.remove_vegetable("Fenugreek")
+        assert db.search("methi") == {}
+        storage.close()
+
+        # Renames and aliases survive a restart
+        reopened = SQLiteStorage(os.path.join(tmp, "inventory.db"))
+        db2 = VegetableDatabase(storage=reopened)
+        assert db2.get_vegetable_by_name("lady_finger")["aliases"] == ["Bhindi"]
+        assert list(db2.search("bhindi")["Fruity_Veges"]) == ["Lady_Finger"]
+        reopened.close()
+    print("Database Search Test PASSED!")
+
+
+if __name__ == "__main__":
+    test_ranking_and_typos()
+    test_search_latency_100k()
+    test_database_search_updates()
@@ -1,12 +1,49 @@
-import json
 import os
-import pandas as pd
-from typing import Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, List, Optional, Tuple, Union
+from journal import FSYNC_ALWAYS
+from metrics import REGISTRY, timed
+from search_index import SearchIndex
+from storage_backends import (
+    DB_FILE, JOURNAL_FILE, SQLITE_FILE, StorageBackend, JsonStorage, SQLiteStorage,
+    migrate_json_to_sqlite
+)
+
+if TYPE_CHECKING:
+    import pandas as pd  # only get_inventory_summary() needs it, and imports it lazily
+
+LOCK_STRIPES = 64
+DEFAULT_REORDER_LEVEL = 5.0  # kg; items can override it with "reorder_level"
+
+SAVE_DATA_SECONDS = REGISTRY.histogram("vvapp_save_data_seconds",
+                                       "Time to persist a full inventory snapshot")
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_shared_database() -> "VegetableDatabase":
+    """Return the one VegetableDatabase shared by every session in this process."""
+    global _shared_db
+    if _shared_db is None:
+        with _shared_db_lock:
+            if _shared_db is None:
+                # VVAPP_STORAGE=sqlite switches busy stalls to the SQLite backend
+                # VVAPP_MULTIPROCESS=1 when several server processes share the files
+                shared = os.environ.get("VVAPP_MULTIPROCESS") == "1"
+                if os.environ.get("VVAPP_STORAGE", "json") == "sqlite":
+                    migrate_json_to_sqlite()
+                    storage = SQLiteStorage(SQLITE_FILE, shared=shared)
+                else:
+                    storage = JsonStorage(DB_FILE, JOURNAL_FILE, shared=shared)
+                _shared_db = VegetableDatabase(storage=storage)
+    return _shared_db
 
-DB_FILE = "inventory_data.json"
 
 class VegetableDatabase:
-    def __init__(self):
+    def __init__(self, storage: Optional[StorageBackend] = None,
+                 fsync_policy: str = FSYNC_ALWAYS, compact_every: int = 500):
         self.default_data = {
             "Ground": {
                 "Potato": {"price": 30, "stock": 50},
@@ -42,86 +79,595 @@ class VegetableDatabase:
                 "Cluster_Beans": {"price": 60, "stock": 15}
             }
         }
-        self.vegetables = self.load_data()
+        # The default JSON backend appends stock changes to a journal and only
+        # rewrites the DB_FILE snapshot every `compact_every` records.
+        if storage is None:
+            storage = JsonStorage(DB_FILE, JOURNAL_FILE, fsync_policy, compact_every)
+        self.storage = storage
+        # Stock is guarded by striped per-SKU locks; every change bumps the
+        # item's version so callers can compare-and-set.
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._compact_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        # Running stock/value/item totals per category and for the whole store,
+        # plus a store-wide version that bumps on every change.
+        self._totals_lock = threading.Lock()
+        self._category_totals: Dict[str, Dict[str, float]] = {}
+        self._store_totals: Dict[str, float] = {}
+        self.version = 0
+        self._summary_cache = None  # (version, records, DataFrame or None)
+        # Every item's margin (stock - reorder level), plus the items whose
+        # margin is negative; the most-urgent-first order of those is sorted
+        # on demand and cached until one of them changes. Listeners hear about
+        # crossings in either direction once the writer has released its locks.
+        self._threshold_lock = threading.Lock()
+        self._margin_of: Dict[str, float] = {}
+        self._low: Dict[str, float] = {}
+        self._low_sorted: Optional[List[str]] = None
+        self._low_stock_listeners: List[Callable[[str, str, float, float, bool], None]] = []
+        self._local = threading.local()  # per-thread write depth and pending crossings
+        # Name/alias/category search index, built on the first search and
+        # then kept up to date by add/remove/rename.
+        self._search_lock = threading.Lock()
+        self._search: Optional[SearchIndex] = None
+        # Shared files are read under the cross-process lock, so replay can't
+        # cut off a record another process is still appending
+        with self.storage.locked():
+            self.vegetables = self.load_data()
+        self._index: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+        self._rebuild_index()
 
     def load_data(self) -> Dict:
-        """Load inventory from JSON file or use default."""
-        if os.path.exists(DB_FILE):
-            try:
-                with open(DB_FILE, 'r') as f:
-                    return json.load(f)
-            except:
-                return self.default_data
-        return self.default_data
+        """Load inventory from the storage backend or use default."""
+        return self.storage.load(self.default_data)
 
+    @timed(SAVE_DATA_SECONDS)
     def save_data(self):
-        """Save current inventory state to JSON."""
-        with open(DB_FILE, 'w') as f:
-            json.dump(self.vegetables, f, indent=4)
+        """Persist a full copy of the current inventory."""
+        with self._write_section(), self._all_locks():
+            self.storage.save(self.vegetables)
+
+    @contextmanager
+    def _write_section(self):
+        """Hold the backend's cross-process lock and catch up on other writers.
+
+        Taken before any stripe so lock order is always backend -> stripes.
+        Low-stock listeners run after the outermost section has let go.
+        """
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            with self.storage.locked():
+                if self.storage.shared:
+                    self._catch_up()
+                yield
+        finally:
+            self._local.depth = depth
+            self._dispatch_low_stock()
+
+    def _catch_up(self) -> bool:
+        """Apply writes other processes made since we last looked."""
+        if not self.storage.changed():
+            return False
+        changes = self.storage.read_changes()
+        with self._all_locks():
+            if changes is None:
+                low_before = set(self._low_stock_keys())
+                self.vegetables = self.storage.load(self.default_data)
+                self._rebuild_index()
+                for key in self._index:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                low_after = set(self._low_stock_keys())
+                for key in low_before ^ low_after:
+                    if key in self._index:
+                        self._queue_low_stock(key, key in low_after)
+            else:
+                for name, _, stock in changes:
+                    key = name.lower()
+                    found = self._index.get(key)
+                    if found is not None:
+                        _, category, details = found
+                        delta = stock - details["stock"]
+                        details["stock"] = stock
+                        self._versions[key] = self._versions.get(key, 0) + 1
+                        self._adjust_totals(category, delta, delta * details["price"])
+                        self._update_threshold_index(key)
+        return True
+
+    def refresh_if_changed(self) -> bool:
+        """Pick up other processes' writes; a stat call when nothing changed."""
+        if not self.storage.shared:
+            return False
+        with self.storage.locked():
+            changed = self._catch_up()
+        self._dispatch_low_stock()
+        return changed
+
+    def _stripe(self, key: str) -> threading.Lock:
+        return self._locks[hash(key) % LOCK_STRIPES]
+
+    @contextmanager
+    def _all_locks(self):
+        """Hold every stripe, for snapshots and structural changes."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def _record_changes(self, changes: List[Tuple[str, float, float]]):
+        """Persist (name, delta, new_stock) changes. Caller holds the stripes."""
+        for name, delta, _ in changes:
+            key = name.lower()
+            self._versions[key] = self._versions.get(key, 0) + 1
+            _, category, details = self._index[key]
+            self._adjust_totals(category, delta, delta * details["price"])
+            self._update_threshold_index(key)
+        self.storage.record_changes(changes)
+
+    def _maybe_compact(self):
+        """Let the backend fold its change log into a snapshot when due."""
+        if not self.storage.needs_compaction():
+            return
+        if self._compact_lock.acquire(blocking=False):
+            try:
+                if self.storage.needs_compaction():
+                    self.save_data()
+            finally:
+                self._compact_lock.release()
+
+    def _rebuild_index(self):
+        """Rebuild the lowercase name -> (name, category, record) index."""
+        index = {}
+        for category, items in self.vegetables.items():
+            for name, details in items.items():
+                key = name.lower()
+                if key in index:
+                    raise ValueError(
+                        f"Duplicate vegetable '{name}' in categories "
+                        f"'{index[key][1]}' and '{category}'"
+                    )
+                index[key] = (name, category, details)
+        self._index = index
+        with self._search_lock:
+            self._search = None
+        self._rebuild_totals()
+        self._rebuild_threshold_index()
+
+    def _reorder_level(self, details: Dict[str, Any]) -> float:
+        return details.get("reorder_level", DEFAULT_REORDER_LEVEL)
+
+    def _rebuild_threshold_index(self):
+        margins = {key: details["stock"] - self._reorder_level(details)
+                   for key, (_, _, details) in self._index.items()}
+        with self._threshold_lock:
+            self._margin_of = margins
+            self._low = {key: margin for key, margin in margins.items() if margin < 0}
+            self._low_sorted = None
+
+    def _update_threshold_index(self, key: str):
+        """Re-key one item after its stock or reorder level changed. O(1)."""
+        details = self._index[key][2]
+        margin = details["stock"] - self._reorder_level(details)
+        with self._threshold_lock:
+            old = self._margin_of.get(key)
+            self._margin_of[key] = margin
+            if margin < 0:
+                self._low[key] = margin
+                self._low_sorted = None
+            elif key in self._low:
+                del self._low[key]
+                self._low_sorted = None
+        was_low = old is not None and old < 0
+        if was_low != (margin < 0):
+            self._queue_low_stock(key, margin < 0)
+
+    def _drop_threshold_entry(self, key: str):
+        with self._threshold_lock:
+            self._margin_of.pop(key, None)
+            if self._low.pop(key, None) is not None:
+                self._low_sorted = None
+
+    def _low_stock_keys(self) -> List[str]:
+        """Keys of items below their reorder level, most urgent first.
+
+        O(k log k) in the number of low items after a change, O(k) otherwise.
+        """
+        with self._threshold_lock:
+            if self._low_sorted is None:
+                self._low_sorted = sorted(self._low, key=lambda key: (self._low[key], key))
+            return list(self._low_sorted)
+
+    def _queue_low_stock(self, key: str, is_low: bool):
+        """Note a crossing; the caller holds stripe locks, so listeners run later."""
+        name, category, details = self._index[key]
+        event = (name, category, details["stock"], self._reorder_level(details), is_low)
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = []
+        pending.append(event)
+
+    def _dispatch_low_stock(self):
+        """Run listeners for this thread's queued crossings, once no locks are held."""
+        pending = getattr(self._local, "pending", None)
+        if not pending or getattr(self._local, "depth", 0):
+            return
+        self._local.pending = []
+        for event in pending:
+            for listener in list(self._low_stock_listeners):
+                try:
+                    listener(*event)
+                except Exception as e:
+                    print(f"Error in low stock listener: {e}")
+
+    def _rebuild_totals(self):
+        category_totals = {}
+        for category, items in self.vegetables.items():
+            category_totals[category] = {
+                "stock": sum(d["stock"] for d in items.values()),
+                "value": sum(d["price"] * d["stock"] for d in items.values()),
+                "items": len(items)
+            }
+        with self._totals_lock:
+            self._category_totals = category_totals
+            self._store_totals = {
+                key: sum(t[key] for t in category_totals.values())
+                for key in ("stock", "value", "items")
+            }
+            self.version += 1
+
+    def _adjust_totals(self, category: str, stock_delta: float, value_delta: float,
+                       items_delta: int = 0):
+        """O(1) update of the running totals for one change."""
+        with self._totals_lock:
+            totals = self._category_totals.setdefault(
+                category, {"stock": 0, "value": 0, "items": 0})
+            for target in (totals, self._store_totals):
+                target["stock"] += stock_delta
+                target["value"] += value_delta
+                target["items"] += items_delta
+            self.version += 1
+
+    def _lookup(self, name: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Case-insensitive O(1) lookup returning (name, category, record)."""
+        return self._index.get(name.lower())
 
     def get_all_vegetables(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
         return self.vegetables
 
     def get_vegetable_by_name(self, name: str) -> Dict[str, Any]:
-        for category, items in self.vegetables.items():
-            if name in items:
-                return {
-                    "name": name,
-                    "category": category,
-                    **items[name]
-                }
-        return None
+        found = self._lookup(name)
+        if found is None:
+            return None
+        stored_name, category, details = found
+        return {
+            "name": stored_name,
+            "category": category,
+            **details
+        }
 
     def get_vegetables_by_category(self, category: str) -> Dict[str, Dict[str, Any]]:
         return self.vegetables.get(category, {})
 
+    def add_vegetable(self, category: str, name: str, price: float, stock: float,
+                      aliases: Optional[List[str]] = None) -> bool:
+        """Add a new vegetable. Names must be unique across all categories."""
+        with self._write_section(), self._all_locks():
+            if name.lower() in self._index:
+                return False
+            details = {"price": price, "stock": stock}
+            if aliases:
+                details["aliases"] = list(aliases)
+            self.vegetables.setdefault(category, {})[name] = details
+            self._index[name.lower()] = (name, category, details)
+            self._adjust_totals(category, stock, price * stock, 1)
+            self._update_threshold_index(name.lower())
+        self._reindex_for_search(name.lower())
+        self.save_data()
+        return True
+
+    def remove_vegetable(self, name: str) -> bool:
+        with self._write_section(), self._all_locks():
+            found = self._lookup(name)
+            if found is None:
+                return False
+            stored_name, category, details = found
+            del self.vegetables[category][stored_name]
+            del self._index[stored_name.lower()]
+            self._drop_threshold_entry(stored_name.lower())
+            self._adjust_totals(category, -details["stock"],
+                                -details["price"] * details["stock"], -1)
+        self._reindex_for_search(stored_name.lower())
+        self.save_data()
+        return True
+
+    def rename_vegetable(self, name: str, new_name: str) -> bool:
+        """Rename an item in place, keeping its category, price and stock."""
+        with self._write_section(), self._all_locks():
+            found = self._lookup(name)
+            if found is None:
+                return False
+            stored_name, category, details = found
+            old_key, new_key = stored_name.lower(), new_name.lower()
+            if new_key != old_key and new_key in self._index:
+                return False
+            items = self.vegetables[category]
+            del items[stored_name]
+            items[new_name] = details
+            del self._index[old_key]
+            self._index[new_key] = (new_name, category, details)
+            self._versions[new_key] = self._versions.pop(old_key, 0) + 1
+            self._drop_threshold_entry(old_key)
+            self._update_threshold_index(new_key)
+            self._adjust_totals(category, 0, 0)
+        self._reindex_for_search(old_key)
+        self._reindex_for_search(new_key)
+        self.save_data()
+        return True
+
+    def set_aliases(self, name: str, aliases: List[str]) -> bool:
+        """Other names the item can be found by, e.g. "Bhindi" for Okra."""
+        with self._write_section(), self._all_locks():
+            found = self._lookup(name)
+            if found is None:
+                return False
+            details = found[2]
+            if aliases:
+                details["aliases"] = list(aliases)
+            else:
+                details.pop("aliases", None)
+        self._reindex_for_search(name.lower())
+        self.save_data()
+        return True
+
+    def _reindex_for_search(self, key: str):
+        """Bring one item's search entry up to date, if the index is built."""
+        with self._search_lock:
+            if self._search is None:
+                return
+            found = self._index.get(key)
+            if found is None:
+                self._search.remove(key)
+            else:
+                name, category, details = found
+                self._search.add(key, name, category, details.get("aliases", ()))
+
+    def _search_index(self) -> SearchIndex:
+        with self._search_lock:
+            if self._search is None:
+                search = SearchIndex()
+                search.rebuild((key, name, category, details.get("aliases", ()))
+                               for key, (name, category, details) in list(self._index.items()))
+                self._search = search
+            return self._search
+
+    def search(self, query: str, limit: int = 50) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Best matches for a search box query, grouped like get_all_vegetables().
+
+        Matches names, aliases and categories by prefix or substring, and
+        falls back to typo-tolerant matches; categories and items come out
+        best match first.
+        """
+        results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for key in self._search_index().search(query, limit):
+            found = self._index.get(key)
+            if found is not None:
+                name, category, details = found
+                results.setdefault(category, {})[name] = details
+        return results
+
+    def get_stock_version(self, vegetable_name: str) -> Optional[Tuple[float, int]]:
+        """Return (stock, version) for use with compare_and_set_stock."""
+        key = vegetable_name.lower()
+        with self._stripe(key):
+            found = self._index.get(key)
+            if found is None:
+                return None
+            return found[2]["stock"], self._versions.get(key, 0)
+
+    def compare_and_set_stock(self, vegetable_name: str, expected_version: int,
+                              new_stock: float) -> bool:
+        """Set stock only if nobody changed the item since expected_version."""
+        if new_stock < 0:
+            return False
+        key = vegetable_name.lower()
+        with self._write_section(), self._stripe(key):
+            found = self._index.get(key)
+            if found is None or self._versions.get(key, 0) != expected_version:
+                return False
+            name, _, details = found
+            delta = new_stock - details["stock"]
+            details["stock"] = new_stock
+            self._record_changes([(name, delta, new_stock)])
+        self._maybe_compact()
+        return True
+
     def update_stock(self, vegetable_name: str, quantity_sold: float) -> bool:
-        """Update stock and SAVE to file immediately."""
-        for category, items in self.vegetables.items():
-            if vegetable_name in items:
-                if items[vegetable_name]["stock"] >= quantity_sold:
-                    items[vegetable_name]["stock"] -= quantity_sold
-                    self.save_data()  # Save after update
-                    return True
-                else:
-                    return False
-        return False
+        """Update stock and persist the change immediately."""
+        key = vegetable_name.lower()
+        with self._write_section(), self._stripe(key):
+            found = self._index.get(key)
+            if found is None:
+                return False
+            name, _, details = found
+            if details["stock"] < quantity_sold:
+                return False
+            details["stock"] -= quantity_sold
+            self._record_changes([(name, -quantity_sold, details["stock"])])
+        self._maybe_compact()
+        return True
 
     def return_stock(self, vegetable_name: str, quantity: float) -> bool:
-        for category, items in self.vegetables.items():
-            if vegetable_name in items:
-                items[vegetable_name]["stock"] += quantity
-                self.save_data()  # Save after return
-                return True
-        return False
+        key = vegetable_name.lower()
+        with self._write_section(), self._stripe(key):
+            found = self._index.get(key)
+            if found is None:
+                return False
+            name, _, details = found
+            details["stock"] += quantity
+            self._record_changes([(name, quantity, details["stock"])])
+        self._maybe_compact()
+        return True
+
+    def update_stock_many(self, lines: Iterable[Tuple[str, float]]) -> bool:
+        """Take stock for every (name, quantity) line, or for none of them."""
+        return self._apply_many(lines, -1)
+
+    def return_stock_many(self, lines: Iterable[Tuple[str, float]]) -> bool:
+        """Return stock for every (name, quantity) line, or for none of them."""
+        return self._apply_many(lines, 1)
+
+    def _apply_many(self, lines: Iterable[Tuple[str, float]], sign: int) -> bool:
+        # Merge repeated names so a cart with two Potato lines is checked once
+        totals: Dict[str, float] = {}
+        for name, quantity in lines:
+            if quantity < 0:
+                return False
+            key = name.lower()
+            totals[key] = totals.get(key, 0) + quantity
+        if not totals:
+            return True
+
+        # Take the stripes in a fixed order so concurrent batches can't deadlock
+        stripes = sorted({hash(key) % LOCK_STRIPES for key in totals})
+        with self._write_section():
+            applied = self._apply_locked(totals, stripes, sign)
+        if applied:
+            self._maybe_compact()
+        return applied
+
+    def _apply_locked(self, totals: Dict[str, float], stripes: List[int], sign: int) -> bool:
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            # Validate every line before touching any stock
+            targets = []
+            for key, quantity in totals.items():
+                found = self._index.get(key)
+                if found is None:
+                    return False
+                if sign < 0 and found[2]["stock"] < quantity:
+                    return False
+                targets.append((found, quantity))
+
+            changes = []
+            for (name, _, details), quantity in targets:
+                details["stock"] += sign * quantity
+                changes.append((name, sign * quantity, details["stock"]))
+            self._record_changes(changes)
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+        return True
 
     def check_availability(self, vegetable_name: str, quantity: float) -> bool:
-        for category, items in self.vegetables.items():
-            if vegetable_name in items:
-                return items[vegetable_name]["stock"] >= quantity
-        return False
+        found = self._lookup(vegetable_name)
+        if found is None:
+            return False
+        return found[2]["stock"] >= quantity
+
+    def get_low_stock_items(self, threshold: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Items below their own reorder level, most urgent first.
 
-    def get_low_stock_items(self, threshold: float = 5.0) -> Dict[str, Dict[str, Any]]:
+        Passing `threshold` applies one level to every item instead, which
+        needs a full scan.
+        """
         low_stock = {}
-        for category, items in self.vegetables.items():
-            for name, details in items.items():
-                if details["stock"] < threshold:
-                    low_stock[name] = {
-                        "category": category,
-                        **details
-                    }
+        if threshold is not None:
+            for category, items in self.vegetables.items():
+                for name, details in items.items():
+                    if details["stock"] < threshold:
+                        low_stock[name] = {
+                            "category": category,
+                            **details
+                        }
+            return low_stock
+
+        for key in self._low_stock_keys():
+            found = self._index.get(key)
+            if found is not None:
+                name, category, details = found
+                low_stock[name] = {
+                    "category": category,
+                    **details
+                }
         return low_stock
 
-    def get_inventory_summary(self) -> pd.DataFrame:
-        data = []
-        for category, items in self.vegetables.items():
-            for name, details in items.items():
-                data.append({
-                    "Name": name.replace("_", " ").title(),
-                    "Category": category.replace("_", " ").title(),
-                    "Price (₹/kg)": details["price"],
-                    "Stock (kg)": details["stock"],
-                    "Value (₹)": details["price"] * details["stock"]
-                })
-
-        return pd.DataFrame(data)
\ No newline at end of file
+    def is_low_stock(self, vegetable_name: str) -> bool:
+        margin = self._margin_of.get(vegetable_name.lower())
+        return margin is not None and margin < 0
+
+    def get_reorder_level(self, vegetable_name: str) -> Optional[float]:
+        found = self._lookup(vegetable_name)
+        if found is None:
+            return None
+        return self._reorder_level(found[2])
+
+    def set_reorder_level(self, vegetable_name: str, level: float) -> bool:
+        """Set an item's reorder level and save it with the snapshot."""
+        if level < 0:
+            return False
+        key = vegetable_name.lower()
+        with self._write_section(), self._stripe(key):
+            found = self._index.get(key)
+            if found is None:
+                return False
+            found[2]["reorder_level"] = level
+            self._update_threshold_index(key)
+        self.save_data()
+        return True
+
+    def subscribe_low_stock(self, listener: Callable[[str, str, float, float, bool], None]):
+        """Call listener(name, category, stock, reorder_level, is_low) whenever an
+        item crosses its reorder level in either direction.
+
+        Listeners run on the thread that changed the stock, after it has
+        released its locks, so they may read or change stock themselves.
+        """
+        self._low_stock_listeners.append(listener)
+
+    def unsubscribe_low_stock(self, listener: Callable[[str, str, float, float, bool], None]):
+        if listener in self._low_stock_listeners:
+            self._low_stock_listeners.remove(listener)
+
+    def get_category_totals(self) -> Dict[str, Dict[str, float]]:
+        """Running {"stock", "value", "items"} totals for every category."""
+        with self._totals_lock:
+            return {category: dict(totals) for category, totals in self._category_totals.items()}
+
+    def get_store_totals(self) -> Dict[str, float]:
+        with self._totals_lock:
+            return dict(self._store_totals)
+
+    def get_inventory_summary(self, as_records: bool = False) -> Union["pd.DataFrame", List[Dict[str, Any]]]:
+        """Per-item summary, rebuilt only when the inventory changed.
+
+        as_records=True returns a list of row dicts and never imports
+        pandas; otherwise the rows come as a DataFrame, built on first
+        request. Either is shared between callers; copy it before editing.
+        """
+        cached = self._summary_cache
+        if cached is None or cached[0] != self.version:
+            version = self.version
+            records = []
+            for category, items in self.vegetables.items():
+                for name, details in items.items():
+                    records.append({
+                        "Name": name.replace("_", " ").title(),
+                        "Category": category.replace("_", " ").title(),
+                        "Price (₹/kg)": details["price"],
+                        "Stock (kg)": details["stock"],
+                        "Value (₹)": details["price"] * details["stock"]
+                    })
+            cached = (version, records, None)
+            self._summary_cache = cached
+
+        if as_records:
+            return cached[1]
+        if cached[2] is None:
+            import pandas as pd  # deferred: the analytics page is its only user
+            cached = (cached[0], cached[1], pd.DataFrame(cached[1]))
+            self._summary_cache = cached
+        return cached[2]